@@ -0,0 +1,165 @@
+"""Compare the broadcast paths of HiveWrapper.
+
+beem builds, signs and broadcasts with TransactionBuilder in the thread pool.
+signed+beem signs locally with a cached reference block and only broadcasts
+through beem, the default.  asyncio signs locally and broadcasts with aiohttp,
+as with --async-broadcast.
+
+All of them sign and broadcast custom_json transactions against a mock JSON-RPC
+server on localhost, which answers the few calls they make and accepts every
+transaction.  --rpc-latency adds a delay to each call to stand in for a real
+node.
+
+    python benchmarks/broadcast_benchmark.py --num-transactions 200 --concurrency 8
+"""
+import argparse
+import asyncio
+import logging
+from datetime import datetime
+from timeit import default_timer as timer
+
+import beem
+from aiohttp import web
+from beemgraphenebase.account import PrivateKey
+
+from podping_hivewriter.async_broadcaster import AsyncBroadcaster
+from podping_hivewriter.hive_wrapper import (
+    broadcast_custom_json_ops,
+    broadcast_transaction,
+)
+
+ACCOUNT = "podping.bench"
+PAYLOAD = {
+    "version": "0.3",
+    "num_urls": 1,
+    "reason": "feed_update",
+    "urls": ["https://example.com/feed.xml"],
+}
+
+
+class MockHiveNode:
+    def __init__(self, public_key: str, rpc_latency: float):
+        self.public_key = public_key
+        self.rpc_latency = rpc_latency
+        self.calls = 0
+
+    def account(self, name):
+        authority = {
+            "weight_threshold": 1,
+            "account_auths": [],
+            "key_auths": [[self.public_key, 1]],
+        }
+        return {
+            "name": name,
+            "owner": authority,
+            "active": authority,
+            "posting": authority,
+            "memo_key": self.public_key,
+        }
+
+    def result(self, method, params):
+        if method == "call":
+            # condenser_api through beem: ["condenser_api", method, params]
+            method = f"{params[0]}.{params[1]}"
+            params = params[2]
+
+        if method.endswith("get_dynamic_global_properties"):
+            return {
+                "head_block_number": 70000000,
+                "last_irreversible_block_num": 70000000,
+                "head_block_id": "042c1d80" + "11" * 16,
+                "time": datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%S"),
+            }
+        if method == "database_api.find_accounts":
+            return {"accounts": [self.account(name) for name in params["accounts"]]}
+        if method == "condenser_api.get_accounts":
+            return [self.account(name) for name in params[0]]
+        return {}
+
+    async def handler(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self.rpc_latency:
+            await asyncio.sleep(self.rpc_latency)
+        self.calls += 1
+        result = self.result(body["method"], body.get("params"))
+        return web.json_response({"jsonrpc": "2.0", "id": body["id"], "result": result})
+
+
+async def run_broadcasts(broadcast, num_transactions, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one():
+        async with semaphore:
+            await broadcast()
+
+    start = timer()
+    await asyncio.gather(*(one() for _ in range(num_transactions)))
+    return timer() - start
+
+
+async def main(args):
+    private_key = PrivateKey()
+    wif = str(private_key)
+    mock_node = MockHiveNode(format(private_key.pubkey, "STM"), args.rpc_latency)
+
+    app = web.Application()
+    app.add_routes([web.post("/", mock_node.handler)])
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, "127.0.0.1", args.port).start()
+    node = f"http://127.0.0.1:{args.port}"
+
+    loop = asyncio.get_running_loop()
+    hive = await loop.run_in_executor(
+        None, lambda: beem.Hive(node=[node], keys=[wif], num_retries=1)
+    )
+    async_broadcaster = AsyncBroadcaster([wif])
+
+    async def beem_broadcast():
+        await broadcast_custom_json_ops(hive, "podping", [PAYLOAD], [ACCOUNT])
+
+    async def signed_beem_broadcast():
+        signed_tx = await async_broadcaster.sign_custom_json_ops(
+            node, hive.chain_params, "podping", [PAYLOAD], [ACCOUNT]
+        )
+        await broadcast_transaction(hive, signed_tx.json())
+
+    async def asyncio_broadcast():
+        await async_broadcaster.broadcast_custom_json_ops(
+            node, hive.chain_params, "podping", [PAYLOAD], [ACCOUNT]
+        )
+
+    paths = (
+        ("beem", beem_broadcast),
+        ("signed+beem", signed_beem_broadcast),
+        ("asyncio", asyncio_broadcast),
+    )
+    # Warm up, the account key and reference block are looked up on first use
+    for _, broadcast in paths:
+        await broadcast()
+
+    for name, broadcast in paths:
+        mock_node.calls = 0
+        elapsed = await run_broadcasts(
+            broadcast, args.num_transactions, args.concurrency
+        )
+        print(
+            f"{name:12} {args.num_transactions} transactions in {elapsed:0.2f}s - "
+            f"{args.num_transactions / elapsed:0.1f} tx/s - "
+            f"{mock_node.calls / args.num_transactions:0.1f} RPC calls per tx"
+        )
+
+    await async_broadcaster.close()
+    await runner.cleanup()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-transactions", type=int, default=200)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument(
+        "--rpc-latency", type=float, default=0.0, help="Seconds added to each call"
+    )
+    parser.add_argument("--port", type=int, default=8765)
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(main(parser.parse_args()))
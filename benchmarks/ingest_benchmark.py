@@ -0,0 +1,209 @@
+"""Compare IRI ingest throughput of the ZeroMQ and HTTP front ends.
+
+Only the ingest path is measured.  Hive startup is skipped and nothing is
+broadcast, IRIs simply pile up in PodpingHivewriter.iri_queue.  With
+--iri-journal-file they're also written to an IRI journal before each reply,
+and --clients runs that many clients at once, whose writes the journal
+commits together.  --zmq-router serves ZeroMQ with a ROUTER socket instead,
+and its clients are DEALERs keeping up to --pipeline requests in flight.
+
+    python benchmarks/ingest_benchmark.py --num-iris 20000 --bulk-size 500
+"""
+import argparse
+import asyncio
+import logging
+from timeit import default_timer as timer
+from unittest.mock import patch
+
+import aiohttp
+import zmq
+import zmq.asyncio
+
+from podping_hivewriter.constants import ZMQ_BULK_MARKER
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+async def _no_startup(_self):
+    pass
+
+
+def make_iris(num_iris: int, name: str):
+    return [f"https://example.com/{name}/{i}/feed.xml" for i in range(num_iris)]
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+async def zmq_single(host, port, iris):
+    context = zmq.asyncio.Context()
+    socket = context.socket(zmq.REQ)
+    socket.connect(f"tcp://{host}:{port}")
+    for iri in iris:
+        await socket.send_string(iri)
+        await socket.recv_string()
+    socket.close()
+
+
+async def zmq_pipelined(host, port, requests, pipeline):
+    context = zmq.asyncio.Context()
+    socket = context.socket(zmq.DEALER)
+    socket.connect(f"tcp://{host}:{port}")
+    in_flight = asyncio.Semaphore(pipeline)
+
+    async def send():
+        for request in requests:
+            await in_flight.acquire()
+            await socket.send_multipart([b""] + request)
+
+    async def receive():
+        for _ in requests:
+            await socket.recv_multipart()
+            in_flight.release()
+
+    await asyncio.gather(send(), receive())
+    socket.close()
+
+
+async def zmq_bulk(host, port, iris, bulk_size):
+    context = zmq.asyncio.Context()
+    socket = context.socket(zmq.REQ)
+    socket.connect(f"tcp://{host}:{port}")
+    for chunk in chunks(iris, bulk_size):
+        await socket.send_multipart(
+            [ZMQ_BULK_MARKER] + [iri.encode("UTF-8") for iri in chunk]
+        )
+        await socket.recv_string()
+    socket.close()
+
+
+async def http_single(host, port, iris):
+    async with aiohttp.ClientSession() as session:
+        for iri in iris:
+            async with session.post(f"http://{host}:{port}/iri", data=iri) as resp:
+                await resp.read()
+
+
+async def http_bulk(host, port, iris, bulk_size):
+    async with aiohttp.ClientSession() as session:
+        for chunk in chunks(iris, bulk_size):
+            async with session.post(f"http://{host}:{port}/iris", json=chunk) as resp:
+                await resp.read()
+
+
+async def run(args):
+    host = "127.0.0.1"
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "benchmark",
+            [],
+            PodpingSettingsManager(ignore_updates=True),
+            listen_ip=host,
+            listen_port=args.zmq_port,
+            http_port=args.http_port,
+            resource_test=False,
+            daemon=False,
+            iri_journal_file=args.iri_journal_file,
+            zmq_router=args.zmq_router,
+        )
+
+    zmq_loop = (
+        podping_hivewriter._zmq_router_loop
+        if args.zmq_router
+        else podping_hivewriter._zmq_response_loop
+    )
+    podping_hivewriter._add_task(asyncio.create_task(zmq_loop()))
+    podping_hivewriter._add_task(
+        asyncio.create_task(podping_hivewriter._http_listener_loop())
+    )
+    await asyncio.sleep(0.5)
+
+    def clients(name, client, port, *client_args):
+        num_iris = args.num_iris // args.clients
+        return asyncio.gather(
+            *(
+                client(host, port, make_iris(num_iris, f"{name}{i}"), *client_args)
+                for i in range(args.clients)
+            )
+        )
+
+    def pipelined_clients(name, bulk_size):
+        num_iris = args.num_iris // args.clients
+
+        def requests(iris):
+            if bulk_size is None:
+                return [[iri.encode("UTF-8")] for iri in iris]
+            return [
+                [ZMQ_BULK_MARKER] + [iri.encode("UTF-8") for iri in chunk]
+                for chunk in chunks(iris, bulk_size)
+            ]
+
+        return asyncio.gather(
+            *(
+                zmq_pipelined(
+                    host,
+                    args.zmq_port,
+                    requests(make_iris(num_iris, f"{name}{i}")),
+                    args.pipeline,
+                )
+                for i in range(args.clients)
+            )
+        )
+
+    if args.zmq_router:
+        zmq_cases = [
+            ("zmq single", lambda: pipelined_clients("a", None)),
+            ("zmq bulk", lambda: pipelined_clients("b", args.bulk_size)),
+        ]
+    else:
+        zmq_cases = [
+            ("zmq single", lambda: clients("a", zmq_single, args.zmq_port)),
+            (
+                "zmq bulk",
+                lambda: clients("b", zmq_bulk, args.zmq_port, args.bulk_size),
+            ),
+        ]
+
+    cases = zmq_cases + [
+        ("http single", lambda: clients("c", http_single, args.http_port)),
+        (
+            "http bulk",
+            lambda: clients("d", http_bulk, args.http_port, args.bulk_size),
+        ),
+    ]
+
+    for name, case in cases:
+        start = timer()
+        await case()
+        duration = timer() - start
+        print(
+            f"{name:>12}: {args.num_iris} IRIs in {duration:.3f}s - "
+            f"{args.num_iris / duration:,.0f} IRIs/s"
+        )
+
+    podping_hivewriter.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-iris", type=int, default=10000)
+    parser.add_argument("--bulk-size", type=int, default=500)
+    parser.add_argument("--zmq-port", type=int, default=9989)
+    parser.add_argument("--http-port", type=int, default=9988)
+    parser.add_argument("--clients", type=int, default=1)
+    parser.add_argument("--iri-journal-file")
+    parser.add_argument("--zmq-router", action="store_true")
+    parser.add_argument("--pipeline", type=int, default=100)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
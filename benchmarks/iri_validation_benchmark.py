@@ -0,0 +1,57 @@
+"""Compare is_valid_iri against calling rfc3987.match directly.
+
+The corpus mimics production traffic: a fixed set of feeds pinged over and
+over, with a few non-ASCII and non-http IRIs mixed in.
+
+    python benchmarks/iri_validation_benchmark.py --num-feeds 10000 --repeat 5
+"""
+import argparse
+import random
+from timeit import default_timer as timer
+
+import rfc3987
+
+from podping_hivewriter.iri_validation import is_valid_iri
+
+
+def make_corpus(num_feeds: int, repeat: int):
+    feeds = []
+    for i in range(num_feeds):
+        if i % 50 == 0:
+            feeds.append(f"https://example.com/pódcast/{i}.xml")
+        elif i % 75 == 0:
+            feeds.append(f"ipns://example{i}.com/feed.xml")
+        else:
+            feeds.append(f"https://feeds.example{i % 97}.com/show/{i}/rss?format=xml")
+    corpus = feeds * repeat
+    random.shuffle(corpus)
+    return corpus
+
+
+def bench(name, fn, corpus):
+    start = timer()
+    for iri in corpus:
+        fn(iri)
+    duration = timer() - start
+    print(
+        f"{name:>20}: {len(corpus)} IRIs in {duration:.3f}s - "
+        f"{duration / len(corpus) * 1e6:.2f}µs per IRI"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--num-feeds", type=int, default=10000)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.num_feeds, args.repeat)
+
+    bench("rfc3987.match", lambda iri: rfc3987.match(iri, "IRI"), corpus)
+    bench("uncached fast path", is_valid_iri.__wrapped__, corpus)
+    is_valid_iri.cache_clear()
+    bench("is_valid_iri", is_valid_iri, corpus)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+import asyncio
+import logging
+from timeit import default_timer as timer
+from typing import Awaitable, Callable, Iterable, List, Optional, Set
+
+import aiohttp
+
+from podping_hivewriter.async_context import AsyncContext
+from podping_hivewriter.hive_rpc import hive_rpc_call
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+# Seconds between checks of who the control account follows
+ALLOWED_ACCOUNTS_REFRESH_PERIOD = 600
+# Most accounts condenser_api.get_following returns in one call
+FOLLOWING_PAGE_SIZE = 1000
+
+AllowedAccountsSubscriber = Callable[[Set[str], Set[str]], Awaitable[None]]
+
+
+async def get_following(
+    session: aiohttp.ClientSession, nodes: Iterable[str], account_name: str
+) -> Set[str]:
+    """Every account account_name follows, from the first node that answers
+    for every page"""
+    error: Optional[Exception] = None
+    for node in nodes:
+        try:
+            return await _get_following(session, node, account_name)
+        except Exception as e:
+            error = e
+    raise error or ValueError("No nodes to fetch the accounts followed from")
+
+
+async def _get_following(
+    session: aiohttp.ClientSession, node: str, account_name: str
+) -> Set[str]:
+    """Every account account_name follows, a page at a time"""
+    following: Set[str] = set()
+    start: Optional[str] = None
+    while True:
+        page = await hive_rpc_call(
+            session,
+            node,
+            "condenser_api.get_following",
+            [account_name, start or "", "blog", FOLLOWING_PAGE_SIZE],
+        )
+        following.update(follow["following"] for follow in page)
+        if len(page) < FOLLOWING_PAGE_SIZE:
+            return following
+        # The next page starts with the last account of this one
+        start = page[-1]["following"]
+
+
+class AllowedAccountsCache(AsyncContext):
+    """The accounts allowed to send podpings, which are those the control
+    account follows.  Refreshed in the background, so checking an account is a
+    set lookup that never waits on Hive.  Subscribers hear about accounts added
+    and removed by each refresh, the first refresh adding every account."""
+
+    def __init__(
+        self,
+        hive_wrapper: HiveWrapper,
+        settings_manager: PodpingSettingsManager,
+        daemon=True,
+    ):
+        super().__init__()
+
+        self.hive_wrapper = hive_wrapper
+        self.settings_manager = settings_manager
+        self.daemon = daemon
+
+        self.accounts: Set[str] = set()
+        self.refreshed_at: Optional[float] = None
+        self._subscribers: List[AllowedAccountsSubscriber] = []
+        self._refresh_lock = asyncio.Lock()
+
+        self._startup_done = False
+        asyncio.ensure_future(self._startup())
+
+    async def _startup(self):
+        if self.daemon:
+            self._add_task(asyncio.create_task(self._refresh_loop()))
+
+        self._startup_done = True
+
+    def __contains__(self, account: str) -> bool:
+        return account in self.accounts
+
+    def subscribe(self, subscriber: AllowedAccountsSubscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    async def refresh(self) -> None:
+        await self.hive_wrapper.wait_startup()
+        async with self._refresh_lock:
+            settings = await self.settings_manager.get_settings()
+            session = await self.hive_wrapper.get_session()
+            accounts = await get_following(
+                session, self.hive_wrapper.nodes, settings.control_account
+            )
+
+            added = accounts - self.accounts
+            removed = self.accounts - accounts
+            self.accounts = accounts
+            self.refreshed_at = timer()
+
+        if not (added or removed):
+            return
+        logging.info(
+            f"Allowed accounts changed - Added: {sorted(added)} - "
+            f"Removed: {sorted(removed)}"
+        )
+        for subscriber in self._subscribers:
+            try:
+                await subscriber(added, removed)
+            except Exception as e:
+                logging.error(e, exc_info=True)
+
+    async def get(self) -> Set[str]:
+        """The allowed accounts, fetched first if they never have been"""
+        if self.refreshed_at is None:
+            await self.refresh()
+        return self.accounts
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(ALLOWED_ACCOUNTS_REFRESH_PERIOD)
+            try:
+                await self.refresh()
+            except Exception as e:
+                # The accounts we have are kept until a refresh succeeds
+                logging.warning(f"Unable to refresh allowed accounts: {e!r}")
+            except asyncio.CancelledError:
+                raise
@@ -0,0 +1,177 @@
+import logging
+from typing import Dict, List, Optional
+
+import aiohttp
+from beem.exceptions import MissingKeyError
+from beembase import operations
+from beembase.objects import Operation
+from beembase.signedtransactions import Signed_Transaction
+from beemgraphenebase.account import PrivateKey
+from beemgraphenebase.ecdsasig import SECP256K1_MODULE
+
+from podping_hivewriter.async_wrapper import sync_to_async
+from podping_hivewriter.hive_rpc import hive_rpc_call
+from podping_hivewriter.ref_block_cache import RefBlockCache
+
+# Seconds after the head block time that a transaction expires, as in beem
+TRANSACTION_EXPIRATION = 30
+
+
+def _sign_transaction(
+    tx: Signed_Transaction, wif: str, chain_params: dict
+) -> Signed_Transaction:
+    tx.sign([wif], chain=chain_params)
+    return tx
+
+
+# Signing takes tens of milliseconds with the pure Python ecdsa fallback, too
+# long to hold up the event loop.  With secp256k1 or cryptography it doesn't.
+if SECP256K1_MODULE == "ecdsa":
+    _sign = sync_to_async(_sign_transaction, thread_sensitive=False)
+else:
+
+    async def _sign(
+        tx: Signed_Transaction, wif: str, chain_params: dict
+    ) -> Signed_Transaction:
+        return _sign_transaction(tx, wif, chain_params)
+
+
+class AsyncBroadcaster:
+    """Signs custom_json transactions locally and broadcasts them with
+    condenser_api.broadcast_transaction over one shared aiohttp session,
+    without going through beem or the thread pool"""
+
+    def __init__(self, posting_keys: List[str], nobroadcast=False):
+        self.posting_keys = posting_keys
+        self.nobroadcast = nobroadcast
+
+        self.ref_block_cache = RefBlockCache()
+        # Address prefix, to public key, to private key
+        self._wifs_by_public_key: Dict[str, Dict[str, str]] = {}
+        self._wifs_by_account: Dict[str, str] = {}
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
+    async def close(self) -> None:
+        if self._session is not None:
+            await self._session.close()
+
+    def _wif_for_public_key(self, public_key: str, prefix: str) -> Optional[str]:
+        wifs = self._wifs_by_public_key.get(prefix)
+        if wifs is None:
+            wifs = {
+                format(PrivateKey(wif, prefix=prefix).pubkey, prefix): wif
+                for wif in self.posting_keys
+            }
+            self._wifs_by_public_key[prefix] = wifs
+        return wifs.get(public_key)
+
+    async def posting_wif(self, node: str, account: str, prefix: str) -> str:
+        """The posting key we hold for account, looked up once"""
+        wif = self._wifs_by_account.get(account)
+        if wif:
+            return wif
+
+        session = await self.get_session()
+        accounts = await hive_rpc_call(
+            session, node, "condenser_api.get_accounts", [[account]]
+        )
+        if accounts:
+            posting = accounts[0]["posting"]
+            wif = self._wif_for_key_auths(posting["key_auths"], prefix)
+            if not wif and posting.get("account_auths"):
+                # Posting authority granted to other accounts, which sign for
+                # it with their own posting keys
+                authorities = await hive_rpc_call(
+                    session,
+                    node,
+                    "condenser_api.get_accounts",
+                    [[name for name, _ in posting["account_auths"]]],
+                )
+                for authority in authorities:
+                    wif = self._wif_for_key_auths(
+                        authority["posting"]["key_auths"], prefix
+                    )
+                    if wif:
+                        break
+            if wif:
+                self._wifs_by_account[account] = wif
+                return wif
+        raise MissingKeyError(f"No posting key given for @{account}")
+
+    def _wif_for_key_auths(self, key_auths: list, prefix: str) -> Optional[str]:
+        for public_key, _ in key_auths:
+            wif = self._wif_for_public_key(public_key, prefix)
+            if wif:
+                return wif
+        return None
+
+    async def sign_custom_json_ops(
+        self,
+        node: str,
+        chain_params: dict,
+        operation_id: str,
+        payloads: List[dict],
+        required_posting_auths: List[str],
+    ) -> Signed_Transaction:
+        """Build and sign a transaction holding a custom_json operation per
+        payload.  Needs no round trip to node once the posting key is known
+        and while the cached reference block is fresh."""
+        prefix = chain_params["prefix"]
+        wif = await self.posting_wif(node, required_posting_auths[0], prefix)
+
+        session = await self.get_session()
+        ref_block = await self.ref_block_cache.get(session, node)
+
+        ops = [
+            Operation(
+                operations.Custom_json(
+                    **{
+                        "json": payload,
+                        "required_auths": [],
+                        "required_posting_auths": required_posting_auths,
+                        "id": operation_id,
+                        "prefix": prefix,
+                    }
+                ),
+                prefix=prefix,
+            )
+            for payload in payloads
+        ]
+        tx = Signed_Transaction(
+            ref_block_num=ref_block.ref_block_num,
+            ref_block_prefix=ref_block.ref_block_prefix,
+            expiration=ref_block.expiration(TRANSACTION_EXPIRATION),
+            operations=ops,
+            prefix=prefix,
+        )
+        return await _sign(tx, wif, chain_params)
+
+    async def broadcast_custom_json_ops(
+        self,
+        node: str,
+        chain_params: dict,
+        operation_id: str,
+        payloads: List[dict],
+        required_posting_auths: List[str],
+    ) -> dict:
+        """Sign with sign_custom_json_ops and send through node"""
+        signed_tx = await self.sign_custom_json_ops(
+            node, chain_params, operation_id, payloads, required_posting_auths
+        )
+        ret = signed_tx.json()
+
+        if self.nobroadcast:
+            logging.info("Not broadcasting anything!")
+        else:
+            session = await self.get_session()
+            await hive_rpc_call(
+                session, node, "condenser_api.broadcast_transaction", [ret]
+            )
+
+        ret["trx_id"] = signed_tx.id
+        return ret
@@ -0,0 +1,107 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable, List, Optional
+
+from podping_hivewriter.async_context import AsyncContext
+from podping_hivewriter.constants import HIVE_BLOCK_INTERVAL
+from podping_hivewriter.hive_rpc import hive_rpc_call
+from podping_hivewriter.hive_wrapper import HiveWrapper
+
+# Most blocks fetched in one block_api.get_block_range call
+BLOCK_RANGE_MAX = 50
+
+BlockSubscriber = Callable[[dict], Awaitable[None]]
+
+
+def block_num_from_id(block_id: str) -> int:
+    """A block ID starts with its block number"""
+    return int(block_id[:8], 16)
+
+
+class BlockStream(AsyncContext):
+    """Follows Hive head blocks as they're produced, from the node in use, and
+    hands each block to every subscriber in order.  Blocks are as returned by
+    block_api.get_block_range, with block_num added."""
+
+    def __init__(self, hive_wrapper: HiveWrapper, daemon=True):
+        super().__init__()
+
+        self.hive_wrapper = hive_wrapper
+        self.daemon = daemon
+
+        self.head_block_num: Optional[int] = None
+        self.last_irreversible_block_num: Optional[int] = None
+        self._subscribers: List[BlockSubscriber] = []
+
+        self._startup_done = False
+        asyncio.ensure_future(self._startup())
+
+    async def _startup(self):
+        if self.daemon:
+            self._add_task(asyncio.create_task(self._stream_loop()))
+
+        self._startup_done = True
+
+    def subscribe(self, subscriber: BlockSubscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    async def get_block(self, block_num: int) -> Optional[dict]:
+        """A single block from the node in use, as the node has it now, or None
+        if it doesn't have it yet"""
+        session = await self.hive_wrapper.get_session()
+        result = await hive_rpc_call(
+            session,
+            self.hive_wrapper.nodes[0],
+            "block_api.get_block",
+            {"block_num": block_num},
+        )
+        block = result.get("block")
+        if block:
+            block["block_num"] = block_num
+        return block
+
+    async def _publish(self, block: dict) -> None:
+        for subscriber in self._subscribers:
+            try:
+                await subscriber(block)
+            except Exception as e:
+                logging.error(e, exc_info=True)
+
+    async def _stream_loop(self):
+        await self.hive_wrapper.wait_startup()
+        next_block_num: Optional[int] = None
+        while True:
+            try:
+                session = await self.hive_wrapper.get_session()
+                node = self.hive_wrapper.nodes[0]
+                dynamic_global_properties = await hive_rpc_call(
+                    session, node, "condenser_api.get_dynamic_global_properties"
+                )
+                self.head_block_num = dynamic_global_properties["head_block_number"]
+                self.last_irreversible_block_num = dynamic_global_properties[
+                    "last_irreversible_block_num"
+                ]
+                if next_block_num is None:
+                    next_block_num = self.head_block_num
+
+                while next_block_num <= self.head_block_num:
+                    count = min(
+                        self.head_block_num - next_block_num + 1, BLOCK_RANGE_MAX
+                    )
+                    result = await hive_rpc_call(
+                        session,
+                        node,
+                        "block_api.get_block_range",
+                        {"starting_block_num": next_block_num, "count": count},
+                    )
+                    if not result["blocks"]:
+                        break
+                    for block in result["blocks"]:
+                        block["block_num"] = block_num_from_id(block["block_id"])
+                        await self._publish(block)
+                        next_block_num = block["block_num"] + 1
+            except Exception as e:
+                logging.warning(f"Unable to follow Hive blocks: {e!r}")
+            except asyncio.CancelledError:
+                raise
+            await asyncio.sleep(HIVE_BLOCK_INTERVAL)
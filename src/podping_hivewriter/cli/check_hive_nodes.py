@@ -2,12 +2,13 @@ import asyncio
 import json
 import logging
 from timeit import default_timer as timer
-from typing import Tuple
+from typing import Iterable, Tuple
 
 import aiohttp
 import beem
 from beem.nodelist import NodeList
 from podping_hivewriter.config import Config
+from podping_hivewriter.node_health import probe_node
 from podping_hivewriter.podping_settings import get_settings_from_hive
 
 
@@ -15,25 +16,17 @@ from podping_hivewriter.podping_settings import get_settings_from_hive
 #  Might migrate it to the main CLI
 
 
-async def get_node_latency(acc_name: str, node: str) -> Tuple[str, float]:
-    """Checks a specific Hive node for allowed accounts"""
-    async with aiohttp.ClientSession() as session:
-        try:
-            data = {
-                "jsonrpc": "2.0",
-                "method": "condenser_api.get_following",
-                "params": [acc_name, None, "blog", 10],
-                "id": 1,
-            }
-            start = timer()
-            async with session.post(node, json=data) as _:
-                pass
-            elapsed = timer() - start
-            logging.info(f"Hive Node: {node} - Time: {elapsed}")
-            return node, elapsed
-        except Exception as ex:
-            logging.warning(f"Node: {node} - Error: {ex}")
-            return node, False
+async def get_node_latency(
+    session: aiohttp.ClientSession, node: str
+) -> Tuple[str, float]:
+    """Times a lightweight call to a Hive node, inf if it fails"""
+    try:
+        elapsed = await probe_node(session, node)
+    except Exception as ex:
+        logging.warning(f"Node: {node} - Error: {ex}")
+        return node, float("inf")
+    logging.info(f"Hive Node: {node} - Time: {elapsed}")
+    return node, elapsed
 
 
 async def test_send_custom_json(node: str) -> Tuple[str, float]:
@@ -49,31 +42,21 @@ async def test_send_custom_json(node: str) -> Tuple[str, float]:
         )
     except Exception as ex:
         logging.warning(f"Node: {node} - Error: {ex}")
-        return node, False
+        return node, float("inf")
     elapsed = timer() - start
     logging.info(f"Node: {node} - Elapsed: {elapsed}")
 
     return node, elapsed
 
 
-async def get_time_sorted_node_list(acc_name: str = None) -> Tuple[str, ...]:
-    """Retuns a list of configured nodes sorted by response time for
-    the get_following API call"""
-    if not acc_name:
-        acc_name = Config.podping_settings.control_account
-    nodes = Config.nodes_in_use
-    tasks = []
-    for node in nodes:
-        task = asyncio.create_task(get_node_latency(acc_name, node))
-        tasks.append(task)
-
-    answer = await asyncio.gather(*tasks)
+async def get_time_sorted_node_list(nodes: Iterable[str]) -> Tuple[str, ...]:
+    """Returns the given nodes sorted by response time, failed nodes last"""
+    async with aiohttp.ClientSession() as session:
+        answer = await asyncio.gather(
+            *(get_node_latency(session, node) for node in nodes)
+        )
     answer.sort(key=lambda a: a[1])
-    node_list = []
-    for node, time in answer:
-        node_list.append(node)
-
-    return tuple(node_list)
+    return tuple(node for node, _ in answer)
 
 
 async def check_all_hive_nodes(acc_name: str = "podping") -> bool:
@@ -87,13 +70,7 @@ async def check_all_hive_nodes(acc_name: str = "podping") -> bool:
     print("--------------------")
 
     nodes.append("https://api.ha.deathwing.me")
-    tasks_allowed = [get_node_latency(acc_name, node) for node in nodes]
-
-    answer = await asyncio.gather(*tasks_allowed)
-    answer.sort(key=lambda a: a[1])
-    print(answer)
-
-    new_nodes = [node for node, _ in answer]
+    new_nodes = await get_time_sorted_node_list(nodes)
 
     print("Sorted Nodes:")
     print(json.dumps(new_nodes))
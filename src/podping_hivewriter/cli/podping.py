@@ -2,18 +2,22 @@ import asyncio
 import logging
 from typing import Optional, List
 
-import rfc3987
 import typer
 
 from podping_hivewriter import __version__
 from podping_hivewriter.constants import LIVETEST_OPERATION_ID, PODPING_OPERATION_ID
+from podping_hivewriter.iri_validation import is_valid_iri
 from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_settings import default_settings_cache_file
 from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+from podping_hivewriter.rc_governor import RC_FLOOR_PCT
+from podping_hivewriter.retry_policy import RetryPolicy
+from podping_hivewriter.startup_cache import default_startup_cache_file
 
 
 def iris_callback(iris: List[str]) -> List[str]:
     for iri in iris:
-        if not rfc3987.match(iri, "IRI"):
+        if not is_valid_iri(iri):
             raise typer.BadParameter(
                 """IRI is not valid. Must match rfc3987.
             Example: https://www.example.com/feed.xml
@@ -35,9 +39,17 @@ app = typer.Typer()
 class Config:
     hive_account: str
     hive_posting_key: str
+    extra_hive_accounts: List[str]
+    extra_hive_posting_keys: List[str]
     sanity_check: bool
     livetest: bool
     dry_run: bool
+    async_broadcast: bool
+    broadcast_hedge_nodes: int
+    retry_budget: Optional[int]
+    rc_floor: float
+    settings_cache_file: Optional[str]
+    settings_from_blocks: bool
     status: bool
     ignore_config_updates: bool
     i_know_what_im_doing: bool
@@ -59,7 +71,7 @@ def write(
         envvar="PODPING_IRI",
         callback=iris_callback,
         help="One or more whitepace-separated IRIs to post to Hive. "
-        "This will fail if you try to send too many at once.",
+        "IRIs that don't fit in a single Hive operation are split over several.",
     ),
 ):
     """
@@ -85,16 +97,25 @@ def write(
     2021-08-30T00:16:01-0500 | INFO | Transaction sent: 00eae43df4a202d94ef6cb797c05f39fbb50631b - JSON size: 97
     ```
     """
-    settings_manager = PodpingSettingsManager(Config.ignore_config_updates)
+    settings_manager = PodpingSettingsManager(
+        Config.ignore_config_updates,
+        cache_file=Config.settings_cache_file or default_settings_cache_file(),
+        push_updates=Config.settings_from_blocks,
+    )
 
     with PodpingHivewriter(
         Config.hive_account,
-        [Config.hive_posting_key],
+        [Config.hive_posting_key] + Config.extra_hive_posting_keys,
         settings_manager,
         operation_id=Config.operation_id,
         resource_test=Config.sanity_check,
         daemon=False,
         dry_run=Config.dry_run,
+        extra_accounts=Config.extra_hive_accounts,
+        async_broadcast=Config.async_broadcast,
+        hedge_nodes=Config.broadcast_hedge_nodes,
+        retry_policy=RetryPolicy(budget=Config.retry_budget),
+        rc_floor_pct=Config.rc_floor,
     ) as podping_hivewriter:
         coro = podping_hivewriter.failure_retry(set(iris))
         try:
@@ -129,6 +150,62 @@ def server(
         # callback=iris_callback,
         help="Port to listen on.",
     ),
+    zmq_router: Optional[bool] = typer.Option(
+        False,
+        envvar="PODPING_ZMQ_ROUTER",
+        help="Listen with a ZeroMQ ROUTER socket instead of REP. "
+        "Existing REQ clients work unchanged, DEALER clients may send many IRIs "
+        "without waiting for each reply.",
+    ),
+    http_port: Optional[int] = typer.Option(
+        None,
+        envvar="PODPING_HTTP_PORT",
+        help="Also accept IRIs over HTTP on this port, using the same listen IP. "
+        "POST one IRI to /iri, or many to /iris as a JSON array "
+        "or one IRI per line. Disabled by default.",
+    ),
+    iri_queue_high_water: int = typer.Option(
+        100000,
+        envvar="PODPING_IRI_QUEUE_HIGH_WATER",
+        min=1,
+        help="Number of IRIs waiting to be batched at which the server starts "
+        "answering BUSY instead of accepting more.",
+    ),
+    iri_batch_queue_high_water: int = typer.Option(
+        1000,
+        envvar="PODPING_IRI_BATCH_QUEUE_HIGH_WATER",
+        min=1,
+        help="Number of batches waiting to be sent to Hive at which batching "
+        "pauses and the server starts answering BUSY.",
+    ),
+    broadcast_concurrency: Optional[int] = typer.Option(
+        None,
+        envvar="PODPING_BROADCAST_CONCURRENCY",
+        help="Number of batches that may be broadcasting, or waiting to retry, "
+        "at the same time. Defaults to the number of Hive accounts.",
+    ),
+    fast_start: Optional[bool] = typer.Option(
+        False,
+        envvar="PODPING_FAST_START",
+        help="Start accepting IRIs straight away and run the startup checks in "
+        "the background, where a failure is logged instead of exiting. The "
+        "last checks that passed are kept in --startup-cache-file and skipped "
+        "on a restart within a day.",
+    ),
+    startup_cache_file: Optional[str] = typer.Option(
+        None,
+        envvar="PODPING_STARTUP_CACHE_FILE",
+        help="File to keep the last startup checks that passed in. "
+        "Defaults to podping-hivewriter/startup-checks.json in the user's "
+        "cache directory with --fast-start, no file otherwise.",
+    ),
+    iri_journal_file: Optional[str] = typer.Option(
+        None,
+        envvar="PODPING_IRI_JOURNAL_FILE",
+        help="SQLite database to write accepted IRIs to before acknowledging "
+        "them. IRIs not yet in an irreversible block when the server stops are sent "
+        "again after it restarts. Disabled by default.",
+    ),
 ):
     """
     Run a Podping server.  Listens for IRIs on the given address/port with ZeroMQ and
@@ -173,19 +250,37 @@ def server(
         # ZMQ doesn't like the localhost string, force it to ipv4
         listen_ip = "127.0.0.1"
 
-    settings_manager = PodpingSettingsManager(Config.ignore_config_updates)
+    settings_manager = PodpingSettingsManager(
+        Config.ignore_config_updates,
+        cache_file=Config.settings_cache_file or default_settings_cache_file(),
+        push_updates=Config.settings_from_blocks,
+    )
 
     _podping_hivewriter = PodpingHivewriter(
         Config.hive_account,
-        [Config.hive_posting_key],
+        [Config.hive_posting_key] + Config.extra_hive_posting_keys,
         settings_manager,
         listen_ip=listen_ip,
         listen_port=listen_port,
+        zmq_router=zmq_router,
+        http_port=http_port,
+        iri_queue_high_water=iri_queue_high_water,
+        iri_batch_queue_high_water=iri_batch_queue_high_water,
         operation_id=Config.operation_id,
         resource_test=Config.sanity_check,
         dry_run=Config.dry_run,
         daemon=True,
         status=Config.status,
+        extra_accounts=Config.extra_hive_accounts,
+        broadcast_concurrency=broadcast_concurrency,
+        async_broadcast=Config.async_broadcast,
+        hedge_nodes=Config.broadcast_hedge_nodes,
+        retry_policy=RetryPolicy(budget=Config.retry_budget),
+        rc_floor_pct=Config.rc_floor,
+        fast_start=fast_start,
+        startup_cache_file=startup_cache_file
+        or (default_startup_cache_file() if fast_start else None),
+        iri_journal_file=iri_journal_file,
     )
 
     try:
@@ -216,6 +311,22 @@ def callback(
         confirmation_prompt=True,
         hide_input=True,
     ),
+    extra_hive_accounts: List[str] = typer.Option(
+        [],
+        "--extra-hive-account",
+        envvar="PODPING_EXTRA_HIVE_ACCOUNTS",
+        help="Additional Hive account to post with, may be given multiple times. "
+        "Operations are spread over all accounts, favouring whichever has the most "
+        "Resource Credits available. Each one needs a matching "
+        "--extra-hive-posting-key.",
+    ),
+    extra_hive_posting_keys: List[str] = typer.Option(
+        [],
+        "--extra-hive-posting-key",
+        envvar="PODPING_EXTRA_HIVE_POSTING_KEYS",
+        help="Posting key for an account given with --extra-hive-account, "
+        "may be given multiple times.",
+    ),
     sanity_check: Optional[bool] = typer.Option(
         True,
         envvar="PODPING_SANITY_CHECK",
@@ -236,6 +347,31 @@ def callback(
         envvar="PODPING_DRY_RUN",
         help="Run through all posting logic without posting to the chain.",
     ),
+    async_broadcast: Optional[bool] = typer.Option(
+        False,
+        envvar="PODPING_ASYNC_BROADCAST",
+        help="Sign transactions locally and broadcast them with asyncio HTTP "
+        "requests instead of beem, falling back to beem if that fails.",
+    ),
+    broadcast_hedge_nodes: int = typer.Option(
+        0,
+        envvar="PODPING_BROADCAST_HEDGE_NODES",
+        help="When a Hive node is slow to accept a transaction, also send it to "
+        "up to this many other nodes. The first to accept it wins.",
+    ),
+    retry_budget: Optional[int] = typer.Option(
+        None,
+        envvar="PODPING_RETRY_BUDGET",
+        help="Give up on a transaction after retrying it this many times, "
+        "logging the IRIs it held. By default it's retried until it's sent.",
+    ),
+    rc_floor: float = typer.Option(
+        RC_FLOOR_PCT,
+        envvar="PODPING_RC_FLOOR",
+        help="Percentage of each account's resource credits to keep in reserve. "
+        "Batches are held open longer to fit more IRIs in each operation as RC "
+        "runs low.",
+    ),
     status: Optional[bool] = typer.Option(
         True,
         envvar="PODPING_STATUS",
@@ -249,6 +385,20 @@ def callback(
         "configured Hive control account, allowing real time updates to adapt "
         "to changes in the Hive network. This lets you ignore these updates if needed.",
     ),
+    settings_cache_file: Optional[str] = typer.Option(
+        None,
+        envvar="PODPING_SETTINGS_CACHE_FILE",
+        help="File to keep the last settings pulled from the control account in, "
+        "so a restart begins with them. Defaults to "
+        "podping-hivewriter/podping-settings.json in the user's cache directory.",
+    ),
+    settings_from_blocks: Optional[bool] = typer.Option(
+        False,
+        envvar="PODPING_SETTINGS_FROM_BLOCKS",
+        help="Instead of polling the control account for new settings, watch "
+        "new Hive blocks for it updating them. Changes apply within a block. "
+        "Only the server follows blocks.",
+    ),
     i_know_what_im_doing: Optional[bool] = typer.Option(
         False,
         "--i-know-what-im-doing",
@@ -266,11 +416,19 @@ def callback(
 ):
     Config.hive_account = hive_account
     Config.hive_posting_key = hive_posting_key
+    Config.extra_hive_accounts = extra_hive_accounts
+    Config.extra_hive_posting_keys = extra_hive_posting_keys
     Config.sanity_check = sanity_check
     Config.livetest = livetest
     Config.dry_run = dry_run
+    Config.async_broadcast = async_broadcast
+    Config.broadcast_hedge_nodes = broadcast_hedge_nodes
+    Config.retry_budget = retry_budget
+    Config.rc_floor = rc_floor
     Config.status = status
     Config.ignore_config_updates = ignore_config_updates
+    Config.settings_cache_file = settings_cache_file
+    Config.settings_from_blocks = settings_from_blocks
     Config.i_know_what_im_doing = i_know_what_im_doing
     Config.debug = debug
 
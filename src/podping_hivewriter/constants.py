@@ -10,3 +10,17 @@ PODPING_SETTINGS_KEY = "podping-settings"
 
 # Operation JSON must be less than or equal to 8192 bytes.
 HIVE_CUSTOM_OP_DATA_MAX_LENGTH = 8192
+# Seconds between Hive blocks.
+HIVE_BLOCK_INTERVAL = 3
+# An account may only include this many custom_json operations in a block.
+HIVE_MAX_CUSTOM_OPS_PER_BLOCK = 5
+# Serialized transactions must be less than or equal to 64 KiB.
+HIVE_MAX_TRANSACTION_SIZE = 65536
+
+# Per-IRI status characters in the reply to a bulk request
+IRI_STATUS_OK = "O"
+IRI_STATUS_INVALID = "I"
+IRI_STATUS_BUSY = "B"
+
+# First frame of a bulk ZeroMQ request, never a valid IRI
+ZMQ_BULK_MARKER = b"BULK"
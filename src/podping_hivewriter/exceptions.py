@@ -1,2 +1,6 @@
 class PodpingCustomJsonPayloadExceeded(RuntimeError):
     """Raise when the size of a json string exceeds the custom_json payload limit"""
+
+
+class HiveRpcError(RuntimeError):
+    """Raise when a Hive node answers a JSON-RPC call with an error"""
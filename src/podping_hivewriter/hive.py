@@ -1,35 +1,101 @@
 import asyncio
 import logging
-from typing import Iterable, Optional, List
+import threading
+from typing import Dict, FrozenSet, Iterable, Optional, List, Tuple
+from weakref import WeakKeyDictionary
 
 import beem
 from beemapi.exceptions import NumRetriesReached
 
+from podping_hivewriter.async_wrapper import sync_to_async
+
+
+def _new_hive(
+    nodes: Tuple[str, ...],
+    posting_keys: Optional[List[str]] = None,
+    nobroadcast: Optional[bool] = False,
+) -> beem.Hive:
+    if posting_keys:
+        # Beem's expected type for nodes not set correctly
+        # noinspection PyTypeChecker
+        return beem.Hive(
+            node=nodes,
+            keys=posting_keys,
+            nobroadcast=nobroadcast,
+            num_retries=5,
+        )
+
+    # noinspection PyTypeChecker
+    return beem.Hive(node=nodes, nobroadcast=nobroadcast, num_retries=5)
+
+
+# beem connects to a node while constructing, keep that off the event loop
+new_hive = sync_to_async(_new_hive, thread_sensitive=False)
+
+HiveClientKey = Tuple[str, FrozenSet[str], bool]
+
+# A beem client's RPC connection isn't thread-safe.  Calls into one from the
+# thread pool hold its lock, so concurrent broadcasts take turns per client.
+_hive_locks: "WeakKeyDictionary[beem.Hive, threading.Lock]" = WeakKeyDictionary()
+_hive_locks_lock = threading.Lock()
+
+
+def hive_lock(hive: beem.Hive) -> threading.Lock:
+    with _hive_locks_lock:
+        lock = _hive_locks.get(hive)
+        if lock is None:
+            lock = _hive_locks[hive] = threading.Lock()
+        return lock
+
+
+# Clients already built, by the node they use first, their keys and whether
+# they broadcast.  Each keeps its HTTP session and the chain config it
+# fetched when it connected, so handing one out again costs nothing.
+_hive_clients: Dict[HiveClientKey, beem.Hive] = {}
+
+
+def _client_key(
+    nodes: Tuple[str, ...],
+    posting_keys: Optional[List[str]] = None,
+    nobroadcast: Optional[bool] = False,
+) -> HiveClientKey:
+    return nodes[0], frozenset(posting_keys or ()), bool(nobroadcast)
+
+
+def get_cached_hive(
+    nodes: Iterable[str],
+    posting_keys: Optional[List[str]] = None,
+    nobroadcast: Optional[bool] = False,
+) -> beem.Hive:
+    """Blocking version of get_hive, without retries"""
+    nodes = tuple(nodes)
+    key = _client_key(nodes, posting_keys, nobroadcast)
+    hive = _hive_clients.get(key)
+    if hive is None:
+        hive = _hive_clients.setdefault(
+            key, _new_hive(nodes, posting_keys, nobroadcast)
+        )
+    return hive
+
 
 async def get_hive(
     nodes: Iterable[str],
     posting_keys: Optional[List[str]] = None,
     nobroadcast: Optional[bool] = False,
 ) -> beem.Hive:
+    """A client using nodes[0] first, reusing one from earlier if we can"""
     nodes = tuple(nodes)
+    key = _client_key(nodes, posting_keys, nobroadcast)
+    hive = _hive_clients.get(key)
+    if hive is not None:
+        return hive
+
     errors = 0
     while True:
         try:
-            if posting_keys:
-                # Beem's expected type for nodes not set correctly
-                # noinspection PyTypeChecker
-                hive = beem.Hive(
-                    node=nodes,
-                    keys=posting_keys,
-                    nobroadcast=nobroadcast,
-                    num_retries=5,
-                )
-
-            else:
-                # noinspection PyTypeChecker
-                hive = beem.Hive(node=nodes, nobroadcast=nobroadcast, num_retries=5)
-
-            return hive
+            hive = await new_hive(nodes, posting_keys, nobroadcast)
+            # Another task may have built one meanwhile, keep using the first
+            return _hive_clients.setdefault(key, hive)
 
         except NumRetriesReached:
             logging.warning(
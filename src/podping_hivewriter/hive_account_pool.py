@@ -0,0 +1,153 @@
+import asyncio
+import logging
+from collections import defaultdict, deque
+from contextlib import asynccontextmanager
+from timeit import default_timer as timer
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+import beem
+from beem.account import Account
+
+from podping_hivewriter.async_context import AsyncContext
+from podping_hivewriter.async_wrapper import sync_to_async
+from podping_hivewriter.constants import (
+    HIVE_BLOCK_INTERVAL,
+    HIVE_MAX_CUSTOM_OPS_PER_BLOCK,
+)
+from podping_hivewriter.hive import hive_lock
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+from podping_hivewriter.rc_governor import RC_FLOOR_PCT, RcGovernor
+
+
+def _get_rc_manabar(hive: beem.Hive, account_name: str) -> dict:
+    with hive_lock(hive):
+        account = Account(account_name, blockchain_instance=hive, lazy=True)
+        return account.get_rc_manabar()
+
+
+get_rc_manabar = sync_to_async(_get_rc_manabar, thread_sensitive=False)
+
+
+class HiveAccountPool(AsyncContext):
+    """The accounts we can post with.  Hands out whichever account has the most
+    resource credit headroom, counting broadcasts it's already busy with, and
+    keeps each account within the chain's custom operations per block limit."""
+
+    def __init__(
+        self,
+        accounts: List[str],
+        hive_wrapper: HiveWrapper,
+        settings_manager: PodpingSettingsManager,
+        daemon=True,
+        rc_floor_pct: float = RC_FLOOR_PCT,
+    ):
+        super().__init__()
+
+        # Keep the order given, the first account is the primary one
+        self.configured_accounts: List[str] = list(dict.fromkeys(accounts))
+        # The configured accounts we post with, see set_active
+        self.accounts: List[str] = list(self.configured_accounts)
+        self.hive_wrapper = hive_wrapper
+        self.settings_manager = settings_manager
+        self.daemon = daemon
+
+        self.rc_manabars: Dict[str, dict] = {}
+        self.rc_governor = RcGovernor(rc_floor_pct)
+        self._in_flight: Dict[str, int] = {
+            account: 0 for account in self.configured_accounts
+        }
+        # (time acquired, number of operations) for each account
+        self._recent_ops: Dict[str, Deque[Tuple[float, int]]] = defaultdict(deque)
+
+        self._startup_done = False
+        asyncio.ensure_future(self._startup())
+
+    async def _startup(self):
+        if self.daemon:
+            self._add_task(asyncio.create_task(self._update_rc_loop()))
+
+        self._startup_done = True
+
+    async def _update_rc_loop(self):
+        await self.hive_wrapper.wait_startup()
+        while True:
+            try:
+                await self.update_rc()
+                await self.settings_manager.sleep_period(
+                    lambda settings: settings.diagnostic_report_period
+                )
+            except Exception as e:
+                logging.error(e, exc_info=True)
+            except asyncio.CancelledError:
+                raise
+
+    async def update_rc(self) -> None:
+        hive = await self.hive_wrapper.get_hive()
+        for account in self.accounts:
+            try:
+                manabar = await get_rc_manabar(hive, account)
+                self.rc_manabars[account] = manabar
+                self.rc_governor.observe(account, manabar)
+            except Exception as e:
+                logging.warning(f"Unable to get RC for @{account}: {e}")
+
+    def set_active(self, accounts: Iterable[str]) -> None:
+        """Post only with these of the configured accounts, in the configured
+        order.  Accounts left out stay configured and may be made active
+        again."""
+        active = set(accounts)
+        self.accounts = [
+            account for account in self.configured_accounts if account in active
+        ]
+
+    def _headroom(self, account: str) -> float:
+        manabar = self.rc_manabars.get(account)
+        # Accounts we haven't measured yet are assumed to be full
+        current_mana = manabar["current_mana"] if manabar else float("inf")
+        return current_mana / (1 + self._in_flight.get(account, 0))
+
+    def _ops_in_current_block(self, account: str) -> int:
+        recent_ops = self._recent_ops[account]
+        cutoff = timer() - HIVE_BLOCK_INTERVAL
+        while recent_ops and recent_ops[0][0] < cutoff:
+            recent_ops.popleft()
+        return sum(num_ops for _, num_ops in recent_ops)
+
+    def best_account(
+        self, num_ops: int = 1, accounts: Optional[Iterable[str]] = None
+    ) -> Optional[str]:
+        """The account with the most headroom that can still fit num_ops
+        operations in the current block, if any, out of accounts (the active
+        accounts by default)"""
+        available = [
+            account
+            for account in (self.accounts if accounts is None else accounts)
+            if self._ops_in_current_block(account) + num_ops
+            <= HIVE_MAX_CUSTOM_OPS_PER_BLOCK
+        ]
+        if not available:
+            return None
+        # Ties, like accounts not measured yet, go to the least busy account
+        return max(
+            available,
+            key=lambda account: (self._headroom(account), -self._in_flight[account]),
+        )
+
+    @asynccontextmanager
+    async def acquire(self, num_ops: int = 1, account: Optional[str] = None):
+        """Borrow the account with the most headroom, or the given account,
+        for one broadcast of num_ops operations, waiting for the next block if
+        it has used up its operations for this one"""
+        accounts = None if account is None else [account]
+        account = self.best_account(num_ops, accounts)
+        while account is None:
+            await asyncio.sleep(HIVE_BLOCK_INTERVAL / 3)
+            account = self.best_account(num_ops, accounts)
+
+        self._recent_ops[account].append((timer(), num_ops))
+        self._in_flight[account] = self._in_flight.get(account, 0) + 1
+        try:
+            yield account
+        finally:
+            self._in_flight[account] -= 1
@@ -0,0 +1,84 @@
+import asyncio
+import itertools
+from typing import Any, Optional
+
+import aiohttp
+from beemapi.exceptions import (
+    CallRetriesReached,
+    NumRetriesReached,
+    RPCConnection,
+    RPCError,
+    RPCErrorDoRetry,
+    TimeoutException,
+    WorkingNodeMissing,
+)
+
+from podping_hivewriter.exceptions import HiveRpcError
+
+# Seconds to wait for a node to answer a single call
+HIVE_RPC_TIMEOUT = 10
+
+_request_ids = itertools.count(1)
+
+
+async def hive_rpc_call(
+    session: aiohttp.ClientSession,
+    node: str,
+    method: str,
+    params: Optional[Any] = None,
+    timeout: float = HIVE_RPC_TIMEOUT,
+) -> Any:
+    """Make one JSON-RPC call to a Hive node and return its result"""
+    data = {
+        "jsonrpc": "2.0",
+        "method": method,
+        "params": params if params is not None else [],
+        "id": next(_request_ids),
+    }
+    async with session.post(
+        node, json=data, timeout=aiohttp.ClientTimeout(total=timeout)
+    ) as response:
+        response.raise_for_status()
+        body = await response.json(content_type=None)
+
+    if "error" in body:
+        error = body["error"]
+        message = error.get("message", error) if isinstance(error, dict) else error
+        raise HiveRpcError(f"{node} {method}: {message}")
+    return body["result"]
+
+
+def is_duplicate_transaction_error(error: BaseException) -> bool:
+    """Whether a node refused a transaction because it already has it, which
+    for a transaction we sent means it's on its way to the chain"""
+    return "duplicate transaction" in str(error).lower()
+
+
+# Raised by beem when it can't reach a node or gets no usable answer
+_BEEM_NODE_FAULTS = (
+    CallRetriesReached,
+    NumRetriesReached,
+    RPCConnection,
+    RPCErrorDoRetry,
+    TimeoutException,
+    WorkingNodeMissing,
+    # Connection errors, from requests among others
+    OSError,
+)
+
+
+def is_node_fault(error: BaseException) -> bool:
+    """Whether a failed call reflects on the node: it couldn't be reached,
+    timed out, failed with a 5xx or sent back garbage.  Not when the node
+    answered with the chain's verdict on the request, such as too few
+    resource credits, an expired transaction or a missing authority."""
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    if isinstance(
+        error,
+        (aiohttp.ClientError, asyncio.TimeoutError, ValueError) + _BEEM_NODE_FAULTS,
+    ):
+        return True
+    # beem raises subclasses of RPCError for errors the node answered with,
+    # and RPCError itself for HTTP errors and replies it can't parse
+    return type(error) is RPCError
@@ -1,16 +1,119 @@
 import asyncio
 import logging
-from collections import deque
-from typing import List, Optional
+from timeit import default_timer as timer
+from typing import Callable, List, NamedTuple, Optional, Set, Tuple
 
+import aiohttp
 import beem
+from beem.exceptions import MissingKeyError
+from beem.transactionbuilder import TransactionBuilder
+from beembase import operations
 from beemapi.exceptions import NumRetriesReached
-from asgiref.sync import SyncToAsync
+from podping_hivewriter.async_broadcaster import AsyncBroadcaster
 from podping_hivewriter.async_context import AsyncContext
 from podping_hivewriter.async_wrapper import sync_to_async
-from podping_hivewriter.hive import get_hive
+from podping_hivewriter.constants import (
+    HIVE_MAX_CUSTOM_OPS_PER_BLOCK,
+    HIVE_MAX_TRANSACTION_SIZE,
+)
+from podping_hivewriter.exceptions import HiveRpcError
+from podping_hivewriter.hive import get_hive, hive_lock
+from podping_hivewriter.hive_rpc import (
+    hive_rpc_call,
+    is_duplicate_transaction_error,
+    is_node_fault,
+)
+from podping_hivewriter.node_health import NODE_PROBE_PERIOD, NodeHealth
+from podping_hivewriter.ref_block_cache import REF_BLOCK_REFRESH_PERIOD
+from podping_hivewriter.podping_payload import size_of_dict_as_json
+from podping_hivewriter.models.podping_settings import PodpingSettings
 from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
 
+# Generous estimates of the serialized size of a custom_json operation besides
+# its JSON, and of a transaction besides its operations, signatures included
+CUSTOM_JSON_OP_OVERHEAD = 128
+TRANSACTION_OVERHEAD = 512
+
+# Hedged broadcasts go to another node once the current one has taken longer
+# than this percentile of recent broadcasts, within these bounds, in seconds
+HEDGE_PERCENTILE = 0.95
+HEDGE_MIN_DELAY = 0.25
+HEDGE_DEFAULT_DELAY = 1.0
+
+
+# Called with a signed transaction, trx_id included, before it's sent
+OnSigned = Callable[[dict], None]
+
+
+def _sign_custom_json_ops(
+    hive: beem.Hive,
+    operation_id: str,
+    payloads: List[dict],
+    required_posting_auths: List[str],
+) -> Tuple[dict, str]:
+    """Sign one transaction holding a custom_json operation per payload,
+    returning it ready to broadcast and its trx_id.  Uses its own
+    TransactionBuilder rather than the shared hive.txbuffer that
+    hive.custom_json appends to."""
+    ops = [
+        operations.Custom_json(
+            **{
+                "json": payload,
+                "required_auths": [],
+                "required_posting_auths": required_posting_auths,
+                "id": operation_id,
+                "prefix": hive.prefix,
+            }
+        )
+        for payload in payloads
+    ]
+    with hive_lock(hive):
+        tx = TransactionBuilder(blockchain_instance=hive)
+        tx.appendOps(ops)
+        tx.appendSigner(required_posting_auths[0], "posting")
+        signed_tx = tx.sign()
+        return tx.json(), signed_tx.id
+
+
+sign_custom_json_ops = sync_to_async(_sign_custom_json_ops, thread_sensitive=False)
+
+
+def _broadcast_transaction(hive: beem.Hive, tx: dict) -> None:
+    """Broadcast an already signed transaction, the only RPC call needed"""
+    with hive_lock(hive):
+        hive.rpc.set_next_node_on_empty_reply(False)
+        hive.rpc.broadcast_transaction(tx, api="condenser")
+
+
+broadcast_transaction = sync_to_async(_broadcast_transaction, thread_sensitive=False)
+
+
+def group_custom_json_payloads(payloads: List[dict]) -> List[List[dict]]:
+    """Group payloads, in order, into as few transactions as the chain's
+    operation count and transaction size limits allow"""
+    groups: List[List[dict]] = []
+    group_size = TRANSACTION_OVERHEAD
+    for payload in payloads:
+        op_size = size_of_dict_as_json(payload) + CUSTOM_JSON_OP_OVERHEAD
+        if (
+            not groups
+            or len(groups[-1]) >= HIVE_MAX_CUSTOM_OPS_PER_BLOCK
+            or group_size + op_size > HIVE_MAX_TRANSACTION_SIZE
+        ):
+            groups.append([])
+            group_size = TRANSACTION_OVERHEAD
+        groups[-1].append(payload)
+        group_size += op_size
+    return groups
+
+
+class HiveClient(NamedTuple):
+    """A beem client along with the node order it was built with.  Never
+    modified, only replaced whole, so it can be read without a lock."""
+
+    nodes: Tuple[str, ...]
+    hive: beem.Hive
+
 
 class HiveWrapper(AsyncContext):
     def __init__(
@@ -19,6 +122,8 @@ class HiveWrapper(AsyncContext):
         settings_manager: PodpingSettingsManager,
         dry_run=False,
         daemon=True,
+        async_broadcast=False,
+        hedge_nodes=0,
     ):
         super().__init__()
 
@@ -26,84 +131,326 @@ class HiveWrapper(AsyncContext):
         self.settings_manager = settings_manager
         self.dry_run = dry_run
         self.daemon = daemon
+        self.async_broadcast = async_broadcast
+        # Extra nodes a slow broadcast may also be sent to
+        self.hedge_nodes = hedge_nodes
+        # Builds and signs transactions for both broadcast paths, and sends
+        # them itself when async_broadcast is set
+        self.async_broadcaster = AsyncBroadcaster(posting_keys, nobroadcast=dry_run)
 
-        self.nodes: Optional[deque[str]] = None
-        self._hive: Optional[beem.Hive] = None
-        self._custom_json: Optional[SyncToAsync] = None
-        self._hive_lock = asyncio.Lock()
+        self.node_health = NodeHealth()
+        self._client: Optional[HiveClient] = None
+        # The node order most recently asked for.  Building a client can take
+        # a while, one built for an older order isn't put in place.
+        self._wanted_nodes: Optional[Tuple[str, ...]] = None
+        settings_manager.subscribe(self._on_settings_changed)
 
         self._startup_done = False
         asyncio.ensure_future(self._startup())
 
     async def _startup(self):
         nodes = await self.settings_manager.get_nodes()
+        self.node_health.update_nodes(nodes)
 
-        self.nodes = deque(nodes)
-        async with self._hive_lock:
-            try:
-                self._hive: beem.Hive = await get_hive(
-                    nodes, self.posting_keys, nobroadcast=self.dry_run
-                )
-                self._custom_json = sync_to_async(
-                    self._hive.custom_json, thread_sensitive=False
-                )
-            except NumRetriesReached:
-                logging.error(f"Error in beem")
-                raise NumRetriesReached
-            except Exception as ex:
-                logging.error(f"Error in beem {ex.__repr__()}")
-                raise ex
+        try:
+            await self._swap_client(nodes)
+        except NumRetriesReached:
+            logging.error(f"Error in beem")
+            raise NumRetriesReached
+        except Exception as ex:
+            logging.error(f"Error in beem {ex.__repr__()}")
+            raise ex
 
         if self.daemon:
-            self._add_task(asyncio.create_task(self._rotate_nodes_loop()))
+            self._add_task(asyncio.create_task(self._node_health_loop()))
+            self._add_task(asyncio.create_task(self._ref_block_loop()))
 
         self._startup_done = True
 
+    def close(self):
+        super().close()
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            return
+        loop.create_task(self.async_broadcaster.close())
+
     async def wait_startup(self):
         settings = await self.settings_manager.get_settings()
         while not self._startup_done:
             await asyncio.sleep(settings.hive_operation_period)
 
-    async def _rotate_nodes_loop(self):
+    async def _node_health_loop(self):
         await self.wait_startup()
         while True:
             try:
                 nodes = await self.settings_manager.get_nodes()
-                if set(self.nodes) == set(nodes):
-                    await self.rotate_nodes()
-                else:
-                    self.nodes = deque(nodes)
-                settings = await self.settings_manager.get_settings()
-                await asyncio.sleep(settings.diagnostic_report_period)
+                if set(self.node_health.nodes) != set(nodes):
+                    self.node_health.update_nodes(nodes)
+                await self.node_health.probe_all(await self.get_session())
+                logging.debug(f"Hive nodes: {self.node_health.summary()}")
+                await self.select_node()
             except Exception as e:
                 logging.error(e, exc_info=True)
             except asyncio.CancelledError:
                 raise
+            await asyncio.sleep(NODE_PROBE_PERIOD)
+
+    async def _on_settings_changed(
+        self, old_settings: PodpingSettings, settings: PodpingSettings
+    ):
+        # Move to the new node list now rather than at the next probe
+        if self._startup_done and settings.main_nodes != old_settings.main_nodes:
+            self.node_health.update_nodes(settings.main_nodes)
+            await self.select_node()
+
+    async def _ref_block_loop(self):
+        await self.wait_startup()
+        while True:
+            try:
+                session = await self.get_session()
+                await self.async_broadcaster.ref_block_cache.refresh(
+                    session, self.nodes[0]
+                )
+            except Exception as e:
+                # Transactions fetch one themselves once it's too old
+                logging.warning(f"Unable to refresh the reference block: {e!r}")
+            except asyncio.CancelledError:
+                raise
+            await asyncio.sleep(REF_BLOCK_REFRESH_PERIOD)
+
+    @property
+    def nodes(self) -> Optional[Tuple[str, ...]]:
+        client = self._client
+        return client.nodes if client else None
+
+    async def _swap_client(self, nodes) -> HiveClient:
+        """Build a client for the given nodes and put it in place of the
+        current one, unless another node order was asked for meanwhile.
+        Broadcasts already running keep the client they started with, and
+        nothing waits for the build but the caller."""
+        nodes = tuple(nodes)
+        self._wanted_nodes = nodes
+        hive = await get_hive(nodes, self.posting_keys, nobroadcast=self.dry_run)
+        client = HiveClient(nodes, hive)
+        if self._wanted_nodes == nodes:
+            self._client = client
+        return client
+
+    async def select_node(self) -> HiveClient:
+        """Switch to the healthiest node, with the rest ranked behind it for
+        beem to fall back on, unless we're using it already"""
+        client = self._client
+        current = client.nodes[0] if client else None
+        best = self.node_health.best_node(current)
+        nodes = (best,) + tuple(
+            node for node in self.node_health.ranked_nodes() if node != best
+        )
+        if client and current == best and set(client.nodes) == set(nodes):
+            self._wanted_nodes = client.nodes
+            return client
+        if best != current:
+            logging.info(f"Switching Hive node from {current} to {best}")
+        return await self._swap_client(nodes)
 
     async def rotate_nodes(self):
-        async with self._hive_lock:
-            logging.debug(f"Rotating Hive nodes")
-            self.nodes.rotate(1)
-            self._hive = await get_hive(
-                self.nodes, self.posting_keys, nobroadcast=self.dry_run
-            )
-            self._custom_json = sync_to_async(
-                self._hive.custom_json, thread_sensitive=False
-            )
-            logging.debug(f"New Hive Nodes in use: {self._hive}")
+        """Called after a failed broadcast, which has already counted
+        against the node, so this usually moves to another one"""
+        client = await self.select_node()
+        logging.debug(f"Hive Nodes in use: {client.hive}")
 
     async def custom_json(
         self, operation_id: str, payload: dict, required_posting_auths: List[str]
     ):
+        return await self.custom_json_ops(
+            operation_id, [payload], required_posting_auths
+        )
+
+    async def custom_json_ops(
+        self,
+        operation_id: str,
+        payloads: List[dict],
+        required_posting_auths: List[str],
+        on_signed: Optional[OnSigned] = None,
+    ):
+        """Broadcast several custom_json operations in a single transaction.
+        Use group_custom_json_payloads to keep within the chain's limits.
+        on_signed is handed the transaction once it's signed, before it's
+        sent, so it can be looked for in blocks that arrive meanwhile."""
         await self.wait_startup()
-        async with self._hive_lock:
-            # noinspection PyTypeChecker
-            return await self._custom_json(
-                id=operation_id,
-                json_data=payload,
-                required_posting_auths=required_posting_auths,
+        client = self._client
+        try:
+            return await self._broadcast(
+                client, operation_id, payloads, required_posting_auths, on_signed
+            )
+        except MissingKeyError:
+            raise
+        except Exception:
+            # In case the reference block was forked out
+            self.async_broadcaster.ref_block_cache.invalidate()
+            raise
+
+    async def _broadcast(
+        self,
+        client: HiveClient,
+        operation_id: str,
+        payloads: List[dict],
+        required_posting_auths: List[str],
+        on_signed: Optional[OnSigned] = None,
+    ) -> dict:
+        try:
+            signed_tx = await self.async_broadcaster.sign_custom_json_ops(
+                client.nodes[0],
+                client.hive.chain_params,
+                operation_id,
+                payloads,
+                required_posting_auths,
+            )
+            ret, trx_id = signed_tx.json(), signed_tx.id
+        except Exception as e:
+            # Let beem build it, at the cost of a few more round trips.  That
+            # includes finding a posting key we couldn't, beem resolves more
+            # kinds of authority and raises MissingKeyError itself if it can't.
+            logging.warning(f"Unable to build transaction, using beem: {e!r}")
+            ret, trx_id = await self._beem_sign(
+                client, operation_id, payloads, required_posting_auths
+            )
+
+        if on_signed:
+            on_signed(dict(ret, trx_id=trx_id))
+        if self.dry_run:
+            logging.info("Not broadcasting anything!")
+        else:
+            try:
+                await self._send_hedged(client, ret)
+            except HiveRpcError:
+                # The node answered, beem would get the same answer
+                raise
+            except Exception as e:
+                if not self.async_broadcast:
+                    raise
+                logging.warning(f"Async broadcast failed, falling back to beem: {e!r}")
+                # The same signed transaction, so it can't be posted twice
+                try:
+                    await broadcast_transaction(client.hive, ret)
+                except Exception as beem_error:
+                    if not is_duplicate_transaction_error(beem_error):
+                        raise
+        ret["trx_id"] = trx_id
+        return ret
+
+    async def _beem_sign(
+        self,
+        client: HiveClient,
+        operation_id: str,
+        payloads: List[dict],
+        required_posting_auths: List[str],
+    ) -> Tuple[dict, str]:
+        try:
+            return await sign_custom_json_ops(
+                client.hive, operation_id, payloads, required_posting_auths
             )
+        except Exception as e:
+            # Beem asks the node for the reference block and the account
+            self._record_error(client.nodes[0], e)
+            raise
+
+    def _record_error(self, node: str, error: Exception) -> None:
+        """Count a failed request against the node only if it's to blame"""
+        if is_node_fault(error):
+            self.node_health.record_failure(node)
+        elif not isinstance(error, MissingKeyError):
+            self.node_health.record_answer(node)
+
+    def hedge_delay(self) -> float:
+        """How long to wait on a node before sending to the next one"""
+        latency = self.node_health.broadcast_latency_percentile(HEDGE_PERCENTILE)
+        if latency is None:
+            return HEDGE_DEFAULT_DELAY
+        return max(latency, HEDGE_MIN_DELAY)
+
+    async def _send_hedged(self, client: HiveClient, tx: dict) -> None:
+        """Send a signed transaction to the node in use.  If it hasn't
+        answered within hedge_delay(), or fails, send the same transaction to
+        the next best node as well, up to hedge_nodes extra nodes.  The first
+        to accept it wins."""
+        primary = client.nodes[0]
+        nodes = [primary] + [
+            node
+            for node in self.node_health.ranked_nodes()
+            if node != primary and self.node_health.stats[node].breaker.available
+        ][: self.hedge_nodes]
+        delay = self.hedge_delay()
+
+        pending: Set[asyncio.Task] = set()
+        error: Optional[BaseException] = None
+        try:
+            for i, node in enumerate(nodes):
+                if i > 0:
+                    logging.info(f"Hedging broadcast to {node}")
+                pending.add(
+                    asyncio.create_task(self._send_transaction(client, node, tx))
+                )
+                # Once every node has it, wait for as long as it takes
+                timeout = delay if i < len(nodes) - 1 else None
+                while pending:
+                    done, pending = await asyncio.wait(
+                        pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                    )
+                    if not done:
+                        # Too slow, on to the next node
+                        break
+                    for task in done:
+                        task_error = task.exception()
+                        if task_error is None:
+                            return
+                        error = task_error
+            raise error
+        finally:
+            for task in pending:
+                task.cancel()
 
-    async def get_hive(self):
-        async with self._hive_lock:
-            return self._hive
+    async def _send_transaction(self, client: HiveClient, node: str, tx: dict) -> None:
+        self.node_health.begin_request(node)
+        start = timer()
+        try:
+            if self.async_broadcast:
+                session = await self.get_session()
+                await hive_rpc_call(
+                    session, node, "condenser_api.broadcast_transaction", [tx]
+                )
+            else:
+                if node == client.nodes[0]:
+                    hive = client.hive
+                else:
+                    hive = await get_hive(
+                        (node,) + tuple(n for n in client.nodes if n != node),
+                        self.posting_keys,
+                        nobroadcast=self.dry_run,
+                    )
+                await broadcast_transaction(hive, tx)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            if not is_duplicate_transaction_error(e):
+                self._record_error(node, e)
+                raise
+            # Another node got it to the chain first
+            logging.debug(f"{node} already has transaction: {e}")
+        self.node_health.record_broadcast(node, timer() - start)
+
+    async def rebroadcast(self, tx: dict) -> None:
+        """Send an already signed transaction again, say if it hasn't made
+        it into a block.  Nodes that already have it count as success."""
+        await self.wait_startup()
+        if self.dry_run:
+            return
+        await self._send_hedged(self._client, tx)
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        """The aiohttp session shared by our direct JSON-RPC calls"""
+        return await self.async_broadcaster.get_session()
+
+    async def get_hive(self) -> beem.Hive:
+        await self.wait_startup()
+        return self._client.hive
@@ -0,0 +1,192 @@
+import asyncio
+import logging
+from collections import deque
+from datetime import datetime
+from timeit import default_timer as timer
+from typing import Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+from podping_hivewriter.block_stream import BlockStream
+from podping_hivewriter.constants import HIVE_BLOCK_INTERVAL
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.ref_block_cache import HIVE_TIME_FORMAT
+
+# Send a transaction again if it isn't in a block this long after it was
+# last sent, in case the node dropped it
+REBROADCAST_AFTER = 4 * HIVE_BLOCK_INTERVAL
+# Inclusion latencies kept for the status report
+INCLUSION_LATENCY_SAMPLES = 200
+
+OnExpired = Callable[[], Awaitable[None]]
+OnConfirmed = Callable[[], Awaitable[None]]
+
+
+class PendingTransaction:
+    def __init__(
+        self,
+        tx: dict,
+        on_expired: OnExpired,
+        on_confirmed: Optional[OnConfirmed] = None,
+    ):
+        self.trx_id: str = tx["trx_id"]
+        # As it was signed, ready to send again
+        self.tx = {key: value for key, value in tx.items() if key != "trx_id"}
+        self.expiration = datetime.strptime(tx["expiration"], HIVE_TIME_FORMAT)
+        self.on_expired = on_expired
+        self.on_confirmed = on_confirmed
+
+        self.sent_at = timer()
+        self.last_sent_at = self.sent_at
+        # The head block it was seen in, which a fork may yet undo
+        self.block_num: Optional[int] = None
+        self.confirming = False
+
+
+class InclusionTracker:
+    """Follows the transactions we broadcast until they're in an irreversible
+    block.  One that's slow to show up is sent again as is, one that expires
+    without showing up is handed back through its on_expired callback to be
+    built anew.  One that was in a head block the chain forked away from is
+    followed again as if it had never been seen.  One that's irreversible is
+    reported through its on_confirmed callback, if it has one."""
+
+    def __init__(self, hive_wrapper: HiveWrapper, block_stream: BlockStream):
+        self.hive_wrapper = hive_wrapper
+        self.block_stream = block_stream
+
+        self.pending: Dict[str, PendingTransaction] = {}
+        self.total_confirmed = 0
+        self.total_forked = 0
+        self.total_expired = 0
+        self.total_rebroadcasts = 0
+        self.inclusion_latencies: Deque[float] = deque(maxlen=INCLUSION_LATENCY_SAMPLES)
+
+        self._tasks: Set[asyncio.Task] = set()
+        block_stream.subscribe(self._on_block)
+
+    def track(
+        self,
+        tx: dict,
+        on_expired: OnExpired,
+        on_confirmed: Optional[OnConfirmed] = None,
+    ) -> bool:
+        """Follow tx, returning False if it can't be followed"""
+        # Nothing would ever confirm it without a block stream running
+        if not self.block_stream.daemon:
+            return False
+        pending = PendingTransaction(tx, on_expired, on_confirmed)
+        self.pending[pending.trx_id] = pending
+        return True
+
+    def untrack(self, trx_id: str) -> None:
+        """Stop following a transaction, say if it couldn't be broadcast"""
+        self.pending.pop(trx_id, None)
+
+    def _spawn(self, coro: Awaitable[None]) -> None:
+        async def run():
+            try:
+                await coro
+            except Exception as e:
+                logging.error(e, exc_info=True)
+
+        task = asyncio.create_task(run())
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _rebroadcast(self, pending: PendingTransaction) -> None:
+        logging.info(f"Transaction {pending.trx_id} not in a block yet, sending again")
+        try:
+            await self.hive_wrapper.rebroadcast(pending.tx)
+        except Exception as e:
+            # Tried again after REBROADCAST_AFTER, until it expires
+            logging.warning(f"Unable to rebroadcast {pending.trx_id}: {e!r}")
+
+    async def _on_block(self, block: dict) -> None:
+        now = timer()
+        block_num = block["block_num"]
+        for trx_id in block.get("transaction_ids", []):
+            pending = self.pending.get(trx_id)
+            if pending and pending.block_num is None:
+                pending.block_num = block_num
+                latency = now - pending.sent_at
+                self.inclusion_latencies.append(latency)
+                logging.debug(
+                    f"Transaction {trx_id} in block {block_num} after {latency:0.1f}s"
+                )
+
+        last_irreversible_block_num = self.block_stream.last_irreversible_block_num
+        block_time = datetime.strptime(block["timestamp"], HIVE_TIME_FORMAT)
+        to_confirm: Dict[int, List[PendingTransaction]] = {}
+        for trx_id, pending in list(self.pending.items()):
+            if pending.block_num is not None:
+                if (
+                    pending.block_num <= (last_irreversible_block_num or 0)
+                    and not pending.confirming
+                ):
+                    pending.confirming = True
+                    to_confirm.setdefault(pending.block_num, []).append(pending)
+            elif block_time > pending.expiration:
+                del self.pending[trx_id]
+                self.total_expired += 1
+                logging.warning(
+                    f"Transaction {trx_id} expired without making it into a block"
+                )
+                self._spawn(pending.on_expired())
+            elif now - pending.last_sent_at >= REBROADCAST_AFTER:
+                pending.last_sent_at = now
+                self.total_rebroadcasts += 1
+                self._spawn(self._rebroadcast(pending))
+
+        for irreversible_block_num, pendings in to_confirm.items():
+            self._spawn(self._confirm(irreversible_block_num, pendings))
+
+    async def _confirm(
+        self, block_num: int, pendings: List[PendingTransaction]
+    ) -> None:
+        """Check the now irreversible block still holds the transactions seen
+        at its height, it may not be the head block they were seen in"""
+        try:
+            block = await self.block_stream.get_block(block_num)
+        except Exception as e:
+            block = None
+            logging.warning(f"Unable to fetch block {block_num}: {e!r}")
+
+        for pending in pendings:
+            pending.confirming = False
+            if block is None:
+                # Checked again with the next block
+                continue
+            if self.pending.get(pending.trx_id) is not pending:
+                continue
+            transaction_ids = block.get("transaction_ids", [])
+            if pending.trx_id in transaction_ids:
+                del self.pending[pending.trx_id]
+                self.total_confirmed += 1
+                if pending.on_confirmed:
+                    self._spawn(pending.on_confirmed())
+            else:
+                logging.warning(
+                    f"Transaction {pending.trx_id} was in a block {block_num} "
+                    f"the chain forked away from"
+                )
+                self.total_forked += 1
+                # Sent again, or built anew once it expires, like any other
+                # transaction not in a block
+                pending.block_num = None
+
+    def summary(self) -> str:
+        if self.inclusion_latencies:
+            latencies = self.inclusion_latencies
+            latency = (
+                f"{sum(latencies) / len(latencies):0.1f}s avg, "
+                f"{max(latencies):0.1f}s max"
+            )
+        else:
+            latency = "-"
+        return (
+            f"Pending: {len(self.pending)} - "
+            f"Confirmed: {self.total_confirmed} - "
+            f"Forked out: {self.total_forked} - "
+            f"Expired: {self.total_expired} - "
+            f"Rebroadcasts: {self.total_rebroadcasts} - "
+            f"Inclusion latency: {latency}"
+        )
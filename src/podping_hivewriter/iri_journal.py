@@ -0,0 +1,109 @@
+import asyncio
+import sqlite3
+from typing import Iterable, List, Optional, Tuple
+
+from podping_hivewriter.async_wrapper import sync_to_async
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    # fsync the log on every commit, there's one commit per group of appends
+    conn.execute("PRAGMA synchronous=FULL")
+    with conn:
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS iris "
+            "(id INTEGER PRIMARY KEY AUTOINCREMENT, iri TEXT NOT NULL)"
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS iris_iri ON iris (iri)")
+    return conn
+
+
+def _last_id(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT coalesce(max(id), 0) FROM iris").fetchone()[0]
+
+
+def _append(conn: sqlite3.Connection, iris: List[str]) -> int:
+    with conn:
+        conn.executemany("INSERT INTO iris (iri) VALUES (?)", ((iri,) for iri in iris))
+        return _last_id(conn)
+
+
+def _remove(conn: sqlite3.Connection, iris: List[str], up_to_id: int) -> None:
+    with conn:
+        conn.executemany(
+            "DELETE FROM iris WHERE iri = ? AND id <= ?",
+            ((iri, up_to_id) for iri in iris),
+        )
+
+
+def _unsent(conn: sqlite3.Connection) -> List[str]:
+    rows = conn.execute("SELECT iri FROM iris GROUP BY iri ORDER BY min(id)")
+    return [iri for iri, in rows]
+
+
+class IriJournal:
+    """Accepted IRIs that haven't been broadcast yet, in an SQLite database in
+    WAL mode, so they outlive a crash or restart.
+
+    Appends are committed in groups: whatever arrives while one commit is
+    being written goes into the next, so under load many appends share a
+    single fsync."""
+
+    def __init__(self, path: str):
+        self.path = path
+
+        self._conn = _connect(path)
+        # Highest ID appended, every IRI queued so far has one no higher
+        self.last_id: int = _last_id(self._conn)
+        self.total_commits = 0
+
+        self._pending: List[Tuple[List[str], asyncio.Future]] = []
+        self._committer: Optional[asyncio.Task] = None
+        # One thread at a time on the connection
+        self._conn_lock = asyncio.Lock()
+
+    def close(self) -> None:
+        self._conn.close()
+
+    async def append(self, iris: List[str]) -> None:
+        """Returns once iris are safely on disk"""
+        future = asyncio.get_event_loop().create_future()
+        self._pending.append((iris, future))
+        if self._committer is None or self._committer.done():
+            self._committer = asyncio.ensure_future(self._commit_pending())
+        await future
+
+    async def _commit_pending(self) -> None:
+        while self._pending:
+            pending, self._pending = self._pending, []
+            iris = [iri for group, _ in pending for iri in group]
+            try:
+                async with self._conn_lock:
+                    last_id = await sync_to_async(_append, thread_sensitive=False)(
+                        self._conn, iris
+                    )
+            except Exception as e:
+                for _, future in pending:
+                    if not future.done():
+                        future.set_exception(e)
+            else:
+                self.last_id = last_id
+                self.total_commits += 1
+                for _, future in pending:
+                    if not future.done():
+                        future.set_result(None)
+
+    async def remove(self, iris: Iterable[str], up_to_id: int) -> None:
+        """Forget iris once they're confirmed on chain, up to the last ID appended
+        when they were batched.  Should an IRI have been accepted again since,
+        that later entry stays."""
+        async with self._conn_lock:
+            await sync_to_async(_remove, thread_sensitive=False)(
+                self._conn, list(iris), up_to_id
+            )
+
+    async def unsent(self) -> List[str]:
+        """Every IRI appended and not removed, oldest first"""
+        async with self._conn_lock:
+            return await sync_to_async(_unsent, thread_sensitive=False)(self._conn)
@@ -0,0 +1,42 @@
+import re
+from functools import lru_cache
+
+import rfc3987
+
+# Roughly the number of distinct feeds we expect to see pinged repeatedly
+IRI_VALIDATION_CACHE_SIZE = 2 ** 18
+# Longer strings are validated without being cached, holding the cache to
+# at most IRI_VALIDATION_CACHE_SIZE * IRI_VALIDATION_CACHE_MAX_LENGTH
+# characters whatever clients send.  Feed IRIs are far shorter.
+IRI_VALIDATION_CACHE_MAX_LENGTH = 512
+
+# A strict subset of RFC 3987 covering plain ASCII http(s) IRIs, which are the
+# vast majority of what we receive.  Anything it doesn't match, userinfo,
+# IP literals, non-ASCII or other schemes, is left to the full grammar.
+_PATH_CHARS = r"[A-Za-z0-9\-._~!$&'()*+,;=:@/]"
+_QUERY_CHARS = r"[A-Za-z0-9\-._~!$&'()*+,;=:@/?]"
+_PCT_ENCODED = r"%[0-9A-Fa-f]{2}"
+_FAST_HTTP_IRI = re.compile(
+    r"https?://[A-Za-z0-9\-._~]+(?::[0-9]*)?"
+    rf"(?:/{_PATH_CHARS}*(?:{_PCT_ENCODED}{_PATH_CHARS}*)*)?"
+    rf"(?:\?{_QUERY_CHARS}*(?:{_PCT_ENCODED}{_QUERY_CHARS}*)*)?"
+    rf"(?:#{_QUERY_CHARS}*(?:{_PCT_ENCODED}{_QUERY_CHARS}*)*)?"
+)
+
+
+def _is_valid_iri(iri: str) -> bool:
+    if _FAST_HTTP_IRI.fullmatch(iri):
+        return True
+    return rfc3987.match(iri, "IRI") is not None
+
+
+_is_valid_iri_cached = lru_cache(maxsize=IRI_VALIDATION_CACHE_SIZE)(_is_valid_iri)
+
+
+def is_valid_iri(iri: str) -> bool:
+    """Equivalent to bool(rfc3987.match(iri, "IRI")), but only falls back to
+    the full (slow) RFC 3987 grammar when the quick check can't vouch for it.
+    Results for IRIs of a sensible length are memoized."""
+    if len(iri) > IRI_VALIDATION_CACHE_MAX_LENGTH:
+        return _is_valid_iri(iri)
+    return _is_valid_iri_cached(iri)
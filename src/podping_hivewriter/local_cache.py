@@ -0,0 +1,20 @@
+import json
+import os
+from typing import Any
+
+
+def podping_cache_dir() -> str:
+    """Where podping keeps what it caches between runs"""
+    cache_dir = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(cache_dir, "podping-hivewriter")
+
+
+def write_json_atomically(path: str, data: Any) -> None:
+    """Replace the file at path whole, so a reader never sees half of it"""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(tmp_path, path)
@@ -1,5 +1,5 @@
 import uuid
-from typing import Set
+from typing import Optional, Set
 
 from pydantic import BaseModel, validator
 
@@ -7,6 +7,8 @@ from pydantic import BaseModel, validator
 class IRIBatch(BaseModel):
     batch_id: uuid.UUID
     iri_set: Set[str]
+    # IriJournal.last_id when the batch was made, if there's a journal
+    journal_id: Optional[int] = None
 
     @validator("batch_id", pre=True, always=True)
     def default_batch_id(cls, v: uuid.UUID) -> uuid.UUID:
@@ -4,7 +4,11 @@ from pydantic import BaseModel, validator
 
 
 class PodpingSettings(BaseModel):
-    """Dataclass for settings we will fetch from Hive"""
+    """Dataclass for settings we will fetch from Hive.  Immutable, a change
+    replaces the whole object."""
+
+    class Config:
+        allow_mutation = False
 
     hive_operation_period: int = 3
     max_url_list_bytes: int = 7500
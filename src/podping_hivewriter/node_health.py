@@ -0,0 +1,246 @@
+import asyncio
+import logging
+from collections import deque
+from enum import Enum
+from timeit import default_timer as timer
+from typing import Deque, Dict, Iterable, Optional, Tuple
+
+import aiohttp
+
+from podping_hivewriter.hive_rpc import hive_rpc_call
+
+# Weight given to the newest sample in the rolling averages
+EWMA_ALPHA = 0.3
+# A node's latency is inflated by this much per unit of error rate when scored
+ERROR_RATE_PENALTY = 10
+# Consecutive failures that open a node's circuit breaker
+BREAKER_FAILURE_THRESHOLD = 3
+# Seconds an open breaker waits before letting a trial request through
+BREAKER_RESET_TIMEOUT = 60
+# Only move off a working node for one scoring at most this fraction of it
+NODE_SWITCH_RATIO = 0.8
+# Seconds between probes of every node, and how long a probe may take
+NODE_PROBE_PERIOD = 30
+NODE_PROBE_TIMEOUT = 5
+# Broadcast latencies kept, over all nodes, for percentiles
+BROADCAST_LATENCY_SAMPLES = 200
+# Fewer samples than this and there is no percentile
+BROADCAST_LATENCY_MIN_SAMPLES = 20
+
+
+async def probe_node(
+    session: aiohttp.ClientSession, node: str, timeout: float = NODE_PROBE_TIMEOUT
+) -> float:
+    """Time a lightweight call to a node, raising if it fails"""
+    start = timer()
+    await hive_rpc_call(
+        session, node, "condenser_api.get_dynamic_global_properties", timeout=timeout
+    )
+    return timer() - start
+
+
+class BreakerState(Enum):
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """Stops using a node after repeated failures.  Once reset_timeout has
+    passed it lets one trial request through (half-open), closing again if
+    that succeeds and staying open for another reset_timeout if not."""
+
+    def __init__(
+        self,
+        failure_threshold: int = BREAKER_FAILURE_THRESHOLD,
+        reset_timeout: float = BREAKER_RESET_TIMEOUT,
+    ):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+        self._opened_at = 0.0
+
+    @property
+    def available(self) -> bool:
+        """Closed, or ready to let a trial request through"""
+        return (
+            self.state == BreakerState.CLOSED
+            or timer() - self._opened_at >= self.reset_timeout
+        )
+
+    def begin_request(self) -> None:
+        if self.state != BreakerState.CLOSED:
+            # Hold off further trials until this one is given time to finish
+            self.state = BreakerState.HALF_OPEN
+            self._opened_at = timer()
+
+    def record_success(self) -> None:
+        self.state = BreakerState.CLOSED
+        self.consecutive_failures = 0
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        if (
+            self.state == BreakerState.HALF_OPEN
+            or self.consecutive_failures >= self.failure_threshold
+        ):
+            self.state = BreakerState.OPEN
+            self._opened_at = timer()
+
+
+def _ewma(average: Optional[float], sample: float) -> float:
+    if average is None:
+        return sample
+    return average + EWMA_ALPHA * (sample - average)
+
+
+class NodeStats:
+    """Rolling latency and error rate of a single node.  Scores use probe
+    latency only, since a broadcast takes several round trips and only the
+    node in use sees them."""
+
+    def __init__(self):
+        self.latency: Optional[float] = None
+        self.broadcast_latency: Optional[float] = None
+        self.error_rate = 0.0
+        self.breaker = CircuitBreaker()
+
+    def record_success(self, latency: Optional[float] = None) -> None:
+        if latency is not None:
+            self.latency = _ewma(self.latency, latency)
+        self.error_rate = _ewma(self.error_rate, 0.0)
+        self.breaker.record_success()
+
+    def record_broadcast(self, latency: float) -> None:
+        self.broadcast_latency = _ewma(self.broadcast_latency, latency)
+        self.record_success()
+
+    def record_failure(self) -> None:
+        self.error_rate = _ewma(self.error_rate, 1.0)
+        self.breaker.record_failure()
+
+    @property
+    def score(self) -> Optional[float]:
+        """Lower is better, None until the node has answered a probe"""
+        if self.latency is None:
+            return None
+        return self.latency * (1 + ERROR_RATE_PENALTY * self.error_rate)
+
+
+class NodeHealth:
+    """Tracks how well each Hive node is doing, from real requests as well
+    as periodic probes, and ranks them for use"""
+
+    def __init__(self, nodes: Iterable[str] = ()):
+        self.nodes: Tuple[str, ...] = ()
+        self.stats: Dict[str, NodeStats] = {}
+        self.broadcast_latencies: Deque[float] = deque(maxlen=BROADCAST_LATENCY_SAMPLES)
+        self.update_nodes(nodes)
+
+    def update_nodes(self, nodes: Iterable[str]) -> None:
+        """Follow a new node list, keeping what we know of nodes still in it"""
+        self.nodes = tuple(dict.fromkeys(nodes))
+        self.stats = {node: self.stats.get(node, NodeStats()) for node in self.nodes}
+
+    def begin_request(self, node: str) -> None:
+        if node in self.stats:
+            self.stats[node].breaker.begin_request()
+
+    def record_success(self, node: str, latency: float) -> None:
+        if node in self.stats:
+            self.stats[node].record_success(latency)
+
+    def record_answer(self, node: str) -> None:
+        """The node answered, if only to refuse the request"""
+        if node in self.stats:
+            self.stats[node].record_success()
+
+    def record_broadcast(self, node: str, latency: float) -> None:
+        self.broadcast_latencies.append(latency)
+        if node in self.stats:
+            self.stats[node].record_broadcast(latency)
+
+    def broadcast_latency_percentile(self, percentile: float) -> Optional[float]:
+        if len(self.broadcast_latencies) < BROADCAST_LATENCY_MIN_SAMPLES:
+            return None
+        latencies = sorted(self.broadcast_latencies)
+        index = min(int(percentile * len(latencies)), len(latencies) - 1)
+        return latencies[index]
+
+    def record_failure(self, node: str) -> None:
+        if node in self.stats:
+            self.stats[node].record_failure()
+
+    def ranked_nodes(self) -> Tuple[str, ...]:
+        """Every node, best first.  Measured nodes by score, then unmeasured
+        ones by error rate and configured order, then nodes with an open
+        breaker."""
+
+        def rank(index_node):
+            index, node = index_node
+            stats = self.stats[node]
+            score = stats.score
+            if score is None:
+                return not stats.breaker.available, True, stats.error_rate, index
+            return not stats.breaker.available, False, score, index
+
+        return tuple(node for _, node in sorted(enumerate(self.nodes), key=rank))
+
+    def best_node(self, current: Optional[str] = None) -> str:
+        """The node to use next.  Stays on current while it works unless
+        another node is clearly better."""
+        best = self.ranked_nodes()[0]
+        if current == best or current not in self.stats:
+            return best
+
+        current_stats = self.stats[current]
+        if not current_stats.breaker.available:
+            return best
+        current_score = current_stats.score
+        best_score = self.stats[best].score
+        if current_score is None and best_score is None:
+            if self.stats[best].error_rate < current_stats.error_rate:
+                return best
+            return current
+        if current_score is None:
+            return best
+        if best_score is None:
+            return current
+        if best_score <= current_score * NODE_SWITCH_RATIO:
+            return best
+        return current
+
+    async def probe(self, session: aiohttp.ClientSession, node: str) -> None:
+        self.begin_request(node)
+        try:
+            latency = await probe_node(session, node)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logging.debug(f"Probe of Hive node {node} failed: {e}")
+            self.record_failure(node)
+        else:
+            self.record_success(node, latency)
+
+    async def probe_all(self, session: aiohttp.ClientSession) -> None:
+        """Probe every node whose breaker would let a request through"""
+        await asyncio.gather(
+            *(
+                self.probe(session, node)
+                for node in self.nodes
+                if self.stats[node].breaker.available
+            )
+        )
+
+    def summary(self) -> str:
+        parts = []
+        for node in self.ranked_nodes():
+            stats = self.stats[node]
+            latency = "-" if stats.latency is None else f"{stats.latency:0.3f}s"
+            parts.append(
+                f"{node} {latency} err {stats.error_rate:0.2f} "
+                f"{stats.breaker.state.value}"
+            )
+        return " | ".join(parts)
@@ -1,19 +1,20 @@
 import asyncio
-import json
 import logging
+import math
 import sys
 import uuid
 from datetime import datetime, timezone, timedelta
 from timeit import default_timer as timer
-from typing import Optional, Set, Tuple, List
+from typing import Dict, Iterable, Optional, Set, Tuple, List
 
-import beem
-import rfc3987
+from aiohttp import web
 from beem.account import Account
 from beem.exceptions import AccountDoesNotExistsException, MissingKeyError
 from beemapi.exceptions import UnhandledRPCError
 
+from podping_hivewriter.allowed_accounts import AllowedAccountsCache
 from podping_hivewriter.async_context import AsyncContext
+from podping_hivewriter.block_stream import BlockStream
 from podping_hivewriter.constants import (
     STARTUP_FAILED_HIVE_API_ERROR_EXIT_CODE,
     STARTUP_FAILED_INVALID_POSTING_KEY_EXIT_CODE,
@@ -21,21 +22,44 @@ from podping_hivewriter.constants import (
     STARTUP_OPERATION_ID,
     CURRENT_PODPING_VERSION,
     HIVE_CUSTOM_OP_DATA_MAX_LENGTH,
+    HIVE_MAX_CUSTOM_OPS_PER_BLOCK,
+    IRI_STATUS_OK,
+    IRI_STATUS_INVALID,
+    IRI_STATUS_BUSY,
+    ZMQ_BULK_MARKER,
 )
 from podping_hivewriter.exceptions import PodpingCustomJsonPayloadExceeded
-from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.hive import get_cached_hive
+from podping_hivewriter.hive_account_pool import HiveAccountPool, get_rc_manabar
+from podping_hivewriter.hive_wrapper import HiveWrapper, group_custom_json_payloads
+from podping_hivewriter.inclusion_tracker import (
+    InclusionTracker,
+    OnConfirmed,
+    OnExpired,
+)
+from podping_hivewriter.iri_journal import IriJournal
+from podping_hivewriter.iri_validation import is_valid_iri
 from podping_hivewriter.models.iri_batch import IRIBatch
+from podping_hivewriter.podping_payload import (
+    PodpingPayloadPacker,
+    pack_iris,
+    podping_payload,
+    size_of_dict_as_json,
+)
+from podping_hivewriter.models.podping_settings import PodpingSettings
 from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+from podping_hivewriter.rc_governor import RC_FLOOR_PCT
+from podping_hivewriter.retry_policy import RetryPolicy
+from podping_hivewriter.startup_cache import StartupCheckCache
+
+# ZeroMQ ROUTER requests received but not yet answered
+ZMQ_ROUTER_BACKLOG = 1000
 
 
 def utc_date_str() -> str:
     return datetime.utcnow().replace(tzinfo=timezone.utc).isoformat()
 
 
-def size_of_dict_as_json(payload: dict):
-    return len(json.dumps(payload, separators=(",", ":")).encode("UTF-8"))
-
-
 class PodpingHivewriter(AsyncContext):
     def __init__(
         self,
@@ -44,62 +68,168 @@ class PodpingHivewriter(AsyncContext):
         settings_manager: PodpingSettingsManager,
         listen_ip: str = "127.0.0.1",
         listen_port: int = 9999,
+        zmq_router=False,
+        http_port: Optional[int] = None,
+        iri_queue_high_water: int = 100000,
+        iri_batch_queue_high_water: int = 1000,
         operation_id="podping",
         resource_test=True,
         dry_run=False,
         daemon=True,
         status=True,
+        extra_accounts: Optional[List[str]] = None,
+        broadcast_concurrency: Optional[int] = None,
+        async_broadcast=False,
+        hedge_nodes=0,
+        retry_policy: Optional[RetryPolicy] = None,
+        rc_floor_pct: float = RC_FLOOR_PCT,
+        fast_start=False,
+        startup_cache_file: Optional[str] = None,
+        iri_journal_file: Optional[str] = None,
     ):
         super().__init__()
 
+        # A queue bounded at zero would never refuse anything
+        if iri_queue_high_water < 1 or iri_batch_queue_high_water < 1:
+            raise ValueError("Queue high-water marks must be at least 1")
+
         self.server_account: str = server_account
-        self.required_posting_auths = [self.server_account]
         self.settings_manager = settings_manager
         self.listen_ip = listen_ip
         self.listen_port = listen_port
+        self.zmq_router: bool = zmq_router
+        self.http_port: Optional[int] = http_port
+        self.iri_queue_high_water: int = iri_queue_high_water
+        self.iri_batch_queue_high_water: int = iri_batch_queue_high_water
         self.posting_keys: List[str] = posting_keys
         self.operation_id: str = operation_id
         self.resource_test: bool = resource_test
         self.dry_run: bool = dry_run
         self.daemon: bool = daemon
         self.status: bool = status
+        # Defaults to one broadcast at a time per account
+        self.broadcast_concurrency: Optional[int] = broadcast_concurrency
+        self.retry_policy: RetryPolicy = retry_policy or RetryPolicy()
+        self.fast_start: bool = fast_start
+        self.startup_cache: Optional[StartupCheckCache] = (
+            StartupCheckCache(startup_cache_file) if startup_cache_file else None
+        )
+        # Accepted IRIs are written here before they're acknowledged
+        self.iri_journal: Optional[IriJournal] = (
+            IriJournal(iri_journal_file) if iri_journal_file else None
+        )
 
         self.hive_wrapper = HiveWrapper(
-            posting_keys, settings_manager, dry_run=dry_run, daemon=daemon
+            posting_keys,
+            settings_manager,
+            dry_run=dry_run,
+            daemon=daemon,
+            async_broadcast=async_broadcast,
+            hedge_nodes=hedge_nodes,
+        )
+        # posting_keys must hold a key for each of these accounts
+        self.account_pool = HiveAccountPool(
+            [server_account] + (extra_accounts or []),
+            self.hive_wrapper,
+            settings_manager,
+            daemon=daemon,
+            rc_floor_pct=rc_floor_pct,
         )
+        self.allowed_accounts = AllowedAccountsCache(
+            self.hive_wrapper, settings_manager, daemon=daemon
+        )
+        self.block_stream = BlockStream(self.hive_wrapper, daemon=daemon)
+        if settings_manager.push_updates and not settings_manager.ignore_updates:
+            self.block_stream.subscribe(settings_manager.on_block)
+        self.inclusion_tracker = InclusionTracker(self.hive_wrapper, self.block_stream)
 
         self.total_iris_recv = 0
         self.total_iris_sent = 0
+        self.total_iris_failed = 0
         self.total_iris_recv_deduped = 0
+        self.total_iris_busy = 0
+        self.total_operations_sent = 0
+        self.total_transactions_sent = 0
 
         self._iris_in_flight = 0
         self._iris_in_flight_lock = asyncio.Lock()
+        # Accepted by _receive_iri_requests and not yet put on iri_queue
+        self._iris_unqueued = 0
+
+        # ZeroMQ ROUTER identity -> (IRIs received, last seen time)
+        self.zmq_clients: Dict[bytes, Tuple[int, float]] = {}
 
-        self.iri_batch_queue: "asyncio.Queue[IRIBatch]" = asyncio.Queue()
+        # The batch queue blocks _iri_batch_loop once full.  iri_queue itself is
+        # unbounded, ingest refuses new IRIs once it reaches its high-water mark.
+        self.iri_batch_queue: "asyncio.Queue[IRIBatch]" = asyncio.Queue(
+            maxsize=iri_batch_queue_high_water
+        )
         self.iri_queue: "asyncio.Queue[str]" = asyncio.Queue()
 
+        settings_manager.subscribe(self._on_settings_changed)
+
         self.startup_datetime = datetime.utcnow()
         self.startup_time = timer()
 
         self._startup_done = False
         asyncio.ensure_future(self._startup())
 
+    def close(self):
+        super().close()
+        if self.iri_journal:
+            self.iri_journal.close()
+
     async def _startup(self):
+        if self.iri_journal:
+            await self._replay_journal()
+
+        if self.fast_start:
+            # Take IRIs straight away and check the accounts meanwhile
+            self._start_loops()
+            self._startup_done = True
+            # A failure is logged rather than ending the process, it's
+            # already taking IRIs and may well be able to send them
+            self._add_task(
+                asyncio.create_task(self._startup_checks(exit_on_failure=False))
+            )
+        else:
+            await self._startup_checks()
+            self._start_loops()
+            self._startup_done = True
+
+    async def _replay_journal(self):
+        """Queue the IRIs accepted before a restart that were never sent"""
+        iris = await self.iri_journal.unsent()
+        if not iris:
+            return
+        logging.info(f"Replaying {len(iris)} unsent IRIs from {self.iri_journal.path}")
+        for iri in iris:
+            self.iri_queue.put_nowait(iri)
+        async with self._iris_in_flight_lock:
+            self._iris_in_flight += len(iris)
+
+    async def _startup_checks(self, exit_on_failure: bool = True):
+        settings = await self.settings_manager.get_settings()
+        if self.startup_cache and self.startup_cache.is_fresh(
+            self.account_pool.configured_accounts,
+            settings.control_account,
+            self.resource_test and not self.dry_run,
+        ):
+            logging.info(
+                f"Startup checks passed recently, skipping them. "
+                f"Cached in {self.startup_cache.path}"
+            )
+            self.allowed_accounts.subscribe(self._on_allowed_accounts)
+            return
 
         try:
             hive = await self.hive_wrapper.get_hive()
             account = Account(self.server_account, blockchain_instance=hive, lazy=True)
-            settings = await self.settings_manager.get_settings()
 
-            allowed = get_allowed_accounts(
-                settings.main_nodes, settings.control_account
-            )
-            # TODO: Should we periodically check if the account is allowed
-            #  and shut down if not?
-            if self.server_account not in allowed:
-                logging.error(
-                    f"Account @{self.server_account} not authorised to send Podpings"
-                )
+            await self.allowed_accounts.get()
+            all_allowed = self._check_pool_accounts()
+            # Checked again whenever the allowed accounts change from here on
+            self.allowed_accounts.subscribe(self._on_allowed_accounts)
         except AccountDoesNotExistsException:
             logging.error(
                 f"Hive account @{self.server_account} does not exist, "
@@ -111,21 +241,77 @@ class PodpingHivewriter(AsyncContext):
             logging.error("Unknown error occurred", exc_info=True)
             raise
 
-        if self.resource_test and not self.dry_run:
-            await self.test_hive_resources(account, hive)
+        resource_tested = self.resource_test and not self.dry_run
+        if resource_tested:
+            await self.test_hive_resources(account, hive, exit_on_failure)
+
+        if self.startup_cache and all_allowed:
+            self.startup_cache.save(
+                self.account_pool.configured_accounts,
+                settings.control_account,
+                resource_tested,
+            )
 
+    def _check_pool_accounts(self) -> bool:
+        """Post with the configured accounts that are allowed to send
+        podpings, returning whether all of them are.  Worked out afresh each
+        time, so an account allowed again is used again."""
+        allowed = []
+        for pool_account in self.account_pool.configured_accounts:
+            if pool_account in self.allowed_accounts:
+                allowed.append(pool_account)
+            else:
+                logging.error(
+                    f"Account @{pool_account} not authorised to send Podpings"
+                )
+        previous = self.account_pool.accounts
+        # Never leave the pool empty, keep the primary account
+        self.account_pool.set_active(allowed + [self.server_account])
+        if self.account_pool.accounts != previous:
+            accounts = ", ".join(
+                f"@{account}" for account in self.account_pool.accounts
+            )
+            logging.info(f"Posting with Hive accounts: {accounts}")
+        return len(allowed) == len(self.account_pool.configured_accounts)
+
+    async def _on_settings_changed(
+        self, old_settings: PodpingSettings, settings: PodpingSettings
+    ):
+        """Running loops pick up the new settings at their next batch, retry
+        or report, this only says what changed"""
+        changes = [
+            f"{field}: {getattr(old_settings, field)!r} -> {value!r}"
+            for field, value in settings
+            if getattr(old_settings, field) != value
+        ]
+        logging.info(f"Podping settings changed - {' - '.join(changes)}")
+
+    async def _on_allowed_accounts(self, added: Set[str], removed: Set[str]):
+        self._check_pool_accounts()
+
+    def _start_loops(self):
         logging.info(f"Hive account: @{self.server_account}")
+        for extra_account in self.account_pool.configured_accounts[1:]:
+            logging.info(f"Extra Hive account: @{extra_account}")
 
         if self.daemon:
-            self._add_task(asyncio.create_task(self._zmq_response_loop()))
+            if self.zmq_router:
+                self._add_task(asyncio.create_task(self._zmq_router_loop()))
+            else:
+                self._add_task(asyncio.create_task(self._zmq_response_loop()))
+            if self.http_port:
+                self._add_task(asyncio.create_task(self._http_listener_loop()))
             self._add_task(asyncio.create_task(self._iri_batch_loop()))
-            self._add_task(asyncio.create_task(self._iri_batch_handler_loop()))
+            # Each handler takes batches off the queue and retries them on its
+            # own, so one failing broadcast doesn't hold up the others
+            for _ in range(
+                self.broadcast_concurrency or len(self.account_pool.configured_accounts)
+            ):
+                self._add_task(asyncio.create_task(self._iri_batch_handler_loop()))
             if self.status:
                 self._add_task(asyncio.create_task(self._hive_status_loop()))
 
-        self._startup_done = True
-
-    async def test_hive_resources(self, account, hive):
+    async def test_hive_resources(self, account, hive, exit_on_failure=True):
         logging.info(
             "Podping startup sequence initiated, please stand by, "
             "full bozo checks in operation..."
@@ -133,7 +319,8 @@ class PodpingHivewriter(AsyncContext):
 
         # noinspection PyBroadException
         try:  # Now post two custom json to test.
-            manabar = account.get_rc_manabar()
+            manabar = await get_rc_manabar(hive, self.server_account)
+            self.account_pool.rc_governor.observe(self.server_account, manabar)
             logging.info(
                 f"Testing Account Resource Credits"
                 f' - before {manabar.get("current_pct"):.2f}%'
@@ -148,21 +335,25 @@ class PodpingHivewriter(AsyncContext):
                 "hive": repr(hive),
             }
 
-            await self.send_notification(custom_json, STARTUP_OPERATION_ID)
+            await self._send_startup_notification(custom_json)
 
             logging.info("Testing Account Resource Credits.... 5s")
             settings = await self.settings_manager.get_settings()
             await asyncio.sleep(settings.hive_operation_period)
-            manabar_after = account.get_rc_manabar()
+            manabar_after = await get_rc_manabar(hive, self.server_account)
+            # The startup transaction is the first thing the RC model learns from
+            self.account_pool.rc_governor.observe(self.server_account, manabar_after)
             logging.info(
                 f"Testing Account Resource Credits"
                 f' - after {manabar_after.get("current_pct"):.2f}%'
             )
-            cost = manabar.get("current_mana") - manabar_after.get("current_mana")
-            if cost == 0:  # skip this test if we're going to get ZeroDivision
-                capacity = 1000000
-            else:
-                capacity = manabar_after.get("current_mana") / cost
+            capacity = self.account_pool.rc_governor.capacity(self.server_account)
+            if capacity is None:
+                cost = manabar.get("current_mana") - manabar_after.get("current_mana")
+                if cost <= 0:  # skip this test if we're going to get ZeroDivision
+                    capacity = 1000000
+                else:
+                    capacity = manabar_after.get("current_mana") / cost
             logging.info(f"Capacity for further podpings : {capacity:.1f}")
 
             custom_json["v"] = CURRENT_PODPING_VERSION
@@ -170,7 +361,7 @@ class PodpingHivewriter(AsyncContext):
             custom_json["message"] = "Podping startup complete"
             custom_json["hive"] = repr(hive)
 
-            await self.send_notification(custom_json, STARTUP_OPERATION_ID)
+            await self._send_startup_notification(custom_json)
 
             logging.info("Startup of Podping status: SUCCESS! Hit the BOOST Button.")
 
@@ -179,22 +370,33 @@ class PodpingHivewriter(AsyncContext):
                 "Startup of Podping status: FAILED!  Invalid posting key",
                 exc_info=True,
             )
-            logging.error("Exiting")
-            sys.exit(STARTUP_FAILED_INVALID_POSTING_KEY_EXIT_CODE)
+            exit_code = STARTUP_FAILED_INVALID_POSTING_KEY_EXIT_CODE
         except UnhandledRPCError as _:
             logging.error(
                 "Startup of Podping status: FAILED!  API error",
                 exc_info=True,
             )
-            logging.info("Exiting")
-            sys.exit(STARTUP_FAILED_HIVE_API_ERROR_EXIT_CODE)
+            exit_code = STARTUP_FAILED_HIVE_API_ERROR_EXIT_CODE
         except Exception as _:
             logging.error(
                 "Startup of Podping status: FAILED!  Unknown error",
                 exc_info=True,
             )
-            logging.error("Exiting")
-            sys.exit(STARTUP_FAILED_UNKNOWN_EXIT_CODE)
+            exit_code = STARTUP_FAILED_UNKNOWN_EXIT_CODE
+        else:
+            return
+
+        if not exit_on_failure:
+            logging.warning("Carrying on, IRIs are already being sent")
+            return
+        logging.error("Exiting")
+        sys.exit(exit_code)
+
+    async def _send_startup_notification(self, custom_json: dict):
+        # Counted against the server account's operations in the block, so it
+        # doesn't push a transaction sent meanwhile over the limit
+        async with self.account_pool.acquire(1, account=self.server_account):
+            await self.send_notification(custom_json, STARTUP_OPERATION_ID)
 
     async def wait_startup(self):
         settings = await self.settings_manager.get_settings()
@@ -205,37 +407,87 @@ class PodpingHivewriter(AsyncContext):
         while True:
             try:
                 await self.output_hive_status()
-                settings = await self.settings_manager.get_settings()
-                await asyncio.sleep(settings.diagnostic_report_period)
+                await self.settings_manager.sleep_period(
+                    lambda settings: settings.diagnostic_report_period
+                )
             except Exception as ex:
                 logging.error(f"{ex} occurred", exc_info=True)
             except asyncio.CancelledError:
                 raise
 
     async def _iri_batch_handler_loop(self):
-        """Opens and watches a queue and sends notifications to Hive one by one"""
+        """Opens and watches a queue and sends notifications to Hive,
+        combining batches that are ready at the same time into one transaction"""
         while True:
             try:
-                iri_batch = await self.iri_batch_queue.get()
+                iri_batches = [await self.iri_batch_queue.get()]
+                while (
+                    len(iri_batches) < HIVE_MAX_CUSTOM_OPS_PER_BLOCK
+                    and not self.iri_batch_queue.empty()
+                ):
+                    iri_batches.append(self.iri_batch_queue.get_nowait())
+
+                iri_set: Set[str] = set()
+                for iri_batch in iri_batches:
+                    iri_set.update(iri_batch.iri_set)
+
+                journal_id = (
+                    max(iri_batch.journal_id for iri_batch in iri_batches)
+                    if self.iri_journal
+                    else None
+                )
 
                 start = timer()
-                trx_id, failure_count = await self.failure_retry(iri_batch.iri_set)
+                try:
+                    trx_ids, failure_count = await self.failure_retry(
+                        iri_set, journal_id
+                    )
+                except asyncio.CancelledError:
+                    raise
+                except Exception as ex:
+                    # Let go of the batches rather than stop handling them for
+                    # good.  Still in the journal, if there is one.
+                    logging.error(f"Unable to send IRI batches: {ex}", exc_info=True)
+                    trx_ids, failure_count = [], 0
                 duration = timer() - start
 
-                self.iri_batch_queue.task_done()
+                for _ in iri_batches:
+                    self.iri_batch_queue.task_done()
                 async with self._iris_in_flight_lock:
-                    self._iris_in_flight -= len(iri_batch.iri_set)
+                    self._iris_in_flight -= sum(
+                        len(iri_batch.iri_set) for iri_batch in iri_batches
+                    )
 
                 hive = await self.hive_wrapper.get_hive()
                 last_node = hive.data["last_node"]
+                batch_ids = ", ".join(
+                    str(iri_batch.batch_id) for iri_batch in iri_batches
+                )
                 logging.info(
-                    f"Batch send time: {duration:0.2f} - trx_id: {trx_id} - "
-                    f"Failures: {failure_count} - IRI batch_id {iri_batch.batch_id} - "
-                    f"IRIs in batch: {len(iri_batch.iri_set)} - "
+                    f"Batch send time: {duration:0.2f} - trx_ids: {trx_ids} - "
+                    f"Failures: {failure_count} - IRI batch_ids {batch_ids} - "
+                    f"IRIs in batches: {len(iri_set)} - "
                     f"last_node: {last_node}"
                 )
             except asyncio.CancelledError:
                 raise
+            except Exception as ex:
+                logging.error(f"{ex} occurred", exc_info=True)
+
+    async def _remove_from_journal(self, iris: Iterable[str], journal_id: int):
+        try:
+            await self.iri_journal.remove(iris, journal_id)
+        except Exception as e:
+            # They'd only be sent again after a restart
+            logging.error(f"Unable to remove IRIs from the journal: {e!r}")
+
+    async def _drop_too_large(self, iri: str):
+        """Drop an IRI that can't fit in a payload even on its own"""
+        logging.error(f"IRI too large to send, dropping: {iri}")
+        async with self._iris_in_flight_lock:
+            self._iris_in_flight -= 1
+        if self.iri_journal:
+            await self._remove_from_journal([iri], self.iri_journal.last_id)
 
     async def _iri_batch_loop(self):
         async def get_from_queue():
@@ -244,44 +496,57 @@ class PodpingHivewriter(AsyncContext):
             except RuntimeError:
                 return
 
-        settings = await self.settings_manager.get_settings()
+        # An IRI that didn't fit in the previous batch starts the next one
+        carry_over: Optional[str] = None
+        batch_period = self.settings_manager.settings.hive_operation_period
 
         while True:
-            iri_set: Set[str] = set()
+            # Settings changes apply from the next batch
+            settings = self.settings_manager.settings
+            # Held open longer than hive_operation_period when resource credits
+            # are running low
+            previous_batch_period = batch_period
+            batch_period = self.account_pool.rc_governor.batch_period(
+                settings.hive_operation_period
+            )
+            if batch_period != previous_batch_period:
+                logging.info(f"Batch period: {batch_period:.1f}s")
+
+            packer = PodpingPayloadPacker(max_urls_size=settings.max_url_list_bytes)
             start = timer()
             duration = 0
-            iris_size_without_commas = 0
-            iris_size_total = 0
+            batch_full = False
             batch_id = uuid.uuid4()
 
-            # Wait until we have enough IRIs to fit in the payload
-            # or get into the current Hive block
-            while (
-                duration < settings.hive_operation_period
-                and iris_size_total < settings.max_url_list_bytes
-            ):
+            if carry_over is not None:
+                # The limit may have come down since it was carried over
+                if not packer.add(carry_over):
+                    await self._drop_too_large(carry_over)
+                carry_over = None
+
+            # Wait until the payload is full or we've waited long enough
+            # to get into the current Hive block
+            while duration < batch_period and not batch_full:
                 try:
                     iri = await asyncio.wait_for(
                         get_from_queue(),
-                        timeout=settings.hive_operation_period,
+                        timeout=batch_period - duration,
                     )
-                    iri_set.add(iri)
                     self.iri_queue.task_done()
 
+                    if not packer.add(iri):
+                        if len(packer):
+                            carry_over = iri
+                            batch_full = True
+                        else:
+                            await self._drop_too_large(iri)
+
                     logging.debug(
                         f"_iri_batch_loop - Duration: {duration:.3f} - "
                         f"IRI in queue: {iri} - "
                         f"IRI batch_id {batch_id} - "
-                        f"Num IRIs: {len(iri_set)}"
+                        f"Num IRIs: {len(packer)}"
                     )
-
-                    # byte size of IRI in JSON is IRI + 2 quotes
-                    iris_size_without_commas += len(iri.encode("UTF-8")) + 2
-
-                    # Size of payload in bytes is
-                    # length of IRIs in bytes + the number of commas + 2 square brackets
-                    # Assuming it's a JSON list eg ["https://...","https://"..."]
-                    iris_size_total = iris_size_without_commas + len(iri_set) - 1 + 2
                 except asyncio.TimeoutError:
                     pass
                 except asyncio.CancelledError:
@@ -293,18 +558,129 @@ class PodpingHivewriter(AsyncContext):
                     duration = timer() - start
 
             try:
-                if len(iri_set):
-                    iri_batch = IRIBatch(batch_id=batch_id, iri_set=iri_set)
+                if len(packer):
+                    iri_batch = IRIBatch(
+                        batch_id=batch_id,
+                        iri_set=set(packer.iris),
+                        journal_id=self.iri_journal.last_id
+                        if self.iri_journal
+                        else None,
+                    )
                     await self.iri_batch_queue.put(iri_batch)
-                    self.total_iris_recv_deduped += len(iri_set)
+                    self.total_iris_recv_deduped += len(packer)
                     logging.info(
-                        f"IRI batch_id {batch_id} - Size of IRIs: {iris_size_total}"
+                        f"IRI batch_id {batch_id} - Size of payload: {packer.size}"
                     )
             except asyncio.CancelledError:
                 raise
             except Exception as ex:
                 logging.error(f"{ex} occurred", exc_info=True)
 
+    def is_busy(self, num_pending: int = 0) -> bool:
+        """True when either queue has reached its high-water mark.  IRIs
+        accepted but not queued yet count towards it, as do num_pending more
+        the caller has accepted."""
+        num_queued = self.iri_queue.qsize() + self._iris_unqueued + num_pending
+        return self.iri_batch_queue.full() or num_queued >= self.iri_queue_high_water
+
+    async def _receive_iris(self, iris: List[Optional[str]]) -> str:
+        """Validate and enqueue IRIs, returning one status character per IRI.
+        None stands in for a frame that couldn't be decoded.  With a journal,
+        accepted IRIs are on disk before this returns."""
+        return (await self._receive_iri_requests([iris]))[0]
+
+    async def _receive_iri_requests(
+        self, requests: List[List[Optional[str]]]
+    ) -> List[str]:
+        """Like _receive_iris for several requests at once, returning one
+        status vector per request.  The IRIs accepted from all of them share
+        a single journal commit."""
+        statuses: List[List[str]] = []
+        accepted = []
+        num_busy = 0
+        for iris in requests:
+            request_statuses = []
+            for iri in iris:
+                if iri is None or not is_valid_iri(iri):
+                    request_statuses.append(IRI_STATUS_INVALID)
+                elif self.is_busy(len(accepted)):
+                    num_busy += 1
+                    request_statuses.append(IRI_STATUS_BUSY)
+                else:
+                    accepted.append(iri)
+                    request_statuses.append(IRI_STATUS_OK)
+            statuses.append(request_statuses)
+
+        # Counted by is_busy while they wait on the journal
+        num_unqueued = len(accepted)
+        self._iris_unqueued += num_unqueued
+        try:
+            if accepted and self.iri_journal:
+                try:
+                    await self.iri_journal.append(accepted)
+                except Exception as e:
+                    logging.error(f"Unable to write IRIs to the journal: {e!r}")
+                    statuses = [
+                        [
+                            IRI_STATUS_BUSY if status == IRI_STATUS_OK else status
+                            for status in request_statuses
+                        ]
+                        for request_statuses in statuses
+                    ]
+                    num_busy += len(accepted)
+                    accepted = []
+        finally:
+            self._iris_unqueued -= num_unqueued
+
+        for iri in accepted:
+            # The queue is unbounded, so this never has to wait
+            self.iri_queue.put_nowait(iri)
+        num_accepted = len(accepted)
+
+        if num_accepted:
+            async with self._iris_in_flight_lock:
+                self._iris_in_flight += num_accepted
+            self.total_iris_recv += num_accepted
+
+        if num_busy:
+            self.total_iris_busy += num_busy
+
+        return ["".join(request_statuses) for request_statuses in statuses]
+
+    async def retry_after(self) -> int:
+        """Seconds a client turned away as busy should wait before retrying"""
+        settings = await self.settings_manager.get_settings()
+        return math.ceil(self.retry_policy.retry_after(settings.hive_operation_period))
+
+    async def _zmq_reply(self, body: List[bytes]) -> str:
+        """A single frame is one IRI, answered with "OK", "Invalid IRI" or "BUSY".
+        A bulk request starts with a ZMQ_BULK_MARKER frame followed by one IRI
+        per frame, answered with a status vector holding one character per
+        IRI, in order.  Either reply ends with " retry-after=<seconds>" when
+        any IRI was refused as busy."""
+        return (await self._zmq_replies([body]))[0]
+
+    async def _zmq_replies(self, bodies: List[List[bytes]]) -> List[str]:
+        """_zmq_reply for several requests, in order, with one journal commit"""
+        requests = [parse_zmq_request(body) for body in bodies]
+        all_statuses = await self._receive_iri_requests([iris for iris, _ in requests])
+
+        replies = []
+        for (_, bulk), statuses in zip(requests, all_statuses):
+            if bulk:
+                reply = statuses
+            elif statuses == IRI_STATUS_OK:
+                reply = "OK"
+            elif statuses == IRI_STATUS_BUSY:
+                reply = "BUSY"
+            else:
+                reply = "Invalid IRI"
+
+            if IRI_STATUS_BUSY in statuses:
+                reply += f" retry-after={await self.retry_after()}"
+            replies.append(reply)
+        return replies
+
     async def _zmq_response_loop(self):
         import zmq.asyncio
 
@@ -317,21 +693,164 @@ class PodpingHivewriter(AsyncContext):
 
         while True:
             try:
-                iri: str = await socket.recv_string()
-                if rfc3987.match(iri, "IRI"):
-                    await self.iri_queue.put(iri)
-                    async with self._iris_in_flight_lock:
-                        self._iris_in_flight += 1
-                    self.total_iris_recv += 1
-                    await socket.send_string("OK")
-                else:
-                    await socket.send_string("Invalid IRI")
+                body = await socket.recv_multipart()
+                await socket.send_string(await self._zmq_reply(body))
+            except asyncio.CancelledError:
+                socket.close()
+                raise
+            except Exception as ex:
+                logging.error(f"{ex} occurred", exc_info=True)
+
+    async def _zmq_router_loop(self):
+        """Like _zmq_response_loop, but with a ROUTER socket so clients don't have
+        to wait for a reply before sending their next IRI.
+
+        REQ clients work unchanged.  DEALER clients may pipeline as many
+        requests as they like, replies come back in the order they were sent."""
+        import zmq.asyncio
+
+        context = zmq.asyncio.Context()
+        socket = context.socket(zmq.ROUTER)
+        # TODO: Check IPv6 support
+        socket.bind(f"tcp://{self.listen_ip}:{self.listen_port}")
+
+        logging.info(
+            f"Running ZeroMQ ROUTER server on {self.listen_ip}:{self.listen_port}"
+        )
+
+        # Received requests wait here to be validated and queued, so receiving
+        # never waits on that.  Once full, ZeroMQ's own buffers hold the rest.
+        request_queue: "asyncio.Queue[Tuple[List[bytes], List[bytes]]]" = asyncio.Queue(
+            maxsize=ZMQ_ROUTER_BACKLOG
+        )
+        reply_queue: "asyncio.Queue[List[bytes]]" = asyncio.Queue()
+        tasks = [
+            asyncio.create_task(
+                self._zmq_router_request_loop(request_queue, reply_queue)
+            ),
+            asyncio.create_task(self._zmq_router_send_loop(socket, reply_queue)),
+        ]
+
+        while True:
+            try:
+                frames = await socket.recv_multipart()
+                envelope, body = split_zmq_envelope(frames)
+
+                identity = envelope[0]
+                num_iris, _ = self.zmq_clients.get(identity, (0, 0.0))
+                self.zmq_clients[identity] = (num_iris + len(body), timer())
+
+                await request_queue.put((envelope, body))
             except asyncio.CancelledError:
+                for task in tasks:
+                    task.cancel()
                 socket.close()
                 raise
             except Exception as ex:
                 logging.error(f"{ex} occurred", exc_info=True)
 
+    async def _zmq_router_request_loop(
+        self,
+        request_queue: "asyncio.Queue[Tuple[List[bytes], List[bytes]]]",
+        reply_queue: "asyncio.Queue[List[bytes]]",
+    ):
+        """Answers requests once their IRIs are queued.  Every request waiting
+        is taken at once so they share a journal commit, and replies stay in
+        the order requests arrived."""
+        while True:
+            try:
+                requests = [await request_queue.get()]
+                while not request_queue.empty():
+                    requests.append(request_queue.get_nowait())
+
+                replies = await self._zmq_replies([body for _, body in requests])
+                for (envelope, _), reply in zip(requests, replies):
+                    reply_queue.put_nowait(envelope + [reply.encode("UTF-8")])
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logging.error(f"{ex} occurred", exc_info=True)
+
+    @staticmethod
+    async def _zmq_router_send_loop(socket, reply_queue: "asyncio.Queue[List[bytes]]"):
+        while True:
+            try:
+                frames = await reply_queue.get()
+                await socket.send_multipart(frames)
+            except asyncio.CancelledError:
+                raise
+            except Exception as ex:
+                logging.error(f"{ex} occurred", exc_info=True)
+
+    async def _http_listener_loop(self):
+        app = web.Application()
+        app.add_routes(
+            [
+                web.post("/iri", self._http_iri_handler),
+                web.post("/iris", self._http_iris_handler),
+            ]
+        )
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.listen_ip, self.http_port)
+        await site.start()
+
+        logging.info(f"Running HTTP server on {self.listen_ip}:{self.http_port}")
+
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await runner.cleanup()
+
+    async def _http_iri_handler(self, request: web.Request) -> web.Response:
+        """POST a single IRI as the request body"""
+        iri = (await request.text()).strip()
+        status = await self._receive_iris([iri])
+        if status == IRI_STATUS_OK:
+            return web.json_response(
+                {"status": "OK", "queue_position": self.iri_queue.qsize()}
+            )
+        elif status == IRI_STATUS_BUSY:
+            return web.json_response(
+                {"status": "BUSY"},
+                status=503,
+                headers={"Retry-After": str(await self.retry_after())},
+            )
+        else:
+            return web.json_response({"status": "Invalid IRI"}, status=400)
+
+    async def _http_iris_handler(self, request: web.Request) -> web.Response:
+        """POST many IRIs as a JSON array of strings, or as plain text with one
+        IRI per line.  The reply has the same status vector as a bulk ZeroMQ
+        request."""
+        if request.content_type == "application/json":
+            try:
+                body = await request.json()
+            except ValueError:
+                body = None
+            if not isinstance(body, list):
+                return web.json_response(
+                    {"status": "Expected a JSON array of IRIs"}, status=400
+                )
+            iris = [iri if isinstance(iri, str) else None for iri in body]
+        else:
+            lines = (await request.text()).splitlines()
+            iris = [line.strip() for line in lines if line.strip()]
+
+        statuses = await self._receive_iris(iris)
+        if IRI_STATUS_BUSY in statuses:
+            headers = {"Retry-After": str(await self.retry_after())}
+        else:
+            headers = None
+        return web.json_response(
+            {
+                "statuses": statuses,
+                "accepted": statuses.count(IRI_STATUS_OK),
+                "queue_position": self.iri_queue.qsize(),
+            },
+            headers=headers,
+        )
+
     async def num_operations_in_queue(self) -> int:
         async with self._iris_in_flight_lock:
             return self._iris_in_flight
@@ -348,49 +867,153 @@ class PodpingHivewriter(AsyncContext):
             f"IRIs Received: {self.total_iris_recv} - "
             f"IRIs Deduped: {self.total_iris_recv_deduped} - "
             f"IRIs Sent: {self.total_iris_sent} - "
+            f"IRIs Refused Busy: {self.total_iris_busy} - "
+            f"IRIs Given Up: {self.total_iris_failed} - "
             f"last_node: {last_node}"
         )
+        if self.total_transactions_sent:
+            ops_per_tx = self.total_operations_sent / self.total_transactions_sent
+        else:
+            ops_per_tx = 0
+        logging.info(
+            f"Status - Transactions Sent: {self.total_transactions_sent} - "
+            f"Operations Sent: {self.total_operations_sent} - "
+            f"Operations per Transaction: {ops_per_tx:.2f}"
+        )
+        rc_governor = self.account_pool.rc_governor
+        for pool_account in self.account_pool.accounts:
+            manabar = self.account_pool.rc_manabars.get(pool_account)
+            if manabar:
+                capacity = rc_governor.capacity(pool_account)
+                time_to_floor = rc_governor.time_to_floor(pool_account)
+                if time_to_floor is not None:
+                    time_to_floor = timedelta(seconds=int(time_to_floor))
+                logging.info(
+                    f"Status - Account: @{pool_account} - "
+                    f'RC: {manabar.get("current_pct"):.2f}% - '
+                    f"Podping capacity: "
+                    f"{'-' if capacity is None else int(capacity)} - "
+                    f"Reaches {rc_governor.floor_pct:g}% RC floor in: "
+                    f"{time_to_floor or '-'}"
+                )
+        logging.info(
+            f"Status - IRI queue: {self.iri_queue.qsize()}"
+            f"/{self.iri_queue_high_water} - "
+            f"Batch queue: {self.iri_batch_queue.qsize()}"
+            f"/{self.iri_batch_queue_high_water} - "
+            f"IRIs in flight: {await self.num_operations_in_queue()}"
+        )
+        logging.info(f"Status - Hive nodes: {self.hive_wrapper.node_health.summary()}")
+        logging.info(f"Status - Transactions {self.inclusion_tracker.summary()}")
+        logging.info(
+            f"Status - Retry pressure: {self.retry_policy.pressure:.2f} - "
+            f"Batches waiting to retry: {self.retry_policy.waiting} - "
+            f"Retries: {self.retry_policy.total_retries} - "
+            f"Batches given up: {self.retry_policy.total_exhausted}"
+        )
+
+        if self.zmq_router:
+            settings = await self.settings_manager.get_settings()
+            idle_cutoff = timer() - settings.diagnostic_report_period
+            active_clients = {
+                identity: stats
+                for identity, stats in self.zmq_clients.items()
+                if stats[1] >= idle_cutoff
+            }
+            logging.info(
+                f"Status - ZeroMQ clients active: {len(active_clients)} - "
+                f"ZeroMQ clients idle: {len(self.zmq_clients) - len(active_clients)}"
+            )
+            # Forget clients that went quiet so the table doesn't grow forever
+            self.zmq_clients = active_clients
 
     async def send_notification(
         self, payload: dict, operation_id: Optional[str] = None
     ) -> str:
+        return await self.send_notifications([payload], operation_id)
+
+    async def send_notifications(
+        self,
+        payloads: List[dict],
+        operation_id: Optional[str] = None,
+        account: Optional[str] = None,
+        on_expired: Optional[OnExpired] = None,
+        on_confirmed: Optional[OnConfirmed] = None,
+    ) -> str:
+        """Send every payload as its own custom_json operation, all in
+        a single transaction posted by account (the server account by default).
+        Given on_expired, the transaction is followed until it's irreversible
+        and on_expired is called if it never makes it into a block.
+        on_confirmed is called once it's irreversible, or straight away when
+        it isn't followed."""
+        account = account or self.server_account
         try:
-            size_of_json = size_of_dict_as_json(payload)
-            if size_of_json > HIVE_CUSTOM_OP_DATA_MAX_LENGTH:
-                raise PodpingCustomJsonPayloadExceeded(
-                    "Max custom_json payload exceeded"
+            size_of_json = 0
+            for payload in payloads:
+                size_of_payload = size_of_dict_as_json(payload)
+                if size_of_payload > HIVE_CUSTOM_OP_DATA_MAX_LENGTH:
+                    raise PodpingCustomJsonPayloadExceeded(
+                        "Max custom_json payload exceeded"
+                    )
+                size_of_json += size_of_payload
+
+            # Followed from before it's sent, it may be in a block we
+            # receive before the node answers
+            tracked_trx_ids = []
+
+            def on_signed(signed_tx: dict):
+                if (
+                    on_expired is not None
+                    and not self.dry_run
+                    and "expiration" in signed_tx
+                    and self.inclusion_tracker.track(
+                        signed_tx, on_expired, on_confirmed
+                    )
+                ):
+                    tracked_trx_ids.append(signed_tx["trx_id"])
+
+            try:
+                tx = await self.hive_wrapper.custom_json_ops(
+                    operation_id or self.operation_id,
+                    payloads,
+                    [account],
+                    on_signed=on_signed,
                 )
-            tx = await self.hive_wrapper.custom_json(
-                operation_id or self.operation_id, payload, self.required_posting_auths
-            )
+            except Exception:
+                for trx_id in tracked_trx_ids:
+                    self.inclusion_tracker.untrack(trx_id)
+                raise
 
             tx_id = tx["trx_id"]
+            if not self.dry_run:
+                self.account_pool.rc_governor.record_broadcast(
+                    account, len(payloads), size_of_json
+                )
+            if on_confirmed and not tracked_trx_ids:
+                # Broadcast is as sure as it gets
+                await on_confirmed()
 
-            logging.info(f"Transaction sent: {tx_id} - JSON size: {size_of_json}")
+            self.total_operations_sent += len(payloads)
+            self.total_transactions_sent += 1
+
+            logging.info(
+                f"Transaction sent: {tx_id} - Account: @{account} - "
+                f"Operations: {len(payloads)} - JSON size: {size_of_json}"
+            )
 
             return tx_id
 
         except MissingKeyError:
-            logging.error(f"The provided key for @{self.server_account} is not valid")
+            logging.error(f"The provided key for @{account} is not valid")
             raise
 
     async def send_notification_iri(self, iri: str, reason="feed_update") -> str:
-        payload = {
-            "version": CURRENT_PODPING_VERSION,
-            "num_urls": 1,
-            "reason": reason,
-            "urls": [iri],
-        }
+        payload = podping_payload([iri], reason)
         return await self.send_notification(payload)
 
     async def send_notification_iris(self, iris: Set[str], reason="feed_update") -> str:
         num_iris = len(iris)
-        payload = {
-            "version": CURRENT_PODPING_VERSION,
-            "num_urls": num_iris,
-            "reason": reason,
-            "urls": list(iris),
-        }
+        payload = podping_payload(iris, reason)
 
         tx_id = await self.send_notification(payload)
 
@@ -398,37 +1021,160 @@ class PodpingHivewriter(AsyncContext):
 
         return tx_id
 
-    async def failure_retry(self, iri_set: Set[str]) -> Tuple[str, int]:
+    async def failure_retry(
+        self, iri_set: Set[str], journal_id: Optional[int] = None
+    ) -> Tuple[List[str], int]:
+        """Send the IRIs, split over as many payloads as they need and as few
+        transactions as those payloads fit in, retrying each transaction as the
+        retry policy allows.  Returns the trx_id of every transaction that went
+        through and the total number of failures.
+
+        Given journal_id, the last journal ID appended when the IRIs were
+        batched, each transaction's IRIs are removed from the journal once
+        it's irreversible or given up on."""
         await self.wait_startup()
-        failure_count = 0
 
-        while True:
-            # Sleep a maximum of 5 minutes, 2 additional seconds for every retry
-            sleep_time = min(failure_count * 2, 300)
-            if failure_count > 0:
-                logging.warning(f"Waiting {sleep_time}s before retry")
-                await asyncio.sleep(sleep_time)
-                logging.info(
-                    f"FAILURE COUNT: {failure_count} - RETRYING {len(iri_set)} IRIs"
+        payloads, too_large = self._pack_payloads(iri_set)
+        for iri in too_large:
+            logging.error(f"IRI too large to send, dropping: {iri}")
+        if too_large and journal_id is not None:
+            await self._remove_from_journal(too_large, journal_id)
+
+        payload_groups = group_custom_json_payloads(payloads)
+        if len(payloads) > 1:
+            logging.info(
+                f"Splitting {len(iri_set)} IRIs into {len(payloads)} payloads "
+                f"in {len(payload_groups)} transactions"
+            )
+
+        trx_ids = []
+        failure_count = 0
+        for payload_group in payload_groups:
+            trx_id, group_failure_count = await self._failure_retry_payloads(
+                payload_group, journal_id
+            )
+            if trx_id:
+                trx_ids.append(trx_id)
+            failure_count += group_failure_count
+
+        return trx_ids, failure_count
+
+    def _pack_payloads(self, iri_set: Set[str]) -> Tuple[List[dict], Set[str]]:
+        """Payloads for the IRIs, packed against the settings in force now,
+        which may have changed since they were batched.  Also returns the
+        IRIs that no longer fit in any payload."""
+        max_urls_size = self.settings_manager.settings.max_url_list_bytes
+        too_large = {
+            iri
+            for iri in iri_set
+            if not PodpingPayloadPacker(max_urls_size=max_urls_size).add(iri)
+        }
+        payloads = [
+            podping_payload(iris)
+            for iris in pack_iris(iri_set - too_large, max_urls_size=max_urls_size)
+        ]
+        return payloads, too_large
+
+    async def _failure_retry_payloads(
+        self, payloads: List[dict], journal_id: Optional[int] = None
+    ) -> Tuple[Optional[str], int]:
+        """Send payloads in one transaction, retrying as the retry policy
+        allows.  Returns the trx_id, or None if the batch was given up on,
+        and the number of retries."""
+        on_confirmed: Optional[OnConfirmed] = None
+        if journal_id is not None:
+
+            async def on_confirmed():
+                await self._remove_from_journal(
+                    (iri for payload in payloads for iri in payload["urls"]),
+                    journal_id,
                 )
-            else:
-                logging.info(f"Received {len(iri_set)} IRIs")
 
+        backoff = self.retry_policy.backoff()
+        num_iris = sum(payload["num_urls"] for payload in payloads)
+        logging.info(f"Received {num_iris} IRIs")
+
+        while True:
             try:
-                trx_id = await self.send_notification_iris(iris=iri_set)
-                if failure_count > 0:
-                    logging.info(
-                        f"FAILURE CLEARED after {failure_count} retries, {sleep_time}s"
+                async with self.account_pool.acquire(len(payloads)) as account:
+                    trx_id = await self.send_notifications(
+                        payloads,
+                        account=account,
+                        on_expired=lambda: self._resend_expired(payloads, journal_id),
+                        on_confirmed=on_confirmed,
                     )
-                return trx_id, failure_count
+                self.total_iris_sent += num_iris
+                if backoff.retries > 0:
+                    logging.info(f"FAILURE CLEARED after {backoff.retries} retries")
+                return trx_id, backoff.retries
             except Exception:
-                logging.warning(f"Failed to send {len(iri_set)} IRIs")
+                logging.warning(f"Failed to send {num_iris} IRIs")
                 if logging.DEBUG >= logging.root.level:
-                    for iri in iri_set:
-                        logging.debug(iri)
+                    for payload in payloads:
+                        for iri in payload["urls"]:
+                            logging.debug(iri)
                 await self.hive_wrapper.rotate_nodes()
 
-                failure_count += 1
+                if backoff.exhausted:
+                    self.retry_policy.total_exhausted += 1
+                    self.total_iris_failed += num_iris
+                    logging.error(
+                        f"Giving up on {num_iris} IRIs after {backoff.retries} retries"
+                    )
+                    for payload in payloads:
+                        for iri in payload["urls"]:
+                            logging.error(f"Not sent: {iri}")
+                    if on_confirmed:
+                        # Kept no longer than a successful send would be
+                        await on_confirmed()
+                    return None, backoff.retries
+
+                sleep_time = backoff.next_delay()
+                logging.warning(f"Waiting {sleep_time:0.1f}s before retry")
+                await backoff.sleep(sleep_time)
+                logging.info(
+                    f"FAILURE COUNT: {backoff.retries} - RETRYING {num_iris} IRIs"
+                )
+
+    async def _resend_expired(
+        self, payloads: List[dict], journal_id: Optional[int] = None
+    ) -> None:
+        # Counted as sent when it was first broadcast.  Still in the journal
+        # until the new transaction is confirmed.
+        self.total_iris_sent -= sum(payload["num_urls"] for payload in payloads)
+        await self._failure_retry_payloads(payloads, journal_id)
+
+
+def parse_zmq_request(body: List[bytes]) -> Tuple[List[Optional[str]], bool]:
+    """The IRIs in a ZeroMQ request and whether it's a bulk request.  None
+    stands in for a frame that isn't UTF-8, or for the whole request when it
+    isn't a single frame and doesn't start with ZMQ_BULK_MARKER."""
+    bulk = bool(body) and body[0] == ZMQ_BULK_MARKER
+    if bulk:
+        frames = body[1:]
+    elif len(body) == 1:
+        frames = body
+    else:
+        return [None], False
+
+    iris: List[Optional[str]] = []
+    for frame in frames:
+        try:
+            iris.append(frame.decode("UTF-8"))
+        except UnicodeDecodeError:
+            iris.append(None)
+    return iris, bulk
+
+
+def split_zmq_envelope(frames: List[bytes]) -> Tuple[List[bytes], List[bytes]]:
+    """Split a message received on a ROUTER socket into its routing envelope
+    and its body.  REQ clients add an empty delimiter frame, DEALER clients
+    may or may not."""
+    try:
+        delimiter = frames.index(b"", 1)
+    except ValueError:
+        return frames[:1], frames[1:]
+    return frames[: delimiter + 1], frames[delimiter + 1 :]
 
 
 def get_allowed_accounts(
@@ -438,7 +1184,7 @@ def get_allowed_accounts(
     and only react to these accounts"""
 
     try:
-        hive = beem.Hive(node=nodes)
+        hive = get_cached_hive(nodes)
         master_account = Account(account_name, blockchain_instance=hive, lazy=True)
         return set(master_account.get_following())
     except Exception:
@@ -0,0 +1,119 @@
+import json
+from typing import Iterable, List, Optional, Set
+
+from podping_hivewriter.constants import (
+    CURRENT_PODPING_VERSION,
+    HIVE_CUSTOM_OP_DATA_MAX_LENGTH,
+)
+from podping_hivewriter.exceptions import PodpingCustomJsonPayloadExceeded
+
+
+def size_of_dict_as_json(payload: dict):
+    return len(json.dumps(payload, separators=(",", ":")).encode("UTF-8"))
+
+
+def size_of_str_as_json(value: str) -> int:
+    """Byte size of a string once quoted and escaped like size_of_dict_as_json"""
+    return len(json.dumps(value).encode("UTF-8"))
+
+
+def podping_payload(iris: Iterable[str], reason: str = "feed_update") -> dict:
+    urls = list(iris)
+    return {
+        "version": CURRENT_PODPING_VERSION,
+        "num_urls": len(urls),
+        "reason": reason,
+        "urls": urls,
+    }
+
+
+class PodpingPayloadPacker:
+    """Collects IRIs for a single podping payload while tracking the exact
+    serialized size of the whole payload, envelope included.  max_size caps
+    the whole payload, max_urls_size only its list of urls."""
+
+    def __init__(
+        self,
+        reason: str = "feed_update",
+        max_size=HIVE_CUSTOM_OP_DATA_MAX_LENGTH,
+        max_urls_size: Optional[int] = None,
+    ):
+        self.reason = reason
+        self.max_size = max_size
+        self.max_urls_size = max_urls_size
+
+        self.iris: List[str] = []
+        self._iri_set: Set[str] = set()
+        self._iris_size = 0
+
+        # Size of the payload with no IRIs, minus the "0" of num_urls
+        self._envelope_size = size_of_dict_as_json(podping_payload([], reason)) - 1
+
+    def __len__(self):
+        return len(self.iris)
+
+    @staticmethod
+    def _urls_size_with(num_iris: int, iris_size: int) -> int:
+        # Brackets, and a comma after each IRI but the last
+        return 2 + iris_size + max(num_iris - 1, 0)
+
+    def _size_with(self, num_iris: int, iris_size: int) -> int:
+        # The envelope already holds the brackets of the empty list
+        urls_size = self._urls_size_with(num_iris, iris_size) - 2
+        return self._envelope_size + len(str(num_iris)) + urls_size
+
+    @property
+    def size(self) -> int:
+        return self._size_with(len(self.iris), self._iris_size)
+
+    @property
+    def urls_size(self) -> int:
+        return self._urls_size_with(len(self.iris), self._iris_size)
+
+    def add(self, iri: str) -> bool:
+        """Add an IRI, returning False without adding it if the payload
+        would grow beyond max_size or its urls beyond max_urls_size.
+        Duplicates are free."""
+        if iri in self._iri_set:
+            return True
+        iri_size = size_of_str_as_json(iri)
+        num_iris = len(self.iris) + 1
+        iris_size = self._iris_size + iri_size
+        if self._size_with(num_iris, iris_size) > self.max_size:
+            return False
+        if (
+            self.max_urls_size is not None
+            and self._urls_size_with(num_iris, iris_size) > self.max_urls_size
+        ):
+            return False
+        self.iris.append(iri)
+        self._iri_set.add(iri)
+        self._iris_size += iri_size
+        return True
+
+    def payload(self) -> dict:
+        return podping_payload(self.iris, self.reason)
+
+
+def pack_iris(
+    iris: Iterable[str],
+    reason: str = "feed_update",
+    max_size=HIVE_CUSTOM_OP_DATA_MAX_LENGTH,
+    max_urls_size: Optional[int] = None,
+) -> List[List[str]]:
+    """Split IRIs over as few payloads of at most max_size bytes, and urls
+    of at most max_urls_size, as we can, placing the largest IRIs first into
+    the first payload they fit in"""
+    packers: List[PodpingPayloadPacker] = []
+    for iri in sorted(set(iris), key=size_of_str_as_json, reverse=True):
+        for packer in packers:
+            if packer.add(iri):
+                break
+        else:
+            packer = PodpingPayloadPacker(reason, max_size, max_urls_size)
+            if not packer.add(iri):
+                raise PodpingCustomJsonPayloadExceeded(
+                    f"IRI too large to fit in any payload: {iri}"
+                )
+            packers.append(packer)
+    return [packer.iris for packer in packers]
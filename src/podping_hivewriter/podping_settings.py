@@ -1,13 +1,21 @@
 import json
 import logging
+import os
 from typing import Iterable, Optional
 
+import aiohttp
 from beem.account import Account
 from podping_hivewriter.constants import PODPING_SETTINGS_KEY
 from podping_hivewriter.hive import get_hive
+from podping_hivewriter.hive_rpc import hive_rpc_call
+from podping_hivewriter.local_cache import podping_cache_dir, write_json_atomically
 from podping_hivewriter.models.podping_settings import PodpingSettings
 
 
+def default_settings_cache_file() -> str:
+    return os.path.join(podping_cache_dir(), "podping-settings.json")
+
+
 async def get_settings_from_hive(
     nodes: Iterable[str], account_name: str
 ) -> Optional[dict]:
@@ -29,3 +37,47 @@ async def get_podping_settings(
     """Return PodpingSettings object"""
     settings_dict = await get_settings_from_hive(nodes, account_name)
     return PodpingSettings.parse_obj(settings_dict)
+
+
+async def get_posting_json_metadata(
+    session: aiohttp.ClientSession, nodes: Iterable[str], account_name: str
+) -> str:
+    """The raw posting_json_metadata of account_name, in a single call to the
+    first node that answers"""
+    error: Optional[Exception] = None
+    for node in nodes:
+        try:
+            accounts = await hive_rpc_call(
+                session, node, "condenser_api.get_accounts", [[account_name]]
+            )
+        except Exception as e:
+            error = e
+            continue
+        if not accounts:
+            raise ValueError(f"Control account {account_name} does not exist")
+        return accounts[0]["posting_json_metadata"]
+    raise error or ValueError("No nodes to fetch podping settings from")
+
+
+def parse_podping_settings(metadata: str) -> PodpingSettings:
+    """PodpingSettings from raw posting_json_metadata, raising ValueError,
+    or pydantic's ValidationError, if they aren't valid"""
+    posting_meta = json.loads(metadata) if metadata else {}
+    return PodpingSettings.parse_obj(posting_meta.get(PODPING_SETTINGS_KEY))
+
+
+def load_settings_cache(path: str) -> Optional[PodpingSettings]:
+    try:
+        return PodpingSettings.parse_file(path)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable podping settings cache {path}: {e}")
+        return None
+
+
+def save_settings_cache(path: str, settings: PodpingSettings) -> None:
+    try:
+        write_json_atomically(path, json.loads(settings.json()))
+    except OSError as e:
+        logging.warning(f"Unable to save podping settings cache {path}: {e}")
@@ -1,24 +1,65 @@
 import asyncio
 import logging
 from timeit import default_timer as timer
-from typing import Tuple
+from typing import Awaitable, Callable, List, Optional, Tuple
+
+import aiohttp
 
 from podping_hivewriter.async_context import AsyncContext
 from podping_hivewriter.models.podping_settings import PodpingSettings
-from podping_hivewriter.podping_settings import get_podping_settings
-from pydantic import ValidationError
+from podping_hivewriter.podping_settings import (
+    get_posting_json_metadata,
+    load_settings_cache,
+    parse_podping_settings,
+    save_settings_cache,
+)
+
+# Seconds before polling the control account again after the first failure,
+# doubling with each failure after that up to control_account_check_period
+SETTINGS_RETRY_BASE_DELAY = 1
+
+# Called with the old and new settings after they change
+SettingsSubscriber = Callable[[PodpingSettings, PodpingSettings], Awaitable[None]]
 
 
 class PodpingSettingsManager(AsyncContext):
-    def __init__(self, ignore_updates=False):
+    """Keeps the podping settings up to date from the control account.  The
+    settings are an immutable snapshot, replaced whole when they change, so
+    reading them needs no lock.  Subscribers are told of every change.
+
+    Given a cache_file, the last good settings are kept there and a restart
+    begins with them rather than the defaults.
+
+    With push_updates, the control account is only polled until the first
+    success.  Changes after that come from on_block, which is meant to be
+    subscribed to a BlockStream."""
+
+    def __init__(
+        self,
+        ignore_updates=False,
+        cache_file: Optional[str] = None,
+        push_updates=False,
+    ):
         super().__init__()
 
         self.ignore_updates = ignore_updates
+        self.cache_file = cache_file
+        self.push_updates = push_updates
 
         self.last_update_time = float("-inf")
 
         self._settings = PodpingSettings()
-        self._settings_lock = asyncio.Lock()
+        if cache_file and not ignore_updates:
+            cached_settings = load_settings_cache(cache_file)
+            if cached_settings:
+                logging.info(f"Starting with podping settings from {cache_file}")
+                self._settings = cached_settings
+        # posting_json_metadata the settings were last parsed from
+        self._metadata: Optional[str] = None
+        self._session: Optional[aiohttp.ClientSession] = None
+        self._subscribers: List[SettingsSubscriber] = []
+        # Set, and replaced by a fresh one, whenever the settings change
+        self._changed = asyncio.Event()
 
         self._startup_done = False
         asyncio.ensure_future(self._startup())
@@ -30,35 +71,131 @@ class PodpingSettingsManager(AsyncContext):
         self._startup_done = True
 
     async def _update_podping_settings_loop(self):
+        failures = 0
         while True:
             try:
                 await self.update_podping_settings()
-                await asyncio.sleep(self._settings.control_account_check_period)
+                failures = 0
+                if self.push_updates:
+                    return
+                await self.sleep_period(
+                    lambda settings: settings.control_account_check_period
+                )
             except Exception as e:
-                logging.error(e, exc_info=True)
+                failures += 1
+                logging.warning(f"Unable to update podping settings: {e!r}")
+                # Every node failed, don't keep at them
+                await asyncio.sleep(
+                    min(
+                        SETTINGS_RETRY_BASE_DELAY * 2 ** (failures - 1),
+                        self._settings.control_account_check_period,
+                    )
+                )
             except asyncio.CancelledError:
                 raise
 
+    def close(self):
+        super().close()
+        if self._session is not None:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                return
+            loop.create_task(self._session.close())
+
+    async def get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession()
+        return self._session
+
     async def update_podping_settings(self) -> None:
+        session = await self.get_session()
+        metadata = await get_posting_json_metadata(
+            session, self._settings.main_nodes, self._settings.control_account
+        )
+        self.last_update_time = timer()
+        await self._apply_metadata(metadata)
+
+    async def on_block(self, block: dict) -> None:
+        """Apply any change the control account makes to its
+        posting_json_metadata in block, as given by BlockStream"""
+        control_account = self._settings.control_account
+        for transaction in block.get("transactions", []):
+            for op in transaction["operations"]:
+                if op["type"] != "account_update2_operation":
+                    continue
+                value = op["value"]
+                # An empty posting_json_metadata leaves it as it was
+                if value["account"] == control_account and value.get(
+                    "posting_json_metadata"
+                ):
+                    logging.info(
+                        f"Podping settings updated by @{control_account} "
+                        f"in block {block.get('block_num')}"
+                    )
+                    self.last_update_time = timer()
+                    await self._apply_metadata(value["posting_json_metadata"])
+
+    async def _apply_metadata(self, metadata: str) -> None:
+        # Unchanged on chain, which is nearly always when polling
+        if metadata == self._metadata:
+            return
+        self._metadata = metadata
+
         try:
-            nodes = await self.get_nodes()
-            podping_settings = await get_podping_settings(
-                nodes, self._settings.control_account
-            )
-            self.last_update_time = timer()
-        except ValidationError as e:
+            podping_settings = parse_podping_settings(metadata)
+        except ValueError as e:
             logging.warning(f"Problem with podping control settings: {e}")
-        else:
-            if self._settings != podping_settings:
-                logging.debug(
-                    f"Configuration override from Podping Hive: {podping_settings}"
-                )
-                async with self._settings_lock:
-                    self._settings = podping_settings
+            return
+
+        if self.cache_file:
+            save_settings_cache(self.cache_file, podping_settings)
+        if self._settings != podping_settings:
+            logging.debug(
+                f"Configuration override from Podping Hive: {podping_settings}"
+            )
+            await self.set_settings(podping_settings)
+
+    async def set_settings(self, settings: PodpingSettings) -> None:
+        old_settings = self._settings
+        self._settings = settings
+
+        changed, self._changed = self._changed, asyncio.Event()
+        changed.set()
+        for subscriber in self._subscribers:
+            try:
+                await subscriber(old_settings, settings)
+            except Exception as e:
+                logging.error(e, exc_info=True)
+
+    @property
+    def settings(self) -> PodpingSettings:
+        return self._settings
 
     async def get_settings(self) -> PodpingSettings:
-        async with self._settings_lock:
-            return self._settings
+        return self._settings
+
+    def subscribe(self, subscriber: SettingsSubscriber) -> None:
+        self._subscribers.append(subscriber)
+
+    async def wait_for_change(self, timeout: float) -> bool:
+        """Sleep for up to timeout seconds, returning True early if the
+        settings change meanwhile"""
+        try:
+            await asyncio.wait_for(self._changed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def sleep_period(self, period: Callable[[PodpingSettings], float]) -> None:
+        """Sleep for a period given by the settings, such as
+        diagnostic_report_period.  Should the period change meanwhile, the new
+        one applies to the sleep already underway."""
+        start = timer()
+        while True:
+            remaining = start + period(self._settings) - timer()
+            if remaining <= 0 or not await self.wait_for_change(remaining):
+                return
 
     async def get_nodes(self) -> Tuple[str, ...]:
         settings = await self.get_settings()
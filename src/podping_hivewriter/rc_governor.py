@@ -0,0 +1,209 @@
+import logging
+from collections import deque
+from timeit import default_timer as timer
+from typing import Deque, Dict, Iterable, List, Optional, Tuple
+
+# Seconds for resource credits to regenerate from empty to full
+HIVE_RC_REGEN_TIME = 5 * 24 * 60 * 60
+# Keep each account's RC above this percentage of its maximum by default
+RC_FLOOR_PCT = 10.0
+# Spend the RC above the floor over no less than this many seconds, on top of
+# what regenerates meanwhile
+RC_SPEND_HORIZON = 6 * 60 * 60
+# Longest a batch is held open to save RC, in seconds
+RC_MAX_BATCH_PERIOD = 300
+# Manabar intervals the cost model is fitted to
+RC_COST_SAMPLES = 50
+# Seconds of broadcasts the current rate of spending is taken over
+RC_SPEND_WINDOW = 600
+
+
+def fit_cost(
+    samples: Iterable[Tuple[int, int, float]]
+) -> Optional[Tuple[float, float]]:
+    """Least squares fit of (cost per operation, cost per byte) to samples of
+    (operations, bytes, RC consumed).  Falls back to a cost per operation alone
+    when the samples can't tell the two apart."""
+    sum_oo = sum_ob = sum_bb = sum_oc = sum_bc = 0.0
+    total_ops = total_cost = 0.0
+    for num_ops, num_bytes, cost in samples:
+        sum_oo += num_ops * num_ops
+        sum_ob += num_ops * num_bytes
+        sum_bb += num_bytes * num_bytes
+        sum_oc += num_ops * cost
+        sum_bc += num_bytes * cost
+        total_ops += num_ops
+        total_cost += cost
+    if not total_ops:
+        return None
+
+    det = sum_oo * sum_bb - sum_ob * sum_ob
+    if det > 1e-9 * sum_oo * sum_bb:
+        per_op = (sum_oc * sum_bb - sum_bc * sum_ob) / det
+        per_byte = (sum_oo * sum_bc - sum_ob * sum_oc) / det
+        if per_op >= 0 and per_byte >= 0:
+            return per_op, per_byte
+    return total_cost / total_ops, 0.0
+
+
+class RcModel:
+    """One account's resource credits between manabar reads: what it had, what
+    has regenerated since and what we've spent since"""
+
+    def __init__(self):
+        self.max_mana: Optional[float] = None
+        self.observed_mana: Optional[float] = None
+        self.observed_at: Optional[float] = None
+        # Spent since observed_at, as (time, operations, bytes)
+        self.broadcasts: List[Tuple[float, int, int]] = []
+        # Spent over the last RC_SPEND_WINDOW, as (time, operations, bytes)
+        self.recent: Deque[Tuple[float, int, int]] = deque()
+
+    @property
+    def regen_rate(self) -> float:
+        return (self.max_mana or 0) / HIVE_RC_REGEN_TIME
+
+    def observe(
+        self, current_mana: float, max_mana: float, now: float
+    ) -> Optional[Tuple[int, int, float]]:
+        """Take a fresh manabar read, returning the (operations, bytes, RC
+        consumed) of what we spent since the last one"""
+        sample = None
+        if self.observed_mana is not None and self.broadcasts:
+            regenerated = min(
+                max_mana,
+                self.observed_mana + self.regen_rate * (now - self.observed_at),
+            )
+            consumed = regenerated - current_mana
+            num_ops = sum(ops for _, ops, _ in self.broadcasts)
+            num_bytes = sum(size for _, _, size in self.broadcasts)
+            if consumed > 0:
+                sample = (num_ops, num_bytes, consumed)
+
+        self.max_mana = max_mana
+        self.observed_mana = current_mana
+        self.observed_at = now
+        self.broadcasts = []
+        return sample
+
+    def record_broadcast(self, num_ops: int, num_bytes: int, now: float) -> None:
+        self.broadcasts.append((now, num_ops, num_bytes))
+        self.recent.append((now, num_ops, num_bytes))
+        while self.recent[0][0] < now - RC_SPEND_WINDOW:
+            self.recent.popleft()
+
+
+class RcGovernor:
+    """Learns what our broadcasts cost in resource credits from manabar reads
+    and paces batching so every account stays above floor_pct of its RC,
+    rather than running dry and failing broadcasts"""
+
+    def __init__(self, floor_pct: float = RC_FLOOR_PCT):
+        self.floor_pct = floor_pct
+
+        self.models: Dict[str, RcModel] = {}
+        self.samples: Deque[Tuple[int, int, float]] = deque(maxlen=RC_COST_SAMPLES)
+        self.cost_per_op: Optional[float] = None
+        self.cost_per_byte: Optional[float] = None
+        self.total_ops = 0
+        self.total_bytes = 0
+
+    def observe(self, account: str, manabar: dict) -> None:
+        model = self.models.setdefault(account, RcModel())
+        sample = model.observe(
+            float(manabar["current_mana"]), float(manabar["max_mana"]), timer()
+        )
+        if sample:
+            self.samples.append(sample)
+            fit = fit_cost(self.samples)
+            if fit:
+                self.cost_per_op, self.cost_per_byte = fit
+                logging.debug(
+                    f"RC cost per operation: {self.cost_per_op:.0f} - "
+                    f"per byte: {self.cost_per_byte:.0f}"
+                )
+
+    def record_broadcast(self, account: str, num_ops: int, num_bytes: int) -> None:
+        self.models.setdefault(account, RcModel()).record_broadcast(
+            num_ops, num_bytes, timer()
+        )
+        self.total_ops += num_ops
+        self.total_bytes += num_bytes
+
+    def cost(self, num_ops: int, num_bytes: int) -> Optional[float]:
+        if self.cost_per_op is None:
+            return None
+        return self.cost_per_op * num_ops + self.cost_per_byte * num_bytes
+
+    def podping_cost(self) -> Optional[float]:
+        """RC of one operation of the average size we've sent"""
+        if not self.total_ops:
+            return None
+        return self.cost(1, self.total_bytes / self.total_ops)
+
+    def current_mana(self, account: str) -> Optional[float]:
+        """The last manabar read, plus what has regenerated and less what
+        we've spent since"""
+        model = self.models.get(account)
+        if not model or model.observed_mana is None:
+            return None
+        now = timer()
+        mana = min(
+            model.max_mana,
+            model.observed_mana + model.regen_rate * (now - model.observed_at),
+        )
+        for _, num_ops, num_bytes in model.broadcasts:
+            mana -= self.cost(num_ops, num_bytes) or 0
+        return mana
+
+    def _mana_above_floor(self, account: str) -> Optional[float]:
+        mana = self.current_mana(account)
+        if mana is None:
+            return None
+        return mana - self.models[account].max_mana * self.floor_pct / 100
+
+    def capacity(self, account: str) -> Optional[float]:
+        """Roughly how many more podping operations account can send before
+        reaching the floor"""
+        above_floor = self._mana_above_floor(account)
+        cost = self.podping_cost()
+        if above_floor is None or not cost:
+            return None
+        return max(0.0, above_floor / cost)
+
+    def time_to_floor(self, account: str) -> Optional[float]:
+        """Seconds until account reaches the floor at the rate it has been
+        spending RC lately, None if it isn't heading there"""
+        above_floor = self._mana_above_floor(account)
+        if above_floor is None or self.cost_per_op is None:
+            return None
+        model = self.models[account]
+        now = timer()
+        spent = sum(
+            self.cost(num_ops, num_bytes)
+            for sent_at, num_ops, num_bytes in model.recent
+            if now - sent_at <= RC_SPEND_WINDOW
+        )
+        drain = spent / RC_SPEND_WINDOW - model.regen_rate
+        if drain <= 0:
+            return None
+        return max(0.0, above_floor / drain)
+
+    def batch_period(self, base_period: float) -> float:
+        """How long to hold a batch open for more IRIs.  base_period while RC
+        allows a transaction that often, longer once it doesn't, so batches
+        fill up and the same IRIs take fewer operations."""
+        cost = self.podping_cost()
+        if not cost or not self.models:
+            return base_period
+
+        budget = 0.0
+        for account, model in self.models.items():
+            above_floor = self._mana_above_floor(account)
+            if above_floor is None:
+                # Not measured yet, don't hold anything back on its account
+                return base_period
+            budget += model.regen_rate + max(0.0, above_floor) / RC_SPEND_HORIZON
+        if budget <= 0:
+            return RC_MAX_BATCH_PERIOD
+        return min(RC_MAX_BATCH_PERIOD, max(base_period, cost / budget))
@@ -0,0 +1,79 @@
+import struct
+from binascii import unhexlify
+from datetime import datetime, timedelta
+from timeit import default_timer as timer
+from typing import NamedTuple, Optional
+
+import aiohttp
+
+from podping_hivewriter.hive_rpc import hive_rpc_call
+
+# How often the reference block is refreshed.  A transaction may reference any
+# of the last 65536 blocks (TaPoS), but a recent one keeps expiration times
+# accurate and rarely sits on a block that gets forked out.
+REF_BLOCK_REFRESH_PERIOD = 30
+# Fetch a new reference block before use once the cached one is this old
+REF_BLOCK_MAX_AGE = 120
+
+HIVE_TIME_FORMAT = "%Y-%m-%dT%H:%M:%S"
+
+
+class RefBlock(NamedTuple):
+    """What a transaction needs from the chain besides its operations"""
+
+    ref_block_num: int
+    ref_block_prefix: int
+    head_block_time: datetime
+    fetched_at: float
+
+    @classmethod
+    def from_dynamic_global_properties(
+        cls, dynamic_global_properties: dict, fetched_at: Optional[float] = None
+    ) -> "RefBlock":
+        return cls(
+            ref_block_num=dynamic_global_properties["head_block_number"] & 0xFFFF,
+            ref_block_prefix=struct.unpack_from(
+                "<I", unhexlify(dynamic_global_properties["head_block_id"]), 4
+            )[0],
+            head_block_time=datetime.strptime(
+                dynamic_global_properties["time"], HIVE_TIME_FORMAT
+            ),
+            fetched_at=timer() if fetched_at is None else fetched_at,
+        )
+
+    @property
+    def age(self) -> float:
+        return timer() - self.fetched_at
+
+    def expiration(self, seconds: float) -> str:
+        """Expiration for a transaction built now, in chain time"""
+        expiration = self.head_block_time + timedelta(seconds=self.age + seconds)
+        return expiration.strftime(HIVE_TIME_FORMAT)
+
+
+class RefBlockCache:
+    """Keeps a recent reference block so building a transaction doesn't
+    need a round trip to a node"""
+
+    def __init__(self, max_age: float = REF_BLOCK_MAX_AGE):
+        self.max_age = max_age
+        self._ref_block: Optional[RefBlock] = None
+
+    async def refresh(self, session: aiohttp.ClientSession, node: str) -> RefBlock:
+        dynamic_global_properties = await hive_rpc_call(
+            session, node, "condenser_api.get_dynamic_global_properties"
+        )
+        self._ref_block = RefBlock.from_dynamic_global_properties(
+            dynamic_global_properties
+        )
+        return self._ref_block
+
+    async def get(self, session: aiohttp.ClientSession, node: str) -> RefBlock:
+        ref_block = self._ref_block
+        if ref_block is None or ref_block.age > self.max_age:
+            ref_block = await self.refresh(session, node)
+        return ref_block
+
+    def invalidate(self) -> None:
+        """Forget the cached block, say after a transaction using it failed"""
+        self._ref_block = None
@@ -0,0 +1,116 @@
+import asyncio
+import random
+from timeit import default_timer as timer
+from typing import Optional
+
+# Bounds on the wait before retrying a failed broadcast, in seconds
+RETRY_BASE_DELAY = 1.0
+RETRY_MAX_DELAY = 300.0
+# Every retry, of any batch, takes a token.  The bucket allows bursts of
+# retries after a blip but holds a long outage to a trickle.
+RETRY_TOKENS_PER_SECOND = 0.2
+RETRY_TOKEN_CAPACITY = 20
+
+
+class TokenBucket:
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+
+        self._tokens = float(capacity)
+        self._updated = timer()
+
+    def _refill(self) -> None:
+        now = timer()
+        self._tokens = min(
+            self.capacity, self._tokens + (now - self._updated) * self.rate
+        )
+        self._updated = now
+
+    @property
+    def tokens(self) -> float:
+        self._refill()
+        return self._tokens
+
+    def try_take(self) -> bool:
+        self._refill()
+        if self._tokens < 1:
+            return False
+        self._tokens -= 1
+        return True
+
+    async def take(self) -> None:
+        while not self.try_take():
+            await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RetryBackoff:
+    """Retry state of a single batch"""
+
+    def __init__(self, policy: "RetryPolicy"):
+        self.policy = policy
+        self.retries = 0
+        self._delay = policy.base_delay
+
+    @property
+    def exhausted(self) -> bool:
+        budget = self.policy.budget
+        return budget is not None and self.retries >= budget
+
+    def next_delay(self) -> float:
+        """Exponential backoff with decorrelated jitter, so writers that
+        failed together don't all retry together"""
+        self._delay = min(
+            self.policy.max_delay,
+            random.uniform(self.policy.base_delay, self._delay * 3),  # nosec
+        )
+        return self._delay
+
+    async def sleep(self, delay: float) -> None:
+        """Wait out delay, then for a retry token"""
+        self.retries += 1
+        self.policy.total_retries += 1
+        self.policy.waiting += 1
+        try:
+            await asyncio.sleep(delay)
+            await self.policy.tokens.take()
+        finally:
+            self.policy.waiting -= 1
+
+
+class RetryPolicy:
+    """How failed broadcasts are retried.  Subclass and override backoff()
+    to change it.  budget is the number of retries a batch gets before it's
+    given up on, None to retry until it goes through."""
+
+    def __init__(
+        self,
+        base_delay: float = RETRY_BASE_DELAY,
+        max_delay: float = RETRY_MAX_DELAY,
+        budget: Optional[int] = None,
+        tokens_per_second: float = RETRY_TOKENS_PER_SECOND,
+        token_capacity: float = RETRY_TOKEN_CAPACITY,
+    ):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.budget = budget
+        self.tokens = TokenBucket(tokens_per_second, token_capacity)
+
+        self.waiting = 0
+        self.total_retries = 0
+        self.total_exhausted = 0
+
+    def backoff(self) -> RetryBackoff:
+        return RetryBackoff(self)
+
+    @property
+    def pressure(self) -> float:
+        """How much of the retry token bucket is used up, from 0 when retries
+        are rare to 1 when they're being held back"""
+        return 1 - self.tokens.tokens / self.tokens.capacity
+
+    def retry_after(self, period: float) -> float:
+        """How long a client turned away as busy should wait before sending
+        again.  A batch period while broadcasts go through, stretching toward
+        max_delay as failed broadcasts use up the retry tokens."""
+        return max(period, period + self.pressure * (self.max_delay - period))
@@ -0,0 +1,64 @@
+import json
+import logging
+import os
+import time
+from typing import Iterable, Optional
+
+from podping_hivewriter.local_cache import podping_cache_dir, write_json_atomically
+
+# Seconds a passed startup check is trusted for
+STARTUP_CACHE_MAX_AGE = 24 * 60 * 60
+
+
+def default_startup_cache_file() -> str:
+    return os.path.join(podping_cache_dir(), "startup-checks.json")
+
+
+class StartupCheckCache:
+    """The last startup check that passed, kept in a local file so a restart
+    soon after can skip the checks"""
+
+    def __init__(self, path: str, max_age: float = STARTUP_CACHE_MAX_AGE):
+        self.path = path
+        self.max_age = max_age
+
+    def load(self) -> Optional[dict]:
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable startup check cache {self.path}: {e}")
+            return None
+
+    def is_fresh(
+        self, accounts: Iterable[str], control_account: str, resource_test: bool
+    ) -> bool:
+        """True if the same accounts passed the same checks recently enough"""
+        cached = self.load()
+        if not cached:
+            return False
+        try:
+            return (
+                cached["accounts"] == sorted(accounts)
+                and cached["control_account"] == control_account
+                and (cached["resource_tested"] or not resource_test)
+                and 0 <= time.time() - cached["checked_at"] <= self.max_age
+            )
+        except (KeyError, TypeError):
+            return False
+
+    def save(
+        self, accounts: Iterable[str], control_account: str, resource_tested: bool
+    ) -> None:
+        cached = {
+            "accounts": sorted(accounts),
+            "control_account": control_account,
+            "resource_tested": resource_tested,
+            "checked_at": time.time(),
+        }
+        try:
+            write_json_atomically(self.path, cached)
+        except OSError as e:
+            logging.warning(f"Unable to save startup check cache {self.path}: {e}")
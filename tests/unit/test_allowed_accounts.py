@@ -0,0 +1,67 @@
+import pytest
+
+from podping_hivewriter import allowed_accounts
+from podping_hivewriter.allowed_accounts import AllowedAccountsCache
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+class FakeHiveWrapper:
+    nodes = ("https://down", "https://a")
+
+    async def wait_startup(self):
+        pass
+
+    async def get_session(self):
+        return None
+
+
+@pytest.mark.asyncio
+async def test_allowed_accounts_cache(monkeypatch):
+    following = ["podping.aaa", "podping.bbb", "podping.ccc"]
+    calls = []
+
+    async def fake_hive_rpc_call(session, node, method, params=None, timeout=10):
+        if node == "https://down":
+            raise ConnectionError(f"Cannot connect to {node}")
+        account_name, start, _, limit = params
+        calls.append(start)
+        names = [name for name in following if name >= start]
+        return [
+            {"follower": account_name, "following": name, "what": ["blog"]}
+            for name in names[:limit]
+        ]
+
+    monkeypatch.setattr(allowed_accounts, "hive_rpc_call", fake_hive_rpc_call)
+    monkeypatch.setattr(allowed_accounts, "FOLLOWING_PAGE_SIZE", 2)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with AllowedAccountsCache(
+        FakeHiveWrapper(), settings_manager, daemon=False
+    ) as cache:
+        changes = []
+
+        async def subscriber(added, removed):
+            changes.append((added, removed))
+
+        cache.subscribe(subscriber)
+        assert "podping.aaa" not in cache
+
+        # From the next node when the first one is down
+        assert await cache.get() == set(following)
+        # Each page starts where the last one left off
+        assert calls == ["", "podping.bbb", "podping.ccc"]
+        assert "podping.ccc" in cache
+        assert changes == [(set(following), set())]
+
+        # Already fetched, get doesn't go back to Hive
+        await cache.get()
+        assert len(calls) == 3
+
+        following.remove("podping.bbb")
+        following.append("podping.ddd")
+        await cache.refresh()
+        assert changes[-1] == ({"podping.ddd"}, {"podping.bbb"})
+        assert "podping.bbb" not in cache
+
+        await cache.refresh()
+        assert len(changes) == 2
@@ -0,0 +1,85 @@
+import pytest
+from beembase.signedtransactions import Signed_Transaction, known_chains
+from beemgraphenebase.account import PrivateKey
+
+from podping_hivewriter import async_broadcaster, ref_block_cache
+from podping_hivewriter.async_broadcaster import AsyncBroadcaster
+
+DYNAMIC_GLOBAL_PROPERTIES = {
+    "head_block_number": 70000000,
+    "head_block_id": "042c1d80" + "11" * 16,
+    "time": "2022-01-01T00:00:00",
+}
+
+
+@pytest.mark.asyncio
+async def test_broadcast_signs_with_the_accounts_posting_key(monkeypatch):
+    chain_params = known_chains["HIVE"]
+    other_key = PrivateKey()
+    posting_key = PrivateKey()
+    public_key = format(posting_key.pubkey, "STM")
+    calls = []
+
+    async def fake_hive_rpc_call(session, node, method, params=None, timeout=10):
+        calls.append(method)
+        if method == "condenser_api.get_accounts":
+            return [{"posting": {"key_auths": [[public_key, 1]]}}]
+        if method == "condenser_api.get_dynamic_global_properties":
+            return DYNAMIC_GLOBAL_PROPERTIES
+        if method == "condenser_api.broadcast_transaction":
+            calls.append(params[0])
+            return {}
+
+    monkeypatch.setattr(async_broadcaster, "hive_rpc_call", fake_hive_rpc_call)
+    monkeypatch.setattr(ref_block_cache, "hive_rpc_call", fake_hive_rpc_call)
+
+    broadcaster = AsyncBroadcaster([str(other_key), str(posting_key)])
+    payloads = [{"urls": ["https://example.com/a.xml"]}, {"urls": []}]
+    for _ in range(2):
+        ret = await broadcaster.broadcast_custom_json_ops(
+            "https://node", chain_params, "podping", payloads, ["podping.aaa"]
+        )
+    await broadcaster.close()
+
+    # The key and reference block are only looked up once
+    assert calls.count("condenser_api.get_accounts") == 1
+    assert calls.count("condenser_api.get_dynamic_global_properties") == 1
+    sent = calls[-1]
+    assert sent["ref_block_num"] == 70000000 & 0xFFFF
+    assert sent["ref_block_prefix"] == 0x11111111
+    assert sent["expiration"].startswith("2022-01-01T00:00:3")
+    assert [op[1]["json"] for op in sent["operations"]] == [
+        '{"urls":["https://example.com/a.xml"]}',
+        '{"urls":[]}',
+    ]
+
+    tx = Signed_Transaction(**sent)
+    assert tx.id == ret["trx_id"]
+    assert tx.verify([posting_key.pubkey], chain=chain_params)
+
+
+@pytest.mark.asyncio
+async def test_posting_key_of_an_account_with_posting_authority(monkeypatch):
+    other_key = PrivateKey()
+    app_key = PrivateKey()
+
+    async def fake_hive_rpc_call(session, node, method, params=None, timeout=10):
+        assert method == "condenser_api.get_accounts"
+        if params == [["podping.aaa"]]:
+            return [
+                {
+                    "posting": {
+                        "key_auths": [[format(other_key.pubkey, "STM"), 1]],
+                        "account_auths": [["podping.app", 1]],
+                    }
+                }
+            ]
+        if params == [["podping.app"]]:
+            return [{"posting": {"key_auths": [[format(app_key.pubkey, "STM"), 1]]}}]
+
+    monkeypatch.setattr(async_broadcaster, "hive_rpc_call", fake_hive_rpc_call)
+
+    broadcaster = AsyncBroadcaster([str(app_key)])
+    wif = await broadcaster.posting_wif("https://node", "podping.aaa", "STM")
+    await broadcaster.close()
+    assert wif == str(app_key)
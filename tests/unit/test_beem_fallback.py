@@ -0,0 +1,48 @@
+import pytest
+from beem.exceptions import MissingKeyError
+
+from podping_hivewriter import hive_wrapper
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+class FakeHive:
+    chain_params = {"prefix": "STM"}
+
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+
+@pytest.mark.asyncio
+async def test_beem_signs_when_the_posting_key_cant_be_found(monkeypatch):
+    async def fake_get_hive(nodes, posting_keys=None, nobroadcast=False):
+        return FakeHive(tuple(nodes))
+
+    async def no_posting_key(*args):
+        raise MissingKeyError("No posting key given for @podping.aaa")
+
+    beem_signed = []
+
+    async def fake_sign_custom_json_ops(
+        hive, operation_id, payloads, required_posting_auths
+    ):
+        beem_signed.append(required_posting_auths)
+        if required_posting_auths == ["podping.bbb"]:
+            raise MissingKeyError("No private key for podping.bbb")
+        return {"signatures": ["beem"]}, "beem"
+
+    monkeypatch.setattr(hive_wrapper, "get_hive", fake_get_hive)
+    monkeypatch.setattr(hive_wrapper, "sign_custom_json_ops", fake_sign_custom_json_ops)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveWrapper([], settings_manager, daemon=False, dry_run=True) as wrapper:
+        monkeypatch.setattr(
+            wrapper.async_broadcaster, "sign_custom_json_ops", no_posting_key
+        )
+        tx = await wrapper.custom_json_ops("podping", [{}], ["podping.aaa"])
+        assert tx == {"signatures": ["beem"], "trx_id": "beem"}
+
+        # Beem can't find one either
+        with pytest.raises(MissingKeyError):
+            await wrapper.custom_json_ops("podping", [{}], ["podping.bbb"])
+        assert beem_signed == [["podping.aaa"], ["podping.bbb"]]
@@ -0,0 +1,34 @@
+from podping_hivewriter.constants import (
+    HIVE_MAX_CUSTOM_OPS_PER_BLOCK,
+    HIVE_MAX_TRANSACTION_SIZE,
+)
+from podping_hivewriter.hive_wrapper import (
+    CUSTOM_JSON_OP_OVERHEAD,
+    TRANSACTION_OVERHEAD,
+    group_custom_json_payloads,
+)
+from podping_hivewriter.podping_payload import (
+    pack_iris,
+    podping_payload,
+    size_of_dict_as_json,
+)
+
+
+def test_group_custom_json_payloads_respects_chain_limits():
+    iris = {f"https://example.com/feeds/{i:05}/feed.xml" for i in range(3000)}
+    payloads = [podping_payload(iris) for iris in pack_iris(iris)]
+
+    groups = group_custom_json_payloads(payloads)
+
+    assert [payload for group in groups for payload in group] == payloads
+    for group in groups:
+        assert 0 < len(group) <= HIVE_MAX_CUSTOM_OPS_PER_BLOCK
+        group_size = TRANSACTION_OVERHEAD + sum(
+            size_of_dict_as_json(payload) + CUSTOM_JSON_OP_OVERHEAD for payload in group
+        )
+        assert group_size <= HIVE_MAX_TRANSACTION_SIZE
+    assert len(groups) == -(-len(payloads) // HIVE_MAX_CUSTOM_OPS_PER_BLOCK)
+
+
+def test_group_custom_json_payloads_empty():
+    assert group_custom_json_payloads([]) == []
@@ -0,0 +1,127 @@
+import asyncio
+from types import SimpleNamespace
+
+import aiohttp
+import pytest
+from beemapi.exceptions import NumRetriesReached, RPCError, UnhandledRPCError
+
+from podping_hivewriter import hive_wrapper
+from podping_hivewriter.exceptions import HiveRpcError
+from podping_hivewriter.hive_rpc import is_node_fault
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.node_health import BREAKER_FAILURE_THRESHOLD, BreakerState
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+def http_error(status):
+    request_info = SimpleNamespace(real_url="https://node")
+    return aiohttp.ClientResponseError(request_info, (), status=status)
+
+
+class FakeHive:
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+
+@pytest.mark.asyncio
+async def test_send_hedged(monkeypatch):
+    async def fake_get_hive(nodes, posting_keys=None, nobroadcast=False):
+        return FakeHive(tuple(nodes))
+
+    behaviour = {}
+    sent_to = []
+
+    async def fake_broadcast_transaction(hive, tx):
+        node = hive.nodes[0]
+        sent_to.append(node)
+        action = behaviour.get(node, "ok")
+        if action == "hang":
+            await asyncio.sleep(10)
+        elif action == "duplicate":
+            raise Exception("Duplicate transaction check failed")
+        elif action == "fail":
+            raise Exception("Unable to acquire database lock")
+
+    monkeypatch.setattr(hive_wrapper, "get_hive", fake_get_hive)
+    monkeypatch.setattr(
+        hive_wrapper, "broadcast_transaction", fake_broadcast_transaction
+    )
+    monkeypatch.setattr(hive_wrapper, "HEDGE_DEFAULT_DELAY", 0.05)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveWrapper([], settings_manager, daemon=False, hedge_nodes=2) as wrapper:
+        await wrapper.wait_startup()
+        client = wrapper._client
+        first, second, third = wrapper.nodes[:3]
+
+        # Slow primary, the next node already has it from elsewhere
+        behaviour.update({first: "hang", second: "duplicate"})
+        await asyncio.wait_for(wrapper._send_hedged(client, {}), timeout=1)
+        assert sent_to == [first, second]
+
+        # A failing primary moves on without waiting
+        sent_to.clear()
+        behaviour.update({first: "fail", second: "ok"})
+        await asyncio.wait_for(wrapper._send_hedged(client, {}), timeout=0.04)
+        assert sent_to == [first, second]
+
+        sent_to.clear()
+        behaviour.update({first: "fail", second: "fail", third: "fail"})
+        with pytest.raises(Exception, match="database lock"):
+            await wrapper._send_hedged(client, {})
+        assert sent_to == [first, second, third]
+
+        # No hedging unless asked for
+        sent_to.clear()
+        wrapper.hedge_nodes = 0
+        with pytest.raises(Exception, match="database lock"):
+            await wrapper._send_hedged(client, {})
+        assert sent_to == [first]
+
+
+@pytest.mark.asyncio
+async def test_only_node_faults_count_against_a_node(monkeypatch):
+    async def fake_get_hive(nodes, posting_keys=None, nobroadcast=False):
+        return FakeHive(tuple(nodes))
+
+    errors = []
+
+    async def fake_broadcast_transaction(hive, tx):
+        raise errors[0]
+
+    monkeypatch.setattr(hive_wrapper, "get_hive", fake_get_hive)
+    monkeypatch.setattr(
+        hive_wrapper, "broadcast_transaction", fake_broadcast_transaction
+    )
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveWrapper([], settings_manager, daemon=False) as wrapper:
+        await wrapper.wait_startup()
+        client = wrapper._client
+        node = wrapper.nodes[0]
+        breaker = wrapper.node_health.stats[node].breaker
+
+        # The chain refusing the transaction says nothing about the node
+        errors[:] = [UnhandledRPCError("Please wait to transact, or power up HP")]
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            with pytest.raises(UnhandledRPCError):
+                await wrapper._send_transaction(client, node, {})
+        assert breaker.state == BreakerState.CLOSED
+
+        errors[:] = [http_error(503)]
+        for _ in range(BREAKER_FAILURE_THRESHOLD):
+            with pytest.raises(aiohttp.ClientResponseError):
+                await wrapper._send_transaction(client, node, {})
+        assert breaker.state == BreakerState.OPEN
+
+
+def test_is_node_fault():
+    assert is_node_fault(NumRetriesReached())
+    assert is_node_fault(asyncio.TimeoutError())
+    assert is_node_fault(aiohttp.ClientConnectionError())
+    assert is_node_fault(RPCError("Client returned invalid format. Expected JSON!"))
+    assert is_node_fault(http_error(502))
+
+    assert not is_node_fault(http_error(400))
+    assert not is_node_fault(HiveRpcError("transaction expiration exception"))
+    assert not is_node_fault(UnhandledRPCError("missing required posting authority"))
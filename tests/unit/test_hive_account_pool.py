@@ -0,0 +1,65 @@
+import pytest
+
+from podping_hivewriter.hive_account_pool import HiveAccountPool
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+@pytest.mark.asyncio
+async def test_acquire_prefers_most_rc_headroom():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveAccountPool(
+        ["podping.aaa", "podping.bbb", "podping.aaa"],
+        None,
+        settings_manager,
+        daemon=False,
+    ) as account_pool:
+        assert account_pool.accounts == ["podping.aaa", "podping.bbb"]
+
+        # Nothing measured yet, spread over the accounts
+        async with account_pool.acquire() as first:
+            async with account_pool.acquire() as second:
+                assert {first, second} == {"podping.aaa", "podping.bbb"}
+
+        account_pool.rc_manabars = {
+            "podping.aaa": {"current_mana": 100},
+            "podping.bbb": {"current_mana": 300},
+        }
+        async with account_pool.acquire() as first:
+            assert first == "podping.bbb"
+            # Busy with one broadcast, half of bbb's mana is still more than aaa
+            async with account_pool.acquire() as second:
+                assert second == "podping.bbb"
+                async with account_pool.acquire() as third:
+                    assert third == "podping.aaa"
+
+        account_pool.set_active(["podping.aaa"])
+        async with account_pool.acquire() as only:
+            assert only == "podping.aaa"
+
+        # Configured accounts can come back, in their configured order
+        account_pool.set_active(["podping.bbb", "podping.aaa"])
+        assert account_pool.accounts == ["podping.aaa", "podping.bbb"]
+
+
+@pytest.mark.asyncio
+async def test_acquire_keeps_accounts_within_ops_per_block():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveAccountPool(
+        ["podping.aaa", "podping.bbb"], None, settings_manager, daemon=False
+    ) as account_pool:
+        account_pool.rc_manabars = {
+            "podping.aaa": {"current_mana": 1000},
+            "podping.bbb": {"current_mana": 100},
+        }
+        async with account_pool.acquire(4) as first:
+            assert first == "podping.aaa"
+        # aaa only has room for one more operation this block
+        async with account_pool.acquire(2) as second:
+            assert second == "podping.bbb"
+        async with account_pool.acquire(1) as third:
+            assert third == "podping.aaa"
+        assert account_pool.best_account(4) is None
+        # The startup check posts with a given account, within the same limit
+        async with account_pool.acquire(1, account="podping.bbb") as fourth:
+            assert fourth == "podping.bbb"
+        assert account_pool.best_account(3, ["podping.bbb"]) is None
@@ -0,0 +1,24 @@
+import pytest
+
+from podping_hivewriter import hive
+from podping_hivewriter.hive import get_hive
+
+
+@pytest.mark.asyncio
+async def test_get_hive_reuses_clients(monkeypatch):
+    built = []
+
+    async def fake_new_hive(nodes, posting_keys=None, nobroadcast=False):
+        built.append(nodes)
+        return object()
+
+    monkeypatch.setattr(hive, "new_hive", fake_new_hive)
+    monkeypatch.setattr(hive, "_hive_clients", {})
+
+    first = await get_hive(("https://a", "https://b"), ["key"])
+    # Same first node, keys and mode, whatever the fallback order
+    assert await get_hive(("https://a", "https://c"), ["key"]) is first
+    assert await get_hive(("https://b", "https://a"), ["key"]) is not first
+    assert await get_hive(("https://a", "https://b"), ["other"]) is not first
+    assert await get_hive(("https://a",), ["key"], nobroadcast=True) is not first
+    assert len(built) == 4
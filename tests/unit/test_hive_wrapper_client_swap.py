@@ -0,0 +1,92 @@
+import asyncio
+
+import pytest
+
+from podping_hivewriter import hive_wrapper
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+class FakeHive:
+    def __init__(self, nodes):
+        self.nodes = nodes
+
+
+@pytest.mark.asyncio
+async def test_rotate_does_not_wait_for_broadcast(monkeypatch):
+    async def fake_get_hive(nodes, posting_keys=None, nobroadcast=False):
+        return FakeHive(tuple(nodes))
+
+    broadcast_started = asyncio.Event()
+    release_broadcast = asyncio.Event()
+
+    async def hung_broadcast(
+        self, client, operation_id, payloads, required_posting_auths, on_signed=None
+    ):
+        broadcast_started.set()
+        await release_broadcast.wait()
+        return {"trx_id": client.hive.nodes[0]}
+
+    monkeypatch.setattr(hive_wrapper, "get_hive", fake_get_hive)
+    monkeypatch.setattr(HiveWrapper, "_broadcast", hung_broadcast)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveWrapper([], settings_manager, daemon=False) as wrapper:
+        first_hive = await wrapper.get_hive()
+        first_node = wrapper.nodes[0]
+
+        broadcast = asyncio.create_task(
+            wrapper.custom_json("podping", {}, ["podping.aaa"])
+        )
+        await broadcast_started.wait()
+
+        # Healthy and unmeasured, no reason to move
+        await asyncio.wait_for(wrapper.rotate_nodes(), timeout=1)
+        assert await wrapper.get_hive() is first_hive
+
+        wrapper.node_health.record_failure(first_node)
+        await asyncio.wait_for(wrapper.rotate_nodes(), timeout=1)
+        rotated_hive = await asyncio.wait_for(wrapper.get_hive(), timeout=1)
+        assert rotated_hive is not first_hive
+        assert rotated_hive.nodes == wrapper.nodes
+        assert wrapper.nodes[0] != first_node
+
+        # The hung broadcast finishes on the client it started with
+        release_broadcast.set()
+        assert (await broadcast)["trx_id"] == first_node
+
+
+@pytest.mark.asyncio
+async def test_rotate_does_not_wait_for_hung_connect(monkeypatch):
+    hung_node = []
+    release_connect = asyncio.Event()
+
+    async def fake_get_hive(nodes, posting_keys=None, nobroadcast=False):
+        if nodes[0] in hung_node:
+            await release_connect.wait()
+        return FakeHive(tuple(nodes))
+
+    monkeypatch.setattr(hive_wrapper, "get_hive", fake_get_hive)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with HiveWrapper([], settings_manager, daemon=False) as wrapper:
+        await wrapper.wait_startup()
+        first_node = wrapper.nodes[0]
+
+        # The next best node never answers
+        wrapper.node_health.record_failure(first_node)
+        hung_node.append(wrapper.node_health.best_node(first_node))
+        hung_rotation = asyncio.create_task(wrapper.rotate_nodes())
+        await asyncio.sleep(0)
+        assert not hung_rotation.done()
+
+        # Another rotation goes ahead regardless
+        wrapper.node_health.record_failure(hung_node[0])
+        await asyncio.wait_for(wrapper.rotate_nodes(), timeout=1)
+        rotated_node = wrapper.nodes[0]
+        assert rotated_node not in (first_node, hung_node[0])
+
+        # The connect that hung finishes late and isn't put in place
+        release_connect.set()
+        await hung_rotation
+        assert wrapper.nodes[0] == rotated_node
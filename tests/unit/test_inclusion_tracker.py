@@ -0,0 +1,134 @@
+import asyncio
+
+import pytest
+
+from podping_hivewriter import inclusion_tracker
+from podping_hivewriter.inclusion_tracker import InclusionTracker
+
+
+class FakeBlockStream:
+    daemon = True
+    last_irreversible_block_num = 0
+
+    def __init__(self):
+        # What the node has now, by block number
+        self.blocks = {}
+
+    def subscribe(self, subscriber):
+        self.subscriber = subscriber
+
+    async def publish(self, block):
+        self.blocks[block["block_num"]] = block
+        await self.subscriber(block)
+
+    async def get_block(self, block_num):
+        return self.blocks.get(block_num)
+
+
+class FakeHiveWrapper:
+    def __init__(self):
+        self.rebroadcasts = []
+
+    async def rebroadcast(self, tx):
+        self.rebroadcasts.append(tx)
+
+
+def block(block_num, timestamp, transaction_ids=()):
+    return {
+        "block_num": block_num,
+        "timestamp": timestamp,
+        "transaction_ids": list(transaction_ids),
+    }
+
+
+def signed_tx(trx_id, expiration):
+    return {"trx_id": trx_id, "expiration": expiration, "operations": []}
+
+
+@pytest.mark.asyncio
+async def test_inclusion_tracker(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(inclusion_tracker, "timer", lambda: now[0])
+
+    block_stream = FakeBlockStream()
+    hive_wrapper = FakeHiveWrapper()
+    tracker = InclusionTracker(hive_wrapper, block_stream)
+    expired = []
+    confirmed = []
+
+    async def on_expired(trx_id):
+        expired.append(trx_id)
+
+    async def on_confirmed(trx_id):
+        confirmed.append(trx_id)
+
+    for trx_id in ("landed", "dropped"):
+        tracker.track(
+            signed_tx(trx_id, "2022-01-01T00:00:30"),
+            lambda trx_id=trx_id: on_expired(trx_id),
+            lambda trx_id=trx_id: on_confirmed(trx_id),
+        )
+
+    now[0] += 3
+    await block_stream.publish(block(10, "2022-01-01T00:00:03", ["landed"]))
+    assert tracker.pending["landed"].block_num == 10
+    assert list(tracker.inclusion_latencies) == [3]
+
+    # Not seen for a while, sent again as it was signed
+    now[0] += 12
+    block_stream.last_irreversible_block_num = 10
+    await block_stream.publish(block(14, "2022-01-01T00:00:15"))
+    await asyncio.sleep(0)
+    assert tracker.total_confirmed == 1
+    assert hive_wrapper.rebroadcasts == [
+        {"expiration": "2022-01-01T00:00:30", "operations": []}
+    ]
+
+    now[0] += 18
+    await block_stream.publish(block(20, "2022-01-01T00:00:33"))
+    await asyncio.sleep(0)
+    assert expired == ["dropped"]
+    assert confirmed == ["landed"]
+    assert tracker.pending == {}
+    assert tracker.total_expired == 1
+
+
+@pytest.mark.asyncio
+async def test_transaction_in_a_forked_out_block(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(inclusion_tracker, "timer", lambda: now[0])
+
+    block_stream = FakeBlockStream()
+    hive_wrapper = FakeHiveWrapper()
+    tracker = InclusionTracker(hive_wrapper, block_stream)
+    expired = []
+
+    async def on_expired():
+        expired.append("forked")
+
+    tracker.track(signed_tx("forked", "2022-01-01T00:00:30"), on_expired)
+
+    now[0] += 3
+    await block_stream.publish(block(10, "2022-01-01T00:00:03", ["forked"]))
+    assert tracker.pending["forked"].block_num == 10
+
+    # The chain settled on another block 10, without the transaction
+    block_stream.blocks[10] = block(10, "2022-01-01T00:00:03")
+    block_stream.last_irreversible_block_num = 10
+    await block_stream.publish(block(11, "2022-01-01T00:00:06"))
+    await asyncio.sleep(0)
+    assert tracker.total_confirmed == 0
+    assert tracker.total_forked == 1
+    assert tracker.pending["forked"].block_num is None
+
+    # Followed again like any transaction not in a block
+    now[0] += 12
+    await block_stream.publish(block(15, "2022-01-01T00:00:18"))
+    await asyncio.sleep(0)
+    assert len(hive_wrapper.rebroadcasts) == 1
+
+    now[0] += 15
+    await block_stream.publish(block(20, "2022-01-01T00:00:33"))
+    await asyncio.sleep(0)
+    assert expired == ["forked"]
+    assert tracker.pending == {}
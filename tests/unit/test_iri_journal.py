@@ -0,0 +1,145 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from podping_hivewriter.constants import ZMQ_BULK_MARKER
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.iri_journal import IriJournal
+from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+@pytest.mark.asyncio
+async def test_journal_survives_reopening(tmp_path):
+    path = str(tmp_path / "journal.db")
+    journal = IriJournal(path)
+    assert journal.last_id == 0
+    assert await journal.unsent() == []
+
+    # Appended together while nothing else is committing, in a single commit
+    await asyncio.gather(
+        journal.append(["https://example.com/a.xml"]),
+        journal.append(["https://example.com/b.xml", "https://example.com/c.xml"]),
+    )
+    assert journal.total_commits == 1
+    batch_id = journal.last_id
+    assert batch_id == 3
+
+    # Accepted again after being batched
+    await journal.append(["https://example.com/a.xml"])
+    await journal.remove(
+        ["https://example.com/a.xml", "https://example.com/b.xml"], batch_id
+    )
+    journal.close()
+
+    journal = IriJournal(path)
+    assert journal.last_id == 4
+    assert await journal.unsent() == [
+        "https://example.com/c.xml",
+        "https://example.com/a.xml",
+    ]
+    journal.close()
+
+
+async def _no_startup(_self):
+    pass
+
+
+def _journaled_writer(path, **kwargs):
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa",
+            [],
+            settings_manager,
+            iri_journal_file=path,
+            daemon=False,
+            status=False,
+            **kwargs,
+        )
+    podping_hivewriter._startup_done = True
+    return podping_hivewriter
+
+
+@pytest.mark.asyncio
+async def test_zmq_requests_share_a_commit(tmp_path):
+    with _journaled_writer(str(tmp_path / "journal.db")) as podping_hivewriter:
+        replies = await podping_hivewriter._zmq_replies(
+            [
+                [b"https://example.com/a.xml"],
+                [b"not an iri"],
+                [ZMQ_BULK_MARKER, b"https://example.com/b.xml", b"nope"],
+            ]
+        )
+        assert replies == ["OK", "Invalid IRI", "OI"]
+        assert podping_hivewriter.iri_journal.total_commits == 1
+        assert podping_hivewriter.iri_queue.qsize() == 2
+
+
+@pytest.mark.asyncio
+async def test_journal_kept_until_confirmed(tmp_path):
+    iris = ["https://example.com/a.xml", "https://example.com/b.xml"]
+    with _journaled_writer(str(tmp_path / "journal.db")) as podping_hivewriter:
+        journal = podping_hivewriter.iri_journal
+        block_stream = podping_hivewriter.block_stream
+        # Once the block stream has started up without its loop
+        await asyncio.sleep(0)
+        block_stream.daemon = True
+
+        async def custom_json_ops(*_args, on_signed=None):
+            tx = {"trx_id": "abc", "expiration": "2022-01-01T00:00:30"}
+            on_signed(tx)
+            return tx
+
+        async def get_block(block_num):
+            return {"block_num": block_num, "transaction_ids": ["abc"]}
+
+        podping_hivewriter.hive_wrapper.custom_json_ops = custom_json_ops
+        block_stream.get_block = get_block
+
+        assert await podping_hivewriter._receive_iris(iris) == "OO"
+        trx_ids, _ = await podping_hivewriter.failure_retry(set(iris), journal.last_id)
+        assert trx_ids == ["abc"]
+        # Broadcast, but not yet in an irreversible block
+        assert sorted(await journal.unsent()) == iris
+
+        block_stream.last_irreversible_block_num = 10
+        await podping_hivewriter.inclusion_tracker._on_block(
+            {
+                "block_num": 10,
+                "timestamp": "2022-01-01T00:00:03",
+                "transaction_ids": ["abc"],
+            }
+        )
+        while podping_hivewriter.inclusion_tracker._tasks:
+            await asyncio.sleep(0.01)
+        assert podping_hivewriter.inclusion_tracker.total_confirmed == 1
+        assert await journal.unsent() == []
+
+
+@pytest.mark.asyncio
+async def test_iris_waiting_on_the_journal_count_as_queued(tmp_path):
+    with _journaled_writer(
+        str(tmp_path / "journal.db"), iri_queue_high_water=10
+    ) as podping_hivewriter:
+        bulk = [ZMQ_BULK_MARKER] + [
+            f"https://example.com/{i}.xml".encode() for i in range(100)
+        ]
+        (reply,) = await podping_hivewriter._zmq_replies([bulk])
+        assert reply.startswith("O" * 10 + "B" * 90 + " retry-after=")
+
+        # Requests waiting on the same commit don't each get the room left
+        podping_hivewriter.iri_queue = asyncio.Queue()
+        statuses = await asyncio.gather(
+            *(
+                podping_hivewriter._receive_iris(
+                    [f"https://example.com/{i}/{j}.xml" for j in range(4)]
+                )
+                for i in range(5)
+            )
+        )
+        assert "".join(statuses).count("O") == 10
+        assert podping_hivewriter.iri_queue.qsize() == 10
@@ -0,0 +1,65 @@
+from podping_hivewriter import node_health
+from podping_hivewriter.node_health import BreakerState, CircuitBreaker, NodeHealth
+
+
+def test_ranked_nodes_by_score_then_configured_order():
+    health = NodeHealth(["https://a", "https://b", "https://c", "https://d"])
+    assert health.ranked_nodes() == ("https://a", "https://b", "https://c", "https://d")
+
+    health.record_success("https://c", 0.1)
+    health.record_success("https://b", 0.3)
+    health.record_success("https://d", 0.2)
+    health.record_failure("https://d")
+    assert health.ranked_nodes() == ("https://c", "https://b", "https://d", "https://a")
+
+
+def test_best_node_sticks_to_working_node():
+    health = NodeHealth(["https://a", "https://b"])
+    health.record_success("https://a", 0.2)
+    health.record_success("https://b", 0.18)
+    assert health.best_node("https://a") == "https://a"
+
+    health.record_success("https://b", 0.01)
+    assert health.best_node("https://a") == "https://b"
+
+    health.record_failure("https://b")
+    health.record_failure("https://b")
+    assert health.best_node("https://b") == "https://a"
+
+
+def test_circuit_breaker_half_open(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(node_health, "timer", lambda: now[0])
+
+    breaker = CircuitBreaker(failure_threshold=2, reset_timeout=10)
+    breaker.record_failure()
+    assert breaker.state == BreakerState.CLOSED
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+    assert not breaker.available
+
+    now[0] += 10
+    assert breaker.available
+    breaker.begin_request()
+    assert breaker.state == BreakerState.HALF_OPEN
+    # Only one trial at a time
+    assert not breaker.available
+
+    # A failed trial opens it again straight away
+    breaker.record_failure()
+    assert breaker.state == BreakerState.OPEN
+
+    now[0] += 10
+    breaker.begin_request()
+    breaker.record_success()
+    assert breaker.state == BreakerState.CLOSED
+    assert breaker.available
+
+
+def test_update_nodes_keeps_known_stats():
+    health = NodeHealth(["https://a", "https://b"])
+    health.record_success("https://b", 0.1)
+    health.update_nodes(["https://b", "https://c"])
+    assert health.nodes == ("https://b", "https://c")
+    assert health.stats["https://b"].latency == 0.1
+    assert health.stats["https://c"].latency is None
@@ -0,0 +1,168 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from podping_hivewriter.constants import HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.models.podping_settings import PodpingSettings
+from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_payload import (
+    podping_payload,
+    size_of_dict_as_json,
+    size_of_str_as_json,
+)
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+async def _no_startup(_self):
+    pass
+
+
+def urls_size(iris):
+    return 2 + sum(size_of_str_as_json(iri) for iri in iris) + len(iris) - 1
+
+
+def payload_size(iri_batch):
+    return size_of_dict_as_json(podping_payload(iri_batch.iri_set))
+
+
+@pytest.mark.asyncio
+async def test_batches_follow_max_url_list_bytes():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=1000))
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa", [], settings_manager, daemon=False, status=False
+        )
+
+    with podping_hivewriter:
+        batch_loop = asyncio.create_task(podping_hivewriter._iri_batch_loop())
+        podping_hivewriter._add_task(batch_loop)
+        for i in range(300):
+            podping_hivewriter.iri_queue.put_nowait(f"https://example.com/{i}.xml")
+
+        iri_batch = await asyncio.wait_for(podping_hivewriter.iri_batch_queue.get(), 1)
+        assert 900 < urls_size(iri_batch.iri_set) <= 1000
+
+        # The batch after the current one takes the new limit
+        await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=3000))
+        await asyncio.wait_for(podping_hivewriter.iri_batch_queue.get(), 1)
+        iri_batch = await asyncio.wait_for(podping_hivewriter.iri_batch_queue.get(), 1)
+        assert 2900 < urls_size(iri_batch.iri_set) <= 3000
+
+        # Never beyond what Hive allows
+        await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=20000))
+        iris = {f"https://example.com/{i}/feed.xml" for i in range(1000)}
+        payloads, _ = podping_hivewriter._pack_payloads(iris)
+        for payload in payloads:
+            assert size_of_dict_as_json(payload) <= HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+
+    # Before Python 3.12, wait_for loses a cancellation that arrives just as
+    # it's handed an IRI
+    while not batch_loop.done():
+        batch_loop.cancel()
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_default_settings_fill_payloads():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa", [], settings_manager, daemon=False, status=False
+        )
+
+    with podping_hivewriter:
+        batch_loop = asyncio.create_task(podping_hivewriter._iri_batch_loop())
+        podping_hivewriter._add_task(batch_loop)
+        for i in range(300):
+            podping_hivewriter.iri_queue.put_nowait(f"https://example.com/{i}.xml")
+
+        # max_url_list_bytes holds the urls, the envelope comes on top
+        iri_batch = await asyncio.wait_for(podping_hivewriter.iri_batch_queue.get(), 1)
+        assert 7400 < urls_size(iri_batch.iri_set) <= 7500
+        assert 7500 < payload_size(iri_batch) <= HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+
+    while not batch_loop.done():
+        batch_loop.cancel()
+        await asyncio.sleep(0.01)
+
+
+@pytest.mark.asyncio
+async def test_iri_too_large_once_the_limit_shrinks(tmp_path):
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa",
+            [],
+            settings_manager,
+            iri_journal_file=str(tmp_path / "journal.db"),
+            daemon=False,
+            status=False,
+        )
+    podping_hivewriter._startup_done = True
+
+    with podping_hivewriter:
+        sent = []
+
+        async def custom_json_ops(operation_id, payloads, accounts, on_signed=None):
+            sent.append(payloads)
+            return {"trx_id": "abc"}
+
+        podping_hivewriter.hive_wrapper.custom_json_ops = custom_json_ops
+
+        large_iri = f"https://example.com/{'x' * 6000}.xml"
+        iris = {large_iri, "https://example.com/a.xml"}
+        journal = podping_hivewriter.iri_journal
+        await podping_hivewriter._receive_iris(list(iris))
+
+        # Batched under the default limit, sent under a lower one
+        await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=5000))
+        trx_ids, _ = await podping_hivewriter.failure_retry(iris, journal.last_id)
+        assert trx_ids == ["abc"]
+        assert sent == [[podping_payload(["https://example.com/a.xml"])]]
+        assert await journal.unsent() == []
+
+
+@pytest.mark.asyncio
+async def test_carried_over_iri_too_large_for_the_next_batch():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=1000))
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa", [], settings_manager, daemon=False, status=False
+        )
+
+    with podping_hivewriter:
+        batch_loop = asyncio.create_task(podping_hivewriter._iri_batch_loop())
+        podping_hivewriter._add_task(batch_loop)
+        # The current batch keeps the limit it started with
+        await asyncio.sleep(0)
+        await settings_manager.set_settings(PodpingSettings(max_url_list_bytes=500))
+
+        iris = [f"https://example.com/{i}.xml" for i in range(20)]
+        iris.append(f"https://example.com/{'x' * 600}.xml")
+        for iri in iris:
+            podping_hivewriter.iri_queue.put_nowait(iri)
+        podping_hivewriter._iris_in_flight = len(iris)
+
+        iri_batch = await asyncio.wait_for(podping_hivewriter.iri_batch_queue.get(), 1)
+        assert iri_batch.iri_set == set(iris[:-1])
+        for _ in range(100):
+            if podping_hivewriter._iris_in_flight < len(iris):
+                break
+            await asyncio.sleep(0.01)
+        assert podping_hivewriter._iris_in_flight == len(iris) - 1
+
+    while not batch_loop.done():
+        batch_loop.cancel()
+        await asyncio.sleep(0.01)
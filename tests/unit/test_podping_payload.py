@@ -0,0 +1,86 @@
+import math
+import random
+
+import pytest
+
+from podping_hivewriter.constants import HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+from podping_hivewriter.exceptions import PodpingCustomJsonPayloadExceeded
+from podping_hivewriter.podping_payload import (
+    PodpingPayloadPacker,
+    pack_iris,
+    podping_payload,
+    size_of_dict_as_json,
+)
+
+
+def test_packer_size_is_exact():
+    packer = PodpingPayloadPacker()
+    assert packer.size == size_of_dict_as_json(packer.payload())
+
+    # Crosses num_urls digit boundaries and includes escaped characters
+    for i in range(120):
+        packer.add(f'https://example.com/pódcast/{i}.xml?q="{i}"')
+        assert packer.size == size_of_dict_as_json(packer.payload())
+        assert packer.urls_size == size_of_dict_as_json(packer.payload()["urls"])
+
+
+def test_packer_caps_urls_separately():
+    packer = PodpingPayloadPacker(max_urls_size=1000)
+    i = 0
+    while packer.add(f"https://example.com/{i}.xml"):
+        i += 1
+
+    assert 970 < packer.urls_size <= 1000
+    # The envelope isn't counted against max_urls_size
+    assert packer.size > 1000
+
+
+def test_packer_fills_payload_and_refuses_overflow():
+    rng = random.Random(42)
+    packer = PodpingPayloadPacker()
+
+    overflow = None
+    for i in range(10000):
+        iri = f"https://example.com/{'x' * rng.randint(10, 200)}/{i}.xml"
+        if not packer.add(iri):
+            overflow = iri
+            break
+
+    assert overflow is not None
+    assert overflow not in packer.iris
+    assert packer.size <= HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+    # The refused IRI would have pushed the payload over the limit
+    overflowed = podping_payload(packer.iris + [overflow])
+    assert size_of_dict_as_json(overflowed) > HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+
+
+def test_packer_ignores_duplicates():
+    packer = PodpingPayloadPacker()
+    assert packer.add("https://example.com/feed.xml")
+    size = packer.size
+
+    assert packer.add("https://example.com/feed.xml")
+    assert len(packer) == 1
+    assert packer.size == size
+
+
+def test_pack_iris_splits_into_minimum_compliant_payloads():
+    iris = {f"https://example.com/feeds/{i:05}/feed.xml" for i in range(1000)}
+
+    iri_lists = pack_iris(iris)
+
+    assert {iri for iri_list in iri_lists for iri in iri_list} == iris
+    assert sum(len(iri_list) for iri_list in iri_lists) == len(iris)
+    for iri_list in iri_lists:
+        assert size_of_dict_as_json(podping_payload(iri_list)) <= (
+            HIVE_CUSTOM_OP_DATA_MAX_LENGTH
+        )
+
+    # Every IRI has the same size, so the best we can do is a simple division
+    per_payload = len(iri_lists[0])
+    assert len(iri_lists) == math.ceil(len(iris) / per_payload)
+
+
+def test_pack_iris_refuses_iri_that_can_never_fit():
+    with pytest.raises(PodpingCustomJsonPayloadExceeded):
+        pack_iris([f"https://example.com/{'x' * HIVE_CUSTOM_OP_DATA_MAX_LENGTH}"])
@@ -0,0 +1,187 @@
+import asyncio
+import json
+
+import pytest
+
+from podping_hivewriter import podping_settings, podping_settings_manager
+from podping_hivewriter.constants import PODPING_SETTINGS_KEY
+from podping_hivewriter.models.podping_settings import PodpingSettings
+from podping_hivewriter.podping_settings import (
+    load_settings_cache,
+    parse_podping_settings,
+)
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+@pytest.mark.asyncio
+async def test_settings_changes_reach_subscribers():
+    with PodpingSettingsManager(ignore_updates=True) as settings_manager:
+        first = settings_manager.settings
+        with pytest.raises(TypeError):
+            first.hive_operation_period = 5
+
+        changes = []
+
+        async def subscriber(old_settings, settings):
+            changes.append((old_settings, settings))
+
+        settings_manager.subscribe(subscriber)
+        waiter = asyncio.ensure_future(settings_manager.wait_for_change(10))
+        await asyncio.sleep(0)
+
+        new_settings = PodpingSettings(hive_operation_period=5)
+        await settings_manager.set_settings(new_settings)
+        assert await waiter is True
+        assert changes == [(first, new_settings)]
+        assert settings_manager.settings is new_settings
+        assert await settings_manager.get_settings() is new_settings
+
+        assert await settings_manager.wait_for_change(0.01) is False
+
+
+@pytest.mark.asyncio
+async def test_sleep_period_follows_new_period():
+    with PodpingSettingsManager(ignore_updates=True) as settings_manager:
+        await settings_manager.set_settings(
+            PodpingSettings(diagnostic_report_period=3600)
+        )
+        sleeper = asyncio.ensure_future(
+            settings_manager.sleep_period(
+                lambda settings: settings.diagnostic_report_period
+            )
+        )
+        await asyncio.sleep(0.01)
+        assert not sleeper.done()
+
+        # Already slept longer than the new period
+        await settings_manager.set_settings(PodpingSettings(diagnostic_report_period=0))
+        await asyncio.wait_for(sleeper, 1)
+
+
+@pytest.mark.asyncio
+async def test_update_parses_only_changed_metadata(tmp_path, monkeypatch):
+    metadata = [json.dumps({PODPING_SETTINGS_KEY: {"hive_operation_period": 6}})]
+    calls = []
+    parses = []
+
+    async def fake_hive_rpc_call(session, node, method, params=None, timeout=10):
+        calls.append((node, method, params))
+        if node == "https://down":
+            raise ConnectionError(node)
+        return [{"name": params[0][0], "posting_json_metadata": metadata[0]}]
+
+    def counting_parse(raw):
+        parses.append(raw)
+        return parse_podping_settings(raw)
+
+    monkeypatch.setattr(podping_settings, "hive_rpc_call", fake_hive_rpc_call)
+    monkeypatch.setattr(
+        podping_settings_manager, "parse_podping_settings", counting_parse
+    )
+
+    cache_file = str(tmp_path / "settings.json")
+    with PodpingSettingsManager(
+        ignore_updates=True, cache_file=cache_file
+    ) as settings_manager:
+        await settings_manager.set_settings(
+            PodpingSettings(main_nodes=("https://down", "https://up"))
+        )
+        await settings_manager.update_podping_settings()
+        assert settings_manager.settings.hive_operation_period == 6
+        # The first node failed, one call to the next
+        assert [call[0] for call in calls] == ["https://down", "https://up"]
+        assert calls[-1][1:] == ("condenser_api.get_accounts", [["podping"]])
+
+        await settings_manager.update_podping_settings()
+        assert len(parses) == 1
+
+        metadata[0] = json.dumps({PODPING_SETTINGS_KEY: {"hive_operation_period": 0}})
+        await settings_manager.update_podping_settings()
+        assert len(parses) == 2
+        # Validated, periods under one second become one
+        assert settings_manager.settings.hive_operation_period == 1
+
+        metadata[0] = "not json"
+        await settings_manager.update_podping_settings()
+        assert settings_manager.settings.hive_operation_period == 1
+
+    # Let the session close
+    await asyncio.sleep(0)
+
+    # A restart begins with the last good settings
+    assert load_settings_cache(cache_file).hive_operation_period == 1
+    # Unless it ignores updates from the control account
+    with PodpingSettingsManager(
+        ignore_updates=True, cache_file=cache_file
+    ) as settings_manager:
+        assert settings_manager.settings.hive_operation_period == 3
+
+
+def account_update2_block(account, posting_json_metadata):
+    return {
+        "block_num": 10,
+        "transactions": [
+            {
+                "operations": [
+                    {
+                        "type": "custom_json_operation",
+                        "value": {"id": "podping", "json": "{}"},
+                    },
+                    {
+                        "type": "account_update2_operation",
+                        "value": {
+                            "account": account,
+                            "json_metadata": "",
+                            "posting_json_metadata": posting_json_metadata,
+                        },
+                    },
+                ]
+            }
+        ],
+    }
+
+
+@pytest.mark.asyncio
+async def test_settings_pushed_from_blocks():
+    with PodpingSettingsManager(
+        ignore_updates=True, push_updates=True
+    ) as settings_manager:
+        changes = []
+
+        async def subscriber(old_settings, settings):
+            changes.append(settings)
+
+        settings_manager.subscribe(subscriber)
+        metadata = json.dumps({PODPING_SETTINGS_KEY: {"hive_operation_period": 6}})
+
+        await settings_manager.on_block(account_update2_block("someone", metadata))
+        await settings_manager.on_block(account_update2_block("podping", ""))
+        assert changes == []
+
+        await settings_manager.on_block(account_update2_block("podping", metadata))
+        assert settings_manager.settings.hive_operation_period == 6
+        assert len(changes) == 1
+
+        # The same metadata again changes nothing
+        await settings_manager.on_block(account_update2_block("podping", metadata))
+        assert len(changes) == 1
+
+
+@pytest.mark.asyncio
+async def test_failed_updates_back_off(monkeypatch):
+    attempts = []
+
+    async def unreachable(self):
+        attempts.append(asyncio.get_event_loop().time())
+        raise ConnectionError("every node is down")
+
+    monkeypatch.setattr(PodpingSettingsManager, "update_podping_settings", unreachable)
+    monkeypatch.setattr(podping_settings_manager, "SETTINGS_RETRY_BASE_DELAY", 0.05)
+
+    with PodpingSettingsManager(ignore_updates=False):
+        await asyncio.sleep(0.5)
+
+    # 0.05, 0.1, 0.2 then 0.4s apart, not as fast as the loop can go
+    assert 3 <= len(attempts) <= 5
+    assert attempts[2] - attempts[1] > attempts[1] - attempts[0]
+    await asyncio.sleep(0)
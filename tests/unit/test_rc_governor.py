@@ -0,0 +1,99 @@
+import pytest
+
+from podping_hivewriter import rc_governor
+from podping_hivewriter.rc_governor import (
+    HIVE_RC_REGEN_TIME,
+    RC_MAX_BATCH_PERIOD,
+    RcGovernor,
+    fit_cost,
+)
+
+MAX_MANA = HIVE_RC_REGEN_TIME * 1000.0
+
+
+def test_fit_cost_separates_per_op_and_per_byte():
+    samples = [
+        (ops, size, 500 * ops + 3 * size)
+        for ops, size in ((1, 100), (2, 900), (5, 1000))
+    ]
+    per_op, per_byte = fit_cost(samples)
+    assert per_op == pytest.approx(500)
+    assert per_byte == pytest.approx(3)
+
+    # Always the same size per operation, only the total per op can be told
+    per_op, per_byte = fit_cost([(1, 100, 800), (2, 200, 1600)])
+    assert per_op == pytest.approx(800)
+    assert per_byte == 0
+
+    assert fit_cost([]) is None
+
+
+def test_governor_learns_cost_and_capacity(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc_governor, "timer", lambda: now[0])
+
+    governor = RcGovernor(floor_pct=10)
+    governor.observe("podping.aaa", {"current_mana": MAX_MANA, "max_mana": MAX_MANA})
+    assert governor.capacity("podping.aaa") is None
+
+    governor.record_broadcast("podping.aaa", 2, 1000)
+    now[0] += 10
+    # 10s regenerated 10000, capped at the maximum, so 50000 was spent
+    governor.observe(
+        "podping.aaa", {"current_mana": MAX_MANA - 50000, "max_mana": MAX_MANA}
+    )
+    assert governor.cost_per_op == pytest.approx(25000)
+    assert governor.podping_cost() == pytest.approx(25000)
+
+    above_floor = MAX_MANA * 0.9 - 50000
+    assert governor.capacity("podping.aaa") == pytest.approx(above_floor / 25000)
+
+    # Spent since the last read counts until the next one
+    governor.record_broadcast("podping.aaa", 1, 500)
+    assert governor.capacity("podping.aaa") == pytest.approx(above_floor / 25000 - 1)
+
+
+def test_time_to_floor(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc_governor, "timer", lambda: now[0])
+
+    governor = RcGovernor(floor_pct=50)
+    governor.observe("podping.aaa", {"current_mana": MAX_MANA, "max_mana": MAX_MANA})
+    assert governor.time_to_floor("podping.aaa") is None
+
+    governor.record_broadcast("podping.aaa", 1, 100)
+    governor.observe(
+        "podping.aaa", {"current_mana": MAX_MANA - 1200000, "max_mana": MAX_MANA}
+    )
+    # 1200000 spent over the 600s window, less 1000 per second regenerating
+    remaining = MAX_MANA * 0.5 - 1200000
+    assert governor.time_to_floor("podping.aaa") == pytest.approx(remaining / 1000)
+
+    # Out of the window, nothing is being spent
+    now[0] += 601
+    assert governor.time_to_floor("podping.aaa") is None
+
+
+def test_batch_period_grows_as_rc_runs_low(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(rc_governor, "timer", lambda: now[0])
+
+    governor = RcGovernor(floor_pct=10)
+    assert governor.batch_period(3) == 3
+
+    governor.observe("podping.aaa", {"current_mana": MAX_MANA, "max_mana": MAX_MANA})
+    governor.record_broadcast("podping.aaa", 1, 100)
+    governor.observe(
+        "podping.aaa", {"current_mana": MAX_MANA - 20000, "max_mana": MAX_MANA}
+    )
+    # Plenty above the floor
+    assert governor.batch_period(3) == 3
+
+    # At the floor, only what regenerates can be spent, 1000 per second
+    governor.observe(
+        "podping.aaa", {"current_mana": MAX_MANA * 0.1, "max_mana": MAX_MANA}
+    )
+    assert governor.batch_period(3) == pytest.approx(20)
+
+    governor.cost_per_op = 1e9
+    assert governor.batch_period(3) == RC_MAX_BATCH_PERIOD
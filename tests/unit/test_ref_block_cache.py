@@ -0,0 +1,48 @@
+import pytest
+
+from podping_hivewriter import ref_block_cache
+from podping_hivewriter.ref_block_cache import RefBlock, RefBlockCache
+
+DYNAMIC_GLOBAL_PROPERTIES = {
+    "head_block_number": 70000000,
+    "head_block_id": "042c1d80" + "11" * 16,
+    "time": "2022-01-01T00:00:00",
+}
+
+
+def test_ref_block_from_dynamic_global_properties(monkeypatch):
+    monkeypatch.setattr(ref_block_cache, "timer", lambda: 105.0)
+    ref_block = RefBlock.from_dynamic_global_properties(
+        DYNAMIC_GLOBAL_PROPERTIES, fetched_at=100.0
+    )
+    assert ref_block.ref_block_num == 70000000 & 0xFFFF
+    assert ref_block.ref_block_prefix == 0x11111111
+    # Five seconds of chain time have passed since it was fetched
+    assert ref_block.expiration(30) == "2022-01-01T00:00:35"
+
+
+@pytest.mark.asyncio
+async def test_cache_refetches_only_when_stale(monkeypatch):
+    now = [100.0]
+    fetches = []
+
+    async def fake_hive_rpc_call(session, node, method, params=None, timeout=10):
+        fetches.append(node)
+        return DYNAMIC_GLOBAL_PROPERTIES
+
+    monkeypatch.setattr(ref_block_cache, "timer", lambda: now[0])
+    monkeypatch.setattr(ref_block_cache, "hive_rpc_call", fake_hive_rpc_call)
+
+    cache = RefBlockCache(max_age=60)
+    first = await cache.get(None, "https://a")
+    now[0] += 59
+    assert await cache.get(None, "https://a") is first
+    assert len(fetches) == 1
+
+    now[0] += 2
+    assert await cache.get(None, "https://a") is not first
+    assert len(fetches) == 2
+
+    cache.invalidate()
+    await cache.get(None, "https://b")
+    assert fetches == ["https://a", "https://a", "https://b"]
@@ -0,0 +1,75 @@
+import pytest
+
+from podping_hivewriter import retry_policy
+from podping_hivewriter.retry_policy import RetryPolicy, TokenBucket
+
+
+def test_backoff_delays_stay_within_bounds():
+    policy = RetryPolicy(base_delay=1, max_delay=30)
+    for _ in range(20):
+        backoff = policy.backoff()
+        previous = policy.base_delay
+        for _ in range(10):
+            delay = backoff.next_delay()
+            assert 1 <= delay <= min(30, previous * 3)
+            previous = delay
+
+
+def test_backoff_budget():
+    assert not RetryPolicy().backoff().exhausted
+
+    backoff = RetryPolicy(budget=2).backoff()
+    assert not backoff.exhausted
+    backoff.retries = 2
+    assert backoff.exhausted
+
+
+def test_token_bucket_refills(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry_policy, "timer", lambda: now[0])
+
+    bucket = TokenBucket(rate=0.5, capacity=2)
+    assert bucket.try_take()
+    assert bucket.try_take()
+    assert not bucket.try_take()
+
+    now[0] += 2
+    assert bucket.try_take()
+    assert not bucket.try_take()
+
+    # Never holds more than its capacity
+    now[0] += 100
+    assert bucket.tokens == 2
+
+
+@pytest.mark.asyncio
+async def test_retries_count_against_pressure(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry_policy, "timer", lambda: now[0])
+
+    policy = RetryPolicy(tokens_per_second=0.1, token_capacity=4)
+    assert policy.pressure == 0
+
+    backoff = policy.backoff()
+    await backoff.sleep(0)
+    await backoff.sleep(0)
+    assert backoff.retries == 2
+    assert policy.total_retries == 2
+    assert policy.waiting == 0
+    assert policy.pressure == 0.5
+
+
+def test_retry_after_grows_with_pressure(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(retry_policy, "timer", lambda: now[0])
+
+    policy = RetryPolicy(max_delay=103, tokens_per_second=0.1, token_capacity=4)
+    assert policy.retry_after(3) == 3
+
+    policy.tokens.try_take()
+    policy.tokens.try_take()
+    assert policy.retry_after(3) == 53
+
+    policy.tokens.try_take()
+    policy.tokens.try_take()
+    assert policy.retry_after(3) == 103
@@ -0,0 +1,32 @@
+from podping_hivewriter import startup_cache
+from podping_hivewriter.startup_cache import StartupCheckCache
+
+
+def test_startup_cache_round_trip(tmp_path, monkeypatch):
+    now = [1000000.0]
+    monkeypatch.setattr(startup_cache.time, "time", lambda: now[0])
+
+    cache = StartupCheckCache(str(tmp_path / "nested" / "checks.json"), max_age=60)
+    accounts = ["podping.bbb", "podping.aaa"]
+    assert not cache.is_fresh(accounts, "podping", resource_test=False)
+
+    cache.save(accounts, "podping", resource_tested=False)
+    assert cache.is_fresh(["podping.aaa", "podping.bbb"], "podping", False)
+    # A resource test is still needed if it wasn't part of the cached checks
+    assert not cache.is_fresh(accounts, "podping", resource_test=True)
+    assert not cache.is_fresh(["podping.aaa"], "podping", False)
+    assert not cache.is_fresh(accounts, "podping.control", False)
+
+    now[0] += 61
+    assert not cache.is_fresh(accounts, "podping", False)
+
+
+def test_startup_cache_ignores_bad_file(tmp_path):
+    path = tmp_path / "checks.json"
+    path.write_text("{not json")
+    cache = StartupCheckCache(str(path))
+    assert cache.load() is None
+    assert not cache.is_fresh(["podping.aaa"], "podping", False)
+
+    path.write_text('{"accounts": ["podping.aaa"]}')
+    assert not cache.is_fresh(["podping.aaa"], "podping", False)
@@ -0,0 +1,37 @@
+from unittest.mock import patch
+
+import pytest
+
+from podping_hivewriter import podping_hivewriter as podping_hivewriter_module
+from podping_hivewriter.constants import STARTUP_FAILED_UNKNOWN_EXIT_CODE
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+async def _no_startup(_self):
+    pass
+
+
+@pytest.mark.asyncio
+async def test_failed_resource_test_only_exits_when_asked(monkeypatch):
+    async def unreachable(hive, account):
+        raise ConnectionError("node went away")
+
+    monkeypatch.setattr(podping_hivewriter_module, "get_rc_manabar", unreachable)
+
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa", [], settings_manager, daemon=False, status=False
+        )
+
+    with podping_hivewriter:
+        with pytest.raises(SystemExit) as exit_info:
+            await podping_hivewriter.test_hive_resources(None, None)
+        assert exit_info.value.code == STARTUP_FAILED_UNKNOWN_EXIT_CODE
+
+        # As run in the background with --fast-start
+        await podping_hivewriter.test_hive_resources(None, None, exit_on_failure=False)
@@ -0,0 +1,67 @@
+import asyncio
+from unittest.mock import patch
+
+import pytest
+
+from podping_hivewriter.hive_wrapper import HiveWrapper
+from podping_hivewriter.podping_hivewriter import PodpingHivewriter
+from podping_hivewriter.podping_settings_manager import PodpingSettingsManager
+
+
+async def _no_startup(_self):
+    pass
+
+
+async def _on_expired():
+    pass
+
+
+async def _writer():
+    settings_manager = PodpingSettingsManager(ignore_updates=True)
+    with patch.object(PodpingHivewriter, "_startup", _no_startup), patch.object(
+        HiveWrapper, "_startup", _no_startup
+    ):
+        podping_hivewriter = PodpingHivewriter(
+            "podping.aaa", [], settings_manager, daemon=False, status=False
+        )
+    # Once the block stream has started up without its loop
+    await asyncio.sleep(0)
+    podping_hivewriter.block_stream.daemon = True
+    return podping_hivewriter
+
+
+@pytest.mark.asyncio
+async def test_block_arriving_before_the_broadcast_returns():
+    with await _writer() as podping_hivewriter:
+        tracker = podping_hivewriter.inclusion_tracker
+
+        async def custom_json_ops(*_args, on_signed=None):
+            tx = {"trx_id": "abc", "expiration": "2022-01-01T00:00:30"}
+            on_signed(tx)
+            # The node is slow to answer, the block stream isn't
+            await tracker._on_block(
+                {
+                    "block_num": 10,
+                    "timestamp": "2022-01-01T00:00:03",
+                    "transaction_ids": ["abc"],
+                }
+            )
+            return tx
+
+        podping_hivewriter.hive_wrapper.custom_json_ops = custom_json_ops
+        await podping_hivewriter.send_notifications([{}], on_expired=_on_expired)
+        assert tracker.pending["abc"].block_num == 10
+
+
+@pytest.mark.asyncio
+async def test_failed_broadcast_is_not_followed():
+    with await _writer() as podping_hivewriter:
+
+        async def custom_json_ops(*_args, on_signed=None):
+            on_signed({"trx_id": "abc", "expiration": "2022-01-01T00:00:30"})
+            raise ConnectionError("node went away")
+
+        podping_hivewriter.hive_wrapper.custom_json_ops = custom_json_ops
+        with pytest.raises(ConnectionError):
+            await podping_hivewriter.send_notifications([{}], on_expired=_on_expired)
+        assert podping_hivewriter.inclusion_tracker.pending == {}
@@ -0,0 +1,28 @@
+from podping_hivewriter.constants import ZMQ_BULK_MARKER
+from podping_hivewriter.podping_hivewriter import parse_zmq_request
+
+
+def test_single_iri_request():
+    assert parse_zmq_request([b"https://example.com/feed.xml"]) == (
+        ["https://example.com/feed.xml"],
+        False,
+    )
+    assert parse_zmq_request([b"\xff"]) == ([None], False)
+
+
+def test_bulk_request_is_marked():
+    body = [ZMQ_BULK_MARKER, b"https://example.com/a.xml", b"\xff"]
+    assert parse_zmq_request(body) == (["https://example.com/a.xml", None], True)
+
+    # A bulk request of one IRI is still answered as a bulk request
+    assert parse_zmq_request([ZMQ_BULK_MARKER, b"https://example.com/a.xml"]) == (
+        ["https://example.com/a.xml"],
+        True,
+    )
+    assert parse_zmq_request([ZMQ_BULK_MARKER]) == ([], True)
+
+
+def test_unmarked_request_of_several_frames_is_invalid():
+    body = [b"https://example.com/a.xml", b"https://example.com/b.xml"]
+    assert parse_zmq_request(body) == ([None], False)
+    assert parse_zmq_request([]) == ([None], False)